@@ -0,0 +1,36 @@
+#Benchmark for comparing read_sql and COPY extraction
+
+from src.extractors.postgres_extractor import PostgresExtractor, RAW_TRANSACTIONS_DTYPES
+from dotenv import load_dotenv
+from datetime import datetime
+import os
+import logging
+
+logging.basicConfig(level=logging.WARNING)
+load_dotenv()
+
+# Build connection string
+conn_string = (
+    f"postgresql://{os.getenv('SOURCE_DB_USER')}:{os.getenv('SOURCE_DB_PASSWORD')}@"
+    f"{os.getenv('SOURCE_DB_HOST')}:{os.getenv('SOURCE_DB_PORT')}/{os.getenv('SOURCE_DB_NAME')}"
+)
+
+extractor = PostgresExtractor(conn_string)
+query = "SELECT * FROM raw_transactions"
+runs = 3
+
+# Time each method a few times and keep the best run
+timings = {}
+for method in ['read_sql', 'copy']:
+    best = None
+    for _ in range(runs):
+        start = datetime.now()
+        df = extractor.extract(query, method=method, dtypes=RAW_TRANSACTIONS_DTYPES)
+        duration = (datetime.now() - start).total_seconds()
+        best = duration if best is None else min(best, duration)
+    
+    timings[method] = best
+    print(f"{method:>8}: {len(df)} rows in {best:.2f}s ({len(df) / best:,.0f} rows/sec), "
+          f"{df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+
+print(f"\nCOPY speedup: {timings['read_sql'] / timings['copy']:.1f}x")
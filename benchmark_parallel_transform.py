@@ -0,0 +1,60 @@
+#Benchmark for the process-pool transform against single-process clean + map
+
+import os
+import sys
+# The modules import each other the way pipeline.py does, from inside src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from transformers.data_cleaner import DataCleaner
+from transformers.schema_mapper import SchemaMapper
+from transformers.parallel_transform import ParallelTransformExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import logging
+
+logging.basicConfig(level=logging.WARNING)
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+worker_counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4, 8]
+
+# Synthetic table shaped like raw_transactions, with some duplicate rows
+rng = np.random.default_rng(42)
+products = np.array(['85123A', '71053', '84406B', '22752', '21730', '84029G', '22633', '22632'])
+descriptions = np.array(['WHITE HANGING HEART ', ' WHITE METAL LANTERN', 'CREAM CUPID HEARTS', ' SET 7 BABUSHKA NESTING BOXES '])
+countries = np.array(['United Kingdom', 'France', ' Germany', 'EIRE', 'Spain ', 'Netherlands'])
+dates = pd.date_range('2010-12-01', '2011-12-09', freq='min').strftime('%m/%d/%Y %H:%M').to_numpy()
+
+raw = pd.DataFrame({
+    'InvoiceNo': (536365 + rng.integers(0, 25000, rows)).astype(str).astype(object),
+    'StockCode': products[rng.integers(0, len(products), rows)],
+    'Description': descriptions[rng.integers(0, len(descriptions), rows)],
+    'Quantity': rng.integers(-5, 60, rows),
+    'InvoiceDate': dates[rng.integers(0, len(dates), rows)],
+    'UnitPrice': rng.gamma(2, 2, rows).round(2),
+    'CustomerID': rng.integers(12346, 18288, rows).astype(float),
+    'Country': countries[rng.integers(0, len(countries), rows)]
+})
+raw = pd.concat([raw, raw.iloc[:rows // 100]], ignore_index=True)
+
+config = {
+    'critical_columns': ['InvoiceNo', 'StockCode'],
+    'outlier_columns': ['Quantity', 'UnitPrice'],
+    'fused': True
+}
+
+print(f"{len(raw):,} rows, {os.cpu_count()} CPUs\n")
+
+start = datetime.now()
+expected = SchemaMapper().map_ecommerce_schema(DataCleaner().clean(raw, config))
+serial_time = (datetime.now() - start).total_seconds()
+print(f"{'single process':>16}: {serial_time:.2f}s")
+
+for workers in worker_counts:
+    executor = ParallelTransformExecutor(workers)
+    start = datetime.now()
+    result = executor.transform(raw, DataCleaner(), SchemaMapper(), config)
+    duration = (datetime.now() - start).total_seconds()
+    
+    print(f"{workers:>8} workers: {duration:.2f}s ({serial_time / duration:.1f}x), "
+          f"{executor.stats['busy_seconds']:.2f}s of work, same output: {result.equals(expected)}")
\ No newline at end of file
@@ -0,0 +1,59 @@
+#Benchmark for sampled pre-transform quality checks against full scans at growing table sizes
+
+from src.quality.validators import DataQualityValidator
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import logging
+import sys
+
+logging.basicConfig(level=logging.ERROR)
+
+sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100000, 1000000, 4000000]
+sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+config = {
+    'null_threshold': 0.05,
+    'value_ranges': {'Quantity': (0, 10000), 'UnitPrice': (0, 1000)},
+    'min_rows': 100
+}
+
+def raw_transactions(rows, seed=42):
+    """Synthetic table shaped like raw_transactions, with nulls, negative quantities and duplicates"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2010-12-01', '2011-12-09', freq='min').strftime('%m/%d/%Y %H:%M').to_numpy()
+    df = pd.DataFrame({
+        'InvoiceNo': (536365 + rng.integers(0, 25000, rows)).astype(str).astype(object),
+        'StockCode': np.array(['85123A', '71053', '84406B', '22752', '21730'])[rng.integers(0, 5, rows)],
+        'Description': np.array(['WHITE HANGING HEART', 'CREAM CUPID HEARTS', None, 'LANTERN'], dtype=object)[rng.integers(0, 4, rows)],
+        'Quantity': rng.integers(-5, 60, rows),
+        'InvoiceDate': dates[rng.integers(0, len(dates), rows)],
+        'UnitPrice': rng.gamma(2, 2, rows).round(2),
+        'CustomerID': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12346, 18288, rows)),
+        'Country': np.array(['United Kingdom', 'France', 'Germany', 'EIRE'])[rng.integers(0, 4, rows)]
+    })
+    return pd.concat([df, df.iloc[:rows // 1000]], ignore_index=True)
+
+print(f"Sample size {sample_size:,}\n")
+
+for rows in sizes:
+    df = raw_transactions(rows)
+    
+    start = datetime.now()
+    full = DataQualityValidator().run_all_checks(df, config)
+    full_time = (datetime.now() - start).total_seconds()
+    
+    start = datetime.now()
+    sampled = DataQualityValidator().run_all_checks(df, {**config, 'sample_size': sample_size, 'sample_seed': 0})
+    sample_time = (datetime.now() - start).total_seconds()
+    
+    # The one pass over every row the sampled checks still make
+    validator = DataQualityValidator()
+    start = datetime.now()
+    pd.util.hash_pandas_object(df[validator.cheap_columns(df) or list(df.columns)], index=False)
+    hash_time = (datetime.now() - start).total_seconds()
+    
+    same_verdicts = [check['passed'] for check in full['checks']] == [check['passed'] for check in sampled['checks']]
+    print(f"{len(df):>10,} rows: full {full_time:.2f}s, sampled {sample_time:.2f}s ({full_time / sample_time:.0f}x, "
+          f"row hash {hash_time:.2f}s), "
+          f"score {full['score']} vs {sampled['score']}, same pass/fail: {same_verdicts}")
\ No newline at end of file
@@ -0,0 +1,74 @@
+#Benchmark for comparing Python object strings and Arrow-backed strings in the cleaner
+
+from src.transformers.data_cleaner import DataCleaner
+from src.extractors.postgres_extractor import RAW_TRANSACTIONS_DTYPES, arrow_text_dtypes
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import logging
+import sys
+
+logging.basicConfig(level=logging.WARNING)
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 3000000
+runs = 3
+
+# Synthetic table shaped like raw_transactions
+rng = np.random.default_rng(42)
+products = np.array(['85123A', '71053', '84406B', '22752', '21730', '84029G', '22633', '22632'])
+descriptions = np.array(['WHITE HANGING HEART ', ' WHITE METAL LANTERN', 'CREAM CUPID HEARTS', ' SET 7 BABUSHKA NESTING BOXES '])
+countries = np.array(['United Kingdom', 'France', ' Germany', 'EIRE', 'Spain ', 'Netherlands'])
+dates = pd.date_range('2010-12-01', '2011-12-09', freq='min').strftime('%m/%d/%Y %H:%M').to_numpy()
+
+raw = pd.DataFrame({
+    'InvoiceNo': (536365 + rng.integers(0, 25000, rows)).astype(str).astype(object),
+    'StockCode': products[rng.integers(0, len(products), rows)],
+    'Description': descriptions[rng.integers(0, len(descriptions), rows)],
+    'Quantity': rng.integers(1, 50, rows),
+    'InvoiceDate': dates[rng.integers(0, len(dates), rows)],
+    'UnitPrice': rng.integers(10, 2000, rows) / 100,
+    'CustomerID': rng.integers(12346, 18288, rows).astype(float),
+    'Country': countries[rng.integers(0, len(countries), rows)]
+})
+
+engines = {
+    'python': raw,
+    'pyarrow': raw.astype({col: dtype for col, dtype in arrow_text_dtypes(RAW_TRANSACTIONS_DTYPES).items()
+                           if dtype != RAW_TRANSACTIONS_DTYPES[col]})
+}
+
+print(f"{rows:,} rows, best of {runs} runs\n")
+
+# Time the two text-heavy steps separately, then the whole (fused) clean
+timings = {}
+results = {}
+for name, df in engines.items():
+    steps = {
+        'fix_data_types': lambda: DataCleaner().fix_data_types(df.copy()),
+        'standardize_text': lambda: DataCleaner().standardize_text(df.copy()),
+        'clean (fused)': lambda: DataCleaner().clean(df, {'fused': True, 'outlier_columns': ['Quantity', 'UnitPrice']})
+    }
+    
+    for step, run in steps.items():
+        best = None
+        for _ in range(runs):
+            start = datetime.now()
+            result = run()
+            duration = (datetime.now() - start).total_seconds()
+            best = duration if best is None else min(best, duration)
+        
+        timings[(name, step)] = best
+        results[(name, step)] = result
+    
+    print(f"{name:>8}: {df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB in memory")
+
+print()
+for step in ['fix_data_types', 'standardize_text', 'clean (fused)']:
+    python_time = timings[('python', step)]
+    arrow_time = timings[('pyarrow', step)]
+    print(f"{step:>16}: python {python_time:.2f}s, pyarrow {arrow_time:.2f}s ({python_time / arrow_time:.1f}x)")
+
+# Both engines must produce the same values
+python_clean = results[('python', 'clean (fused)')]
+arrow_clean = results[('pyarrow', 'clean (fused)')].astype(python_clean.dtypes.to_dict())
+print(f"\nSame output: {python_clean.equals(arrow_clean)}")
\ No newline at end of file
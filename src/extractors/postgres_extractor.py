@@ -1,37 +1,241 @@
 #Getting data from PostgreSQL database
 
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
 import logging
 
+# Column types of raw_transactions, used to parse COPY output without guessing
+RAW_TRANSACTIONS_DTYPES = {
+    'InvoiceNo': 'object',
+    'StockCode': 'object',
+    'Description': 'object',
+    'Quantity': 'int64',
+    'InvoiceDate': 'object',
+    'UnitPrice': 'float64',
+    'CustomerID': 'float64',
+    'Country': 'object'
+}
+
+# Arrow-backed text dtype, its string methods run in native code instead of on Python objects
+ARROW_STRING_DTYPE = 'string[pyarrow]'
+
+def arrow_text_dtypes(dtypes):
+    """Return a copy of a dtype map with the text (object) columns read as Arrow strings"""
+    return {col: ARROW_STRING_DTYPE if dtype == 'object' else dtype for col, dtype in dtypes.items()}
+
 class PostgresExtractor:
     def __init__(self, connection_string):
         # Save database connection and setup logger
         self.engine = create_engine(connection_string)
         self.logger = logging.getLogger(__name__)
     
-    def extract(self, query):
-        """Run SQL query and return data as DataFrame"""
+    def extract(self, query, params=None, method='read_sql', dtypes=None):
+        """Run SQL query and return data as DataFrame
+        
+        Named parameters in the query (e.g. :since) are bound from `params`.
+        method='copy' uses PostgreSQL COPY instead of pd.read_sql (see extract_copy).
+        """
+        if method == 'copy':
+            return self.extract_copy(query, params, dtypes)
+        if method != 'read_sql':
+            raise ValueError(f"Unknown extraction method: {method}")
+        
         try:
             start_time = datetime.now()
             # Log first 100 chars of query so we know what's running
             self.logger.info(f"Starting extraction with query: {query[:100]}...")
             
             # Execute query and load results into pandas DataFrame
-            df = pd.read_sql(query, self.engine)
+            df = pd.read_sql(text(query), self.engine, params=params)
+            df = self.apply_dtypes(df, dtypes)
             
             # Calculate how long it took
             duration = (datetime.now() - start_time).total_seconds()
             self.logger.info(f"Extracted {len(df)} rows in {duration:.2f} seconds")
             
             return df
-            
+        
         except Exception as e:
             # If anything breaks, log it and crash
             self.logger.error(f"Extraction failed: {str(e)}")
             raise
     
+    def extract_copy(self, query, params=None, dtypes=None, spool_size=64 * 1024 * 1024):
+        """Run SQL query through COPY ... TO STDOUT and parse the CSV stream
+        
+        Skips SQLAlchemy row objects entirely: the server writes CSV, pandas' C
+        parser reads it. Pass `dtypes` (e.g. RAW_TRANSACTIONS_DTYPES) so columns
+        come back with the same types as pd.read_sql instead of being guessed.
+        Output up to `spool_size` bytes stays in memory, larger results spill to a temp file.
+        """
+        try:
+            start_time = datetime.now()
+            self.logger.info(f"Starting COPY extraction with query: {query[:100]}...")
+            
+            # COPY can't take bind parameters, so render them into the SQL
+            sql = self.render_query(query, params)
+            copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')"
+            
+            with tempfile.SpooledTemporaryFile(max_size=spool_size, mode='w+b') as buffer:
+                raw_conn = self.engine.raw_connection()
+                try:
+                    with raw_conn.cursor() as cursor:
+                        cursor.copy_expert(copy_sql, buffer)
+                finally:
+                    raw_conn.close()
+                
+                buffer.seek(0)
+                # \N marks NULL, so empty strings stay empty strings like with read_sql
+                df = pd.read_csv(buffer, dtype=dtypes, na_values=['\\N'], keep_default_na=False)
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Extracted {len(df)} rows via COPY in {duration:.2f} seconds")
+            
+            return df
+        
+        except Exception as e:
+            self.logger.error(f"COPY extraction failed: {str(e)}")
+            raise
+    
+    def apply_dtypes(self, df, dtypes=None):
+        """pd.read_sql takes no dtype map, so convert text columns (e.g. to Arrow strings) after reading
+        
+        Numeric columns with only NULLs come back as objects; they become float64,
+        as they do when some values aren't NULL, so the rows hash (and dedup) alike.
+        """
+        converted = {}
+        for col, dtype in (dtypes or {}).items():
+            if col not in df.columns:
+                continue
+            if dtype != 'object' and pd.api.types.is_string_dtype(dtype):
+                converted[col] = dtype
+            elif pd.api.types.is_numeric_dtype(dtype) and df[col].dtype == object and df[col].isnull().all():
+                converted[col] = 'float64'
+        return df.astype(converted) if converted else df
+    
+    def render_query(self, query, params=None):
+        """Return the query with named parameters inlined as SQL literals"""
+        if not params:
+            return query
+        
+        statement = text(query).bindparams(**params)
+        return str(statement.compile(dialect=self.engine.dialect, compile_kwargs={'literal_binds': True}))
+    
+    def extract_chunks(self, query, chunksize=50000, params=None, dtypes=None):
+        """Run SQL query and yield the results as DataFrames of `chunksize` rows
+        
+        Uses a server-side cursor so only one chunk is held in memory at a time.
+        """
+        try:
+            start_time = datetime.now()
+            self.logger.info(f"Starting chunked extraction ({chunksize} rows/chunk) with query: {query[:100]}...")
+            
+            total_rows = 0
+            chunk_count = 0
+            
+            # stream_results makes psycopg2 use a named (server-side) cursor
+            with self.engine.connect().execution_options(stream_results=True) as conn:
+                for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunksize):
+                    total_rows += len(chunk)
+                    chunk_count += 1
+                    yield self.apply_dtypes(chunk, dtypes)
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Extracted {total_rows} rows in {chunk_count} chunks in {duration:.2f} seconds")
+        
+        except Exception as e:
+            self.logger.error(f"Chunked extraction failed: {str(e)}")
+            raise
+    
+    def extract_partitioned(self, query, partition_column, num_partitions=4, strategy='hash', max_workers=None, params=None, method='read_sql', dtypes=None):
+        """Split a query into partitions and extract them concurrently
+        
+        strategy='hash' buckets rows by a hash of `partition_column`, strategy='range'
+        splits the column's min/max into equal ranges (column must be castable to
+        timestamp). Each partition runs on its own pooled connection. Per-partition
+        row counts and timings are kept in `self.partition_stats`.
+        """
+        try:
+            start_time = datetime.now()
+            partition_queries = self.build_partition_queries(query, partition_column, num_partitions, strategy, params)
+            self.logger.info(f"Starting partitioned extraction: {len(partition_queries)} {strategy} partitions on '{partition_column}'")
+            
+            # One worker per partition by default
+            workers = min(max_workers or len(partition_queries), len(partition_queries))
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda item: self.extract_partition(item[0], item[1], params, method, dtypes),
+                    enumerate(partition_queries)
+                ))
+            
+            self.partition_stats = [stats for _, stats in results]
+            frames = [df for df, _ in results]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Extracted {len(df)} rows from {len(frames)} partitions in {duration:.2f} seconds ({workers} workers)")
+            
+            return df
+        
+        except Exception as e:
+            self.logger.error(f"Partitioned extraction failed: {str(e)}")
+            raise
+    
+    def build_partition_queries(self, query, partition_column, num_partitions, strategy='hash', params=None):
+        """Wrap a query into one query per partition"""
+        column = f'"{partition_column}"'
+        # Rows with a NULL key don't fall in any bucket, so partition 0 picks them up
+        null_clause = f" OR {column} IS NULL"
+        
+        if strategy == 'hash':
+            return [
+                # Masking the sign bit keeps the hash non-negative; abs() overflows on the int4 minimum
+                f"SELECT * FROM ({query}) AS src WHERE mod(hashtext(CAST({column} AS text)) & 2147483647, {num_partitions}) = {i}"
+                + (null_clause if i == 0 else "")
+                for i in range(num_partitions)
+            ]
+        
+        if strategy == 'range':
+            expression = f"CAST({column} AS timestamp)"
+            bounds = pd.read_sql(
+                text(f"SELECT MIN({expression}) AS lo, MAX({expression}) AS hi FROM ({query}) AS src"),
+                self.engine, params=params
+            )
+            lo, hi = bounds['lo'].iloc[0], bounds['hi'].iloc[0]
+            if pd.isnull(lo):
+                return [query]
+            
+            # Equal-width buckets; the last bucket is closed on the right so MAX is included
+            edges = pd.date_range(lo, hi, periods=num_partitions + 1)
+            queries = []
+            for i in range(num_partitions):
+                upper_op = '<=' if i == num_partitions - 1 else '<'
+                queries.append(
+                    f"SELECT * FROM ({query}) AS src WHERE ({expression} >= '{edges[i]}' AND {expression} {upper_op} '{edges[i + 1]}')"
+                    + (null_clause if i == 0 else "")
+                )
+            return queries
+        
+        raise ValueError(f"Unknown partition strategy: {strategy}")
+    
+    def extract_partition(self, partition_number, query, params=None, method='read_sql', dtypes=None):
+        """Extract one partition on its own connection and time it"""
+        start_time = datetime.now()
+        df = self.extract(query, params, method, dtypes)
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        self.logger.info(f"Partition {partition_number}: {len(df)} rows in {duration:.2f} seconds")
+        
+        return df, {
+            'partition': partition_number,
+            'row_count': len(df),
+            'duration_seconds': duration
+        }
+    
     def get_metadata(self, df):
         """Return basic info about the extracted data"""
         return {
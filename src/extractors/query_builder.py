@@ -0,0 +1,47 @@
+#Builds source SELECT queries with projected columns and pushed-down filters
+
+class QueryBuilder:
+    def __init__(self, table):
+        self.table = table
+        self.columns = None
+        self.conditions = []
+        self.params = {}
+    
+    def select(self, columns):
+        """Only pull these columns instead of SELECT *"""
+        self.columns = list(columns) if columns else None
+        return self
+    
+    def where_not_null(self, columns):
+        """Drop rows with NULLs in these columns at the source"""
+        for col in columns or []:
+            self.conditions.append(f'"{col}" IS NOT NULL')
+        return self
+    
+    def where_timestamp_after(self, column, value, param_name, inclusive=False):
+        """Rows where column (cast to timestamp) is strictly after value, or at it too if inclusive"""
+        if value is not None:
+            operator = '>=' if inclusive else '>'
+            self.conditions.append(f'CAST("{column}" AS timestamp) {operator} CAST(:{param_name} AS timestamp)')
+            self.params[param_name] = str(value)
+        return self
+    
+    def where_timestamp_between(self, column, start=None, end=None):
+        """Rows where column (cast to timestamp) is inside [start, end)"""
+        if start is not None:
+            self.conditions.append(f'CAST("{column}" AS timestamp) >= CAST(:date_from AS timestamp)')
+            self.params['date_from'] = str(start)
+        if end is not None:
+            self.conditions.append(f'CAST("{column}" AS timestamp) < CAST(:date_to AS timestamp)')
+            self.params['date_to'] = str(end)
+        return self
+    
+    def build(self):
+        """Return the SQL text and its bind parameters"""
+        columns = ', '.join(f'"{col}"' for col in self.columns) if self.columns else '*'
+        query = f"SELECT {columns} FROM {self.table}"
+        
+        if self.conditions:
+            query += " WHERE " + " AND ".join(self.conditions)
+        
+        return query, dict(self.params)
\ No newline at end of file
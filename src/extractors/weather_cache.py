@@ -0,0 +1,131 @@
+#Keeps weather days on disk so only missing or recent days hit the api
+
+import sqlite3
+import pandas as pd
+from datetime import date, timedelta
+from contextlib import contextmanager
+import threading
+import time
+import os
+import logging
+
+class WeatherCache:
+    def __init__(self, path='data/cache/weather_cache.sqlite', ttl_hours=6, recent_days=2, max_rows=200000):
+        # Days older than `recent_days` never change, newer ones expire after `ttl_hours`
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.recent_days = recent_days
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ensure_table()
+    
+    @contextmanager
+    def connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def ensure_table(self):
+        """Create the cache table if it doesn't exist yet"""
+        with self.lock, self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS weather_days ("
+                "latitude REAL, longitude REAL, date TEXT, "
+                "temp_max REAL, temp_min REAL, precipitation REAL, "
+                "fetched_at REAL, last_access REAL, "
+                "PRIMARY KEY (latitude, longitude, date))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_weather_days_access ON weather_days (last_access)")
+    
+    def get_range(self, latitude, longitude, start_date, end_date, fetch):
+        """Return daily weather for [start_date, end_date], fetching only missing or stale days
+
+        `fetch(start_date, end_date)` must return a DataFrame with date, temp_max,
+        temp_min and precipitation columns. If it fails but every day is cached
+        (even if stale), the cached data is served so runs keep working offline.
+        """
+        wanted = [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days + 1)]
+        cached = self.read(latitude, longitude, wanted[0], wanted[-1])
+        
+        refetch = self.days_to_fetch(cached, wanted)
+        if refetch:
+            self.logger.info(f"Weather cache: {len(wanted) - len(refetch)}/{len(wanted)} days cached for "
+                             f"({latitude}, {longitude}), fetching {refetch[0]} to {refetch[-1]}")
+            try:
+                fresh = fetch(date.fromisoformat(refetch[0]), date.fromisoformat(refetch[-1]))
+                self.write(latitude, longitude, fresh)
+                cached = self.read(latitude, longitude, wanted[0], wanted[-1])
+            except Exception as e:
+                if len(cached) < len(wanted):
+                    raise
+                self.logger.warning(f"Weather API unavailable ({e}), serving stale cached data")
+        else:
+            self.logger.info(f"Weather cache: all {len(wanted)} days cached for ({latitude}, {longitude})")
+        
+        self.touch(latitude, longitude, wanted[0], wanted[-1])
+        return cached[['date', 'temp_max', 'temp_min', 'precipitation']].reset_index(drop=True)
+    
+    def days_to_fetch(self, cached, wanted):
+        """Wanted days that are missing, or recent and older than the TTL"""
+        fresh_after = time.time() - self.ttl_seconds
+        settled_before = (date.today() - timedelta(days=self.recent_days)).isoformat()
+        
+        valid = cached[(cached['date'] < settled_before) | (cached['fetched_at'] >= fresh_after)]
+        valid_days = set(valid['date'])
+        
+        return [day for day in wanted if day not in valid_days]
+    
+    def read(self, latitude, longitude, start, end):
+        with self.connect() as conn:
+            return pd.read_sql_query(
+                "SELECT date, temp_max, temp_min, precipitation, fetched_at FROM weather_days "
+                "WHERE latitude = ? AND longitude = ? AND date BETWEEN ? AND ? ORDER BY date",
+                conn, params=(latitude, longitude, start, end)
+            )
+    
+    def write(self, latitude, longitude, df):
+        """Store fetched days, replacing older copies"""
+        now = time.time()
+        rows = [
+            (latitude, longitude, str(row.date), row.temp_max, row.temp_min, row.precipitation, now, now)
+            for row in df.itertuples(index=False)
+        ]
+        
+        with self.lock, self.connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO weather_days VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        
+        self.evict()
+    
+    def touch(self, latitude, longitude, start, end):
+        """Mark days as recently used for LRU eviction"""
+        with self.lock, self.connect() as conn:
+            conn.execute(
+                "UPDATE weather_days SET last_access = ? WHERE latitude = ? AND longitude = ? AND date BETWEEN ? AND ?",
+                (time.time(), latitude, longitude, start, end)
+            )
+    
+    def evict(self):
+        """Drop least recently used days once the cache is over `max_rows`"""
+        with self.lock, self.connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM weather_days").fetchone()[0]
+            excess = count - self.max_rows
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM weather_days WHERE rowid IN "
+                    "(SELECT rowid FROM weather_days ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+                self.logger.info(f"Weather cache: evicted {excess} least recently used days")
+    
+    def clear(self):
+        """Remove everything from the cache"""
+        with self.lock, self.connect() as conn:
+            conn.execute("DELETE FROM weather_days")
\ No newline at end of file
@@ -1,14 +1,86 @@
 #Gets weather data from the api
 
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import logging
 
+# Capital-city coordinates for the countries in the e-commerce data
+COUNTRY_COORDINATES = {
+    'United Kingdom': (51.5074, -0.1278),
+    'France': (48.8566, 2.3522),
+    'Germany': (52.5200, 13.4050),
+    'EIRE': (53.3498, -6.2603),
+    'Spain': (40.4168, -3.7038),
+    'Netherlands': (52.3676, 4.9041),
+    'Belgium': (50.8503, 4.3517),
+    'Switzerland': (46.9480, 7.4474),
+    'Portugal': (38.7223, -9.1393),
+    'Australia': (-35.2809, 149.1300),
+    'Norway': (59.9139, 10.7522),
+    'Italy': (41.9028, 12.4964),
+    'Channel Islands': (49.4542, -2.5360),
+    'Finland': (60.1699, 24.9384),
+    'Cyprus': (35.1856, 33.3823),
+    'Sweden': (59.3293, 18.0686),
+    'Austria': (48.2082, 16.3738),
+    'Denmark': (55.6761, 12.5683),
+    'Japan': (35.6762, 139.6503),
+    'Poland': (52.2297, 21.0122),
+    'USA': (38.9072, -77.0369),
+    'Israel': (31.7683, 35.2137),
+    'Unspecified': (51.5074, -0.1278),
+    'Singapore': (1.3521, 103.8198),
+    'Iceland': (64.1466, -21.9426),
+    'Canada': (45.4215, -75.6972),
+    'Greece': (37.9838, 23.7275),
+    'Malta': (35.8989, 14.5146),
+    'United Arab Emirates': (24.4539, 54.3773),
+    'European Community': (50.8503, 4.3517),
+    'RSA': (-25.7479, 28.2293),
+    'Lebanon': (33.8938, 35.5018),
+    'Lithuania': (54.6872, 25.2797),
+    'Brazil': (-15.7975, -47.8919),
+    'Czech Republic': (50.0755, 14.4378),
+    'Bahrain': (26.2285, 50.5860),
+    'Saudi Arabia': (24.7136, 46.6753)
+}
+
+class RateLimiter:
+    """Allow at most `rate` calls per second across threads"""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_time = 0
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
+
 class WeatherExtractor:
-    def __init__(self, api_key=None):
+    # Responses worth retrying: rate limited or server-side errors
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    # The API returns this many forecast days after today
+    FORECAST_DAYS = 7
+    
+    def __init__(self, api_key=None, base_url="https://api.open-meteo.com/v1/forecast", cache=None):
         self.api_key = api_key  # Not needed for this free API
-        self.base_url = "https://api.open-meteo.com/v1/forecast"
+        self.base_url = base_url
+        self.cache = cache  # Optional WeatherCache, only missing days are requested
         self.logger = logging.getLogger(__name__)
     
     def extract_weather_data(self, latitude=51.5074, longitude=-0.1278, days=7):
@@ -16,37 +88,149 @@ class WeatherExtractor:
         try:
             start_time = datetime.now()
             
-            # What data we want from the API
-            params = {
-                'latitude': latitude,
-                'longitude': longitude,
-                'daily': 'temperature_2m_max,temperature_2m_min,precipitation_sum',
-                'timezone': 'auto',
-                'past_days': days  # How many days back
-            }
-            
             self.logger.info(f"Fetching weather data for coordinates ({latitude}, {longitude})...")
             
-            # Make the API call
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()  # Crash if API call failed
-            
-            data = response.json()  # Convert response to dictionary
+            def get_json(params):
+                # Make the API call
+                response = requests.get(self.base_url, params=params)
+                response.raise_for_status()  # Crash if API call failed
+                return response.json()
             
-            # Turn JSON into a table (DataFrame)
-            df = pd.DataFrame({
-                'date': data['daily']['time'],
-                'temp_max': data['daily']['temperature_2m_max'],
-                'temp_min': data['daily']['temperature_2m_min'],
-                'precipitation': data['daily']['precipitation_sum']
-            })
+            df = self.fetch_daily(latitude, longitude, days, get_json)
             
             # Calculate how long it took
             duration = (datetime.now() - start_time).total_seconds()
             self.logger.info(f"Extracted {len(df)} rows in {duration:.2f} seconds")
             
             return df
-            
+        
         except Exception as e:
             self.logger.error(f"Weather API extraction failed: {str(e)}")
-            raise  # Re-throw the error
\ No newline at end of file
+            raise  # Re-throw the error
+    
+    def extract_weather_multi(self, locations, days=7, max_workers=8, requests_per_second=10,
+                              max_retries=3, backoff_seconds=0.5, timeout=10):
+        """Get weather data for many locations concurrently
+        
+        `locations` is a list of country names (looked up in COUNTRY_COORDINATES),
+        (name, latitude, longitude) tuples or {'name', 'latitude', 'longitude'} dicts.
+        Requests share one pooled session, are rate limited and retried with
+        exponential backoff. Returns one long-format DataFrame with a `location` column.
+        """
+        try:
+            start_time = datetime.now()
+            resolved = [self.resolve_location(location) for location in locations]
+            self.logger.info(f"Fetching weather data for {len(resolved)} locations ({max_workers} workers)...")
+            
+            session = self.create_session(max_workers)
+            limiter = RateLimiter(requests_per_second)
+            
+            def fetch(location):
+                name, latitude, longitude = location
+                get_json = lambda params: self.fetch_with_retry(session, limiter, params, max_retries,
+                                                                backoff_seconds, timeout)
+                df = self.fetch_daily(latitude, longitude, days, get_json)
+                df['location'] = name
+                df['latitude'] = latitude
+                df['longitude'] = longitude
+                return df
+            
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    frames = list(executor.map(fetch, resolved))
+            finally:
+                session.close()
+            
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Extracted {len(df)} rows for {len(frames)} locations in {duration:.2f} seconds")
+            
+            return df
+        
+        except Exception as e:
+            self.logger.error(f"Multi-location weather extraction failed: {str(e)}")
+            raise
+    
+    def fetch_daily(self, latitude, longitude, days, get_json):
+        """Daily weather for one location, going through the cache when there is one"""
+        if self.cache is None:
+            return self.parse_response(get_json(self.build_params(latitude, longitude, days)))
+        
+        # Same window the API returns for past_days, but only missing days are requested
+        start_date = date.today() - timedelta(days=days)
+        end_date = date.today() + timedelta(days=self.FORECAST_DAYS - 1)
+        
+        return self.cache.get_range(
+            latitude, longitude, start_date, end_date,
+            lambda start, end: self.parse_response(get_json(self.build_range_params(latitude, longitude, start, end)))
+        )
+    
+    def build_range_params(self, latitude, longitude, start_date, end_date):
+        """API parameters for an explicit date range"""
+        params = self.build_params(latitude, longitude, 0)
+        del params['past_days']
+        params['start_date'] = start_date.isoformat()
+        params['end_date'] = end_date.isoformat()
+        return params
+    
+    def build_params(self, latitude, longitude, days):
+        """What data we want from the API"""
+        return {
+            'latitude': latitude,
+            'longitude': longitude,
+            'daily': 'temperature_2m_max,temperature_2m_min,precipitation_sum',
+            'timezone': 'auto',
+            'past_days': days  # How many days back
+        }
+    
+    def parse_response(self, data):
+        """Turn JSON into a table (DataFrame)"""
+        return pd.DataFrame({
+            'date': data['daily']['time'],
+            'temp_max': data['daily']['temperature_2m_max'],
+            'temp_min': data['daily']['temperature_2m_min'],
+            'precipitation': data['daily']['precipitation_sum']
+        })
+    
+    def resolve_location(self, location):
+        """Normalize a location to a (name, latitude, longitude) tuple"""
+        if isinstance(location, str):
+            if location not in COUNTRY_COORDINATES:
+                raise ValueError(f"No coordinates known for country '{location}'")
+            return (location, *COUNTRY_COORDINATES[location])
+        
+        if isinstance(location, dict):
+            return (location['name'], location['latitude'], location['longitude'])
+        
+        name, latitude, longitude = location
+        return (name, latitude, longitude)
+    
+    def create_session(self, pool_size):
+        """Session with a connection pool big enough for all worker threads"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def fetch_with_retry(self, session, limiter, params, max_retries, backoff_seconds, timeout):
+        """GET the API, retrying timeouts, connection errors and 429/5xx with exponential backoff"""
+        for attempt in range(max_retries + 1):
+            limiter.wait()
+            try:
+                response = session.get(self.base_url, params=params, timeout=timeout)
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"{response.status_code} from weather API", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            
+            if attempt == max_retries:
+                raise error
+            
+            delay = backoff_seconds * (2 ** attempt)
+            self.logger.warning(f"Weather request for ({params['latitude']}, {params['longitude']}) failed "
+                                f"({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -1,35 +1,336 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, BigInteger, Float, DateTime
 import pandas as pd
 import logging
+import numpy as np
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
+# NULL marker for COPY, so empty strings aren't loaded as NULL
+COPY_NULL = '\\N'
+
+def copy_insert(table, conn, keys, data_iter):
+    """pandas to_sql insert method that streams each chunk through COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([COPY_NULL if value is None else value for value in row] for row in data_iter)
+    buffer.seek(0)
+    
+    columns = ', '.join(f'"{key}"' for key in keys)
+    table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+
 class DatabaseLoader:
-    def __init__(self, connection_string):
-        self.engine = create_engine(connection_string)
+    # SQLite caps the number of bound variables per statement
+    SQLITE_MAX_VARIABLES = 999
+    
+    def __init__(self, connection_string, pool_size=None):
+        # Parallel loads need one pooled connection per worker
+        engine_options = {'pool_size': pool_size, 'max_overflow': 0} if pool_size else {}
+        self.engine = create_engine(connection_string, **engine_options)
         self.logger = logging.getLogger(__name__)
     
-    def load(self, df, table_name, if_exists='append'):
-        """Load data to database table"""
+    def load(self, df, table_name, if_exists='append', method='auto', chunksize=None):
+        """Load data to database table
+        
+        method='copy' streams chunks through PostgreSQL COPY FROM STDIN, 'multi'
+        uses multi-row INSERTs, None uses the driver's executemany. 'auto' picks
+        COPY for PostgreSQL targets and chunked executemany for everything else.
+        """
         try:
             start_time = datetime.now()
-            self.logger.info(f"Loading {len(df)} rows to table '{table_name}'...")
+            method = self.resolve_method(method)
+            chunksize = chunksize or self.default_chunksize(method, len(df.columns))
+            self.logger.info(f"Loading {len(df)} rows to table '{table_name}' (method={method or 'insert'}, chunksize={chunksize})...")
             
-            df.to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+            df.to_sql(table_name, self.engine, if_exists=if_exists, index=False, dtype=self.column_types(df),
+                      method=copy_insert if method == 'copy' else method, chunksize=chunksize)
             
             duration = (datetime.now() - start_time).total_seconds()
+            rows_per_second = len(df) / duration if duration > 0 else None
             self.logger.info(f"Successfully loaded {len(df)} rows in {duration:.2f} seconds")
             
             return {
                 'rows_loaded': len(df),
                 'table_name': table_name,
                 'duration_seconds': duration,
+                'rows_per_second': rows_per_second,
+                'method': method or 'insert',
                 'timestamp': datetime.now().isoformat()
             }
-            
+        
         except Exception as e:
             self.logger.error(f"Load failed: {str(e)}")
             raise
     
+    def load_staged(self, df, table_name, mode='swap', key_columns=None, method='auto'):
+        """Bulk load into a staging table, then publish it to `table_name` in one transaction
+        
+        mode='swap' replaces the target by renaming the staging table over it, so
+        readers see either the old or the new table, never a half-loaded one.
+        mode='upsert' merges staged rows on `key_columns` with INSERT ... ON CONFLICT,
+        only touching rows that are new or changed.
+        """
+        if mode == 'upsert':
+            if not key_columns:
+                raise ValueError("Upsert load needs key_columns")
+            
+            # ON CONFLICT can't update the same key twice in one statement
+            duplicate_keys = df.duplicated(subset=key_columns, keep='last')
+            if duplicate_keys.any():
+                self.logger.warning(f"Dropping {duplicate_keys.sum()} rows with duplicate keys {key_columns} before upsert")
+                df = df[~duplicate_keys]
+        
+        staging_table = self.staging_table_name(table_name)
+        result = self.load(df, staging_table, if_exists='replace', method=method)
+        
+        result.update(self.publish(staging_table, table_name, mode, key_columns))
+        result['table_name'] = table_name
+        return result
+    
+    def load_parallel(self, data, table_name, num_workers=4, publish='swap', key_columns=None,
+                      max_retries=2, method='auto', num_slices=None):
+        """Load slices concurrently into one staging table, then publish it in a single transaction
+        
+        `data` is a DataFrame (split into `num_slices`, default `num_workers`) or an
+        iterable of DataFrame chunks. At most `num_workers` slices load at once, each
+        in its own transaction, and a failed slice is retried up to `max_retries`
+        times. `publish` is 'swap', 'upsert' or 'append' (see publish).
+        """
+        try:
+            start_time = datetime.now()
+            
+            if isinstance(data, pd.DataFrame):
+                if publish == 'upsert' and key_columns:
+                    data = data.drop_duplicates(subset=key_columns, keep='last')
+                slices = self.split_frame(data, num_slices or num_workers)
+            else:
+                slices = iter(data)
+            
+            first_slice = next(slices, None)
+            if first_slice is None:
+                raise ValueError("Nothing to load")
+            
+            # Create the staging table once so workers only ever append
+            staging_table = self.staging_table_name(table_name)
+            first_slice.head(0).to_sql(staging_table, self.engine, if_exists='replace', index=False,
+                                       dtype=self.column_types(first_slice))
+            
+            self.logger.info(f"Loading slices into '{staging_table}' with {num_workers} workers...")
+            
+            rows_loaded = 0
+            slice_count = 0
+            retries = 0
+            
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                pending = set()
+                
+                for slice_number, df in enumerate(self.chain_first(first_slice, slices)):
+                    # Bound in-flight slices so a chunk stream isn't read into memory all at once
+                    if len(pending) >= num_workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            rows, attempts = future.result()
+                            rows_loaded += rows
+                            retries += attempts - 1
+                    
+                    pending.add(executor.submit(self.load_slice, df, staging_table, slice_number, max_retries, method))
+                    slice_count += 1
+                
+                for future in pending:
+                    rows, attempts = future.result()
+                    rows_loaded += rows
+                    retries += attempts - 1
+            
+            load_duration = (datetime.now() - start_time).total_seconds()
+            result = self.publish(staging_table, table_name, publish, key_columns)
+            duration = (datetime.now() - start_time).total_seconds()
+            
+            self.logger.info(f"Loaded {rows_loaded} rows in {slice_count} slices ({retries} retries) in {duration:.2f} seconds")
+            
+            result.update({
+                'rows_loaded': rows_loaded,
+                'table_name': table_name,
+                'duration_seconds': duration,
+                'rows_per_second': rows_loaded / load_duration if load_duration > 0 else None,
+                'method': self.resolve_method(method) or 'insert',
+                'workers': num_workers,
+                'slices': slice_count,
+                'retries': retries,
+                'timestamp': datetime.now().isoformat()
+            })
+            return result
+        
+        except Exception as e:
+            self.logger.error(f"Parallel load failed: {str(e)}")
+            raise
+    
+    def split_frame(self, df, num_slices):
+        """Yield `num_slices` row slices of a DataFrame without copying it"""
+        for positions in np.array_split(np.arange(len(df)), max(1, min(num_slices, len(df)))):
+            if len(positions):
+                yield df.iloc[positions[0]:positions[-1] + 1]
+    
+    def chain_first(self, first, rest):
+        yield first
+        yield from rest
+    
+    def load_slice(self, df, staging_table, slice_number, max_retries, method):
+        """Append one slice to staging, retrying on failure; each attempt is one transaction"""
+        for attempt in range(1, max_retries + 2):
+            try:
+                self.load(df, staging_table, if_exists='append', method=method)
+                return len(df), attempt
+            except Exception as e:
+                if attempt > max_retries:
+                    raise
+                delay = 0.5 * (2 ** (attempt - 1))
+                self.logger.warning(f"Slice {slice_number} failed ({e}), retry {attempt}/{max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def staging_table_name(self, table_name):
+        return f"{table_name}_staging"
+    
+    def publish(self, staging_table, table_name, mode='swap', key_columns=None):
+        """Move a loaded staging table into place atomically"""
+        start_time = datetime.now()
+        
+        with self.engine.begin() as conn:
+            if mode == 'swap':
+                rows_changed = self.swap_tables(conn, staging_table, table_name)
+            elif mode == 'upsert':
+                rows_changed = self.upsert_from_staging(conn, staging_table, table_name, key_columns)
+            elif mode == 'append':
+                rows_changed = self.append_from_staging(conn, staging_table, table_name)
+            else:
+                raise ValueError(f"Unknown publish mode: {mode}")
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        self.logger.info(f"Published '{staging_table}' to '{table_name}' ({mode}): {rows_changed} rows changed in {duration:.2f} seconds")
+        
+        return {
+            'load_mode': mode,
+            'rows_changed': rows_changed,
+            'publish_seconds': duration
+        }
+    
+    def swap_tables(self, conn, staging_table, table_name):
+        """Rename staging over the target inside the caller's transaction"""
+        old_table = f"{table_name}_old"
+        
+        conn.execute(text(f'DROP TABLE IF EXISTS "{old_table}"'))
+        if inspect(conn).has_table(table_name):
+            conn.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{old_table}"'))
+        conn.execute(text(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"'))
+        conn.execute(text(f'DROP TABLE IF EXISTS "{old_table}"'))
+        
+        return conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
+    
+    def append_from_staging(self, conn, staging_table, table_name):
+        """Copy all staged rows into the target (or rename staging if there's no target yet)"""
+        if not inspect(conn).has_table(table_name):
+            return self.swap_tables(conn, staging_table, table_name)
+        
+        columns = ', '.join(f'"{col["name"]}"' for col in inspect(conn).get_columns(staging_table))
+        result = conn.execute(text(f'INSERT INTO "{table_name}" ({columns}) SELECT {columns} FROM "{staging_table}"'))
+        conn.execute(text(f'DROP TABLE "{staging_table}"'))
+        return result.rowcount
+    
+    def upsert_from_staging(self, conn, staging_table, table_name, key_columns):
+        """INSERT ... ON CONFLICT from staging, skipping rows that didn't change"""
+        columns = [col['name'] for col in inspect(conn).get_columns(staging_table)]
+        value_columns = [col for col in columns if col not in key_columns]
+        
+        # First load creates an empty copy of the staging table
+        if not inspect(conn).has_table(table_name):
+            conn.execute(text(f'CREATE TABLE "{table_name}" AS SELECT * FROM "{staging_table}" WHERE 1 = 0'))
+        
+        key_list = ', '.join(f'"{col}"' for col in key_columns)
+        index_name = f"ux_{table_name}_key"
+        
+        # A table loaded before upserts were enabled may already hold duplicate keys
+        if index_name not in [index['name'] for index in inspect(conn).get_indexes(table_name)]:
+            duplicate = conn.execute(text(
+                f'SELECT 1 FROM "{table_name}" GROUP BY {key_list} HAVING COUNT(*) > 1 LIMIT 1'
+            )).fetchone()
+            if duplicate:
+                raise ValueError(f"Table '{table_name}' already has duplicate {key_columns} keys, "
+                                 f"drop it before switching to upsert loads")
+            conn.execute(text(f'CREATE UNIQUE INDEX "{index_name}" ON "{table_name}" ({key_list})'))
+        
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        if value_columns:
+            distinct = 'IS DISTINCT FROM' if self.engine.dialect.name == 'postgresql' else 'IS NOT'
+            updates = ', '.join(f'"{col}" = EXCLUDED."{col}"' for col in value_columns)
+            current = ', '.join(f'"{table_name}"."{col}"' for col in value_columns)
+            incoming = ', '.join(f'EXCLUDED."{col}"' for col in value_columns)
+            conflict_action = f"DO UPDATE SET {updates} WHERE ({current}) {distinct} ({incoming})"
+        else:
+            conflict_action = "DO NOTHING"
+        
+        # WHERE true keeps SQLite from reading ON CONFLICT as part of the SELECT
+        result = conn.execute(text(
+            f'INSERT INTO "{table_name}" ({column_list}) SELECT {column_list} FROM "{staging_table}" WHERE true '
+            f'ON CONFLICT ({key_list}) {conflict_action}'
+        ))
+        conn.execute(text(f'DROP TABLE "{staging_table}"'))
+        
+        return result.rowcount
+    
+    def column_types(self, df):
+        """SQL types for categorical columns, which pandas would otherwise always create as TEXT"""
+        types = {}
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                kind = df[col].cat.categories.dtype.kind
+                if kind in 'iu':
+                    types[col] = BigInteger()
+                elif kind == 'f':
+                    types[col] = Float(precision=53)
+                elif kind == 'M':
+                    types[col] = DateTime()
+        
+        return types or None
+    
+    def resolve_method(self, method):
+        """Pick the fastest insert method the target database supports"""
+        # executemany beats multi-row INSERT on SQLite and psycopg2, so it's the fallback
+        if method == 'auto':
+            return 'copy' if self.engine.dialect.name == 'postgresql' else None
+        
+        if method == 'copy' and self.engine.dialect.name != 'postgresql':
+            self.logger.warning(f"COPY is not supported by {self.engine.dialect.name}, falling back to executemany")
+            return None
+        
+        return method
+    
+    def default_chunksize(self, method, column_count):
+        """Rows per chunk: large for COPY, bounded by the parameter limit for multi-row INSERT"""
+        if method == 'copy':
+            return 50000
+        if method == 'multi' and self.engine.dialect.name == 'sqlite':
+            return max(1, self.SQLITE_MAX_VARIABLES // max(column_count, 1))
+        if method == 'multi':
+            return 1000
+        return 10000
+    
+    def read_range(self, table_name, column, low, high, columns=None):
+        """Rows of a table with `column` between low and high, or None if the table doesn't exist yet
+        
+        Reads only `columns` if given.
+        """
+        select = ', '.join(columns) if columns else '*'
+        with self.engine.connect() as conn:
+            if not inspect(conn).has_table(table_name):
+                return None
+            
+            return pd.read_sql(text(f"SELECT {select} FROM {table_name} WHERE {column} BETWEEN :low AND :high"),
+                               conn, params={'low': low, 'high': high})
+    
     def verify_load(self, table_name):
         """Verify data was loaded successfully"""
         query = f"SELECT COUNT(*) as count FROM {table_name}"
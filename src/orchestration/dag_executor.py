@@ -0,0 +1,231 @@
+#Runs pipeline tasks concurrently as their dependencies finish, and chunked stages over bounded queues
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+import threading
+import queue
+import time
+import logging
+
+class DAGExecutor:
+    """Runs named tasks on a thread pool, each as soon as the tasks it depends on are done
+    
+    A task's function gets the results of its dependencies as arguments, in
+    the order they were listed. Ready tasks start in the order they were
+    added, so with max_workers=1 the tasks run one after another in that
+    order. After a failure no new tasks start; the ones already running
+    finish and the first error is raised.
+    """
+    
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.stats = {}
+        self.logger = logging.getLogger(__name__)
+    
+    def add(self, name, func, depends_on=()):
+        """Add a task; dependencies have to be added first, which keeps the graph acyclic"""
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' was already added")
+        unknown = [dep for dep in depends_on if dep not in self.tasks]
+        if unknown:
+            raise ValueError(f"Task '{name}' depends on unknown tasks {unknown}")
+        
+        self.tasks[name] = (func, list(depends_on))
+        return name
+    
+    def run(self):
+        """Run every task and return {name: result}"""
+        start_time = datetime.now()
+        results = {}
+        seconds = {}
+        pending = list(self.tasks)
+        running = {}
+        error = None
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if error is None:
+                    for name in list(pending):
+                        if len(running) >= self.max_workers:
+                            break
+                        func, depends_on = self.tasks[name]
+                        if all(dep in results for dep in depends_on):
+                            pending.remove(name)
+                            running[pool.submit(self.run_task, name, func, [results[dep] for dep in depends_on], seconds)] = name
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Task '{name}' failed: {e}")
+                        error = error or e
+        
+        self.record_stats(start_time, seconds)
+        if error is not None:
+            raise error
+        return results
+    
+    def run_task(self, name, func, args, seconds):
+        start = time.perf_counter()
+        self.logger.info(f"Task '{name}' started")
+        try:
+            return func(*args)
+        finally:
+            seconds[name] = time.perf_counter() - start
+            self.logger.info(f"Task '{name}' finished in {seconds[name]:.2f} seconds")
+    
+    def record_stats(self, start_time, seconds):
+        """Wall time against the summed task time on self.stats"""
+        self.stats = {'workers': self.max_workers, 'tasks': seconds, **timing_stats(start_time, seconds)}
+        
+        self.logger.info(f"Ran {len(seconds)} tasks in {self.stats['duration_seconds']:.2f} seconds "
+                         f"({self.stats['busy_seconds']:.2f}s of task time, {self.max_workers} workers)")
+
+class StageRunner:
+    """Feeds items (e.g. chunks) through a chain of stages
+    
+    With `concurrent` each stage, and reading the source, gets a thread and
+    neighbouring stages are joined by queues of `queue_size` items: stage 2
+    works on item N while stage 3 handles item N-1, and a slow stage holds
+    back the ones before it instead of letting items pile up in memory. Items
+    pass every stage in source order. Without `concurrent` it is a plain loop.
+    """
+    
+    def __init__(self, stages, queue_size=2, concurrent=True):
+        # (name, function) pairs; each function gets the previous stage's output
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.concurrent = concurrent
+        self.stats = {}
+        self.logger = logging.getLogger(__name__)
+    
+    def run(self, source):
+        """Push every item of `source` through the stages, return how many went through"""
+        start_time = datetime.now()
+        seconds = {name: 0.0 for name, _ in self.stages}
+        
+        if not self.concurrent:
+            items = 0
+            for item in source:
+                for name, func in self.stages:
+                    stage_start = time.perf_counter()
+                    item = func(item)
+                    seconds[name] += time.perf_counter() - stage_start
+                items += 1
+            self.record_stats(start_time, seconds, items)
+            return items
+        
+        stop = threading.Event()
+        errors = []
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        counts = []
+        
+        threads = [threading.Thread(target=self.feed, args=(source, queues[0], stop, errors), name='stage-source', daemon=True)]
+        for i, (name, func) in enumerate(self.stages):
+            output = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(target=self.work, args=(name, func, queues[i], output, stop, errors, seconds, counts),
+                                            name=f"stage-{name}", daemon=True))
+        
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        items = counts[0] if counts else 0
+        self.record_stats(start_time, seconds, items)
+        if errors:
+            raise errors[0]
+        return items
+    
+    def feed(self, source, output, stop, errors):
+        """Source thread: put each item on the first queue, then the end marker"""
+        try:
+            for item in source:
+                if not self.put(output, item, stop):
+                    break
+            else:
+                self.put(output, END, stop)
+        except Exception as e:
+            self.fail(e, 'source', stop, errors)
+        finally:
+            # A generator left halfway gets to release its cursor now, not when it is collected
+            if hasattr(source, 'close'):
+                source.close()
+    
+    def work(self, name, func, input, output, stop, errors, seconds, counts):
+        """Stage thread: apply func to each item and pass it on until the end marker"""
+        items = 0
+        while True:
+            item = self.get(input, stop)
+            if item is None:
+                return
+            if item is END:
+                break
+            
+            try:
+                stage_start = time.perf_counter()
+                item = func(item)
+                seconds[name] += time.perf_counter() - stage_start
+            except Exception as e:
+                self.fail(e, name, stop, errors)
+                return
+            
+            items += 1
+            if output is not None and not self.put(output, item, stop):
+                return
+        
+        if output is not None:
+            self.put(output, END, stop)
+        else:
+            counts.append(items)
+    
+    def put(self, output, item, stop):
+        """Block until there is room (False if the run was stopped meanwhile)"""
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def get(self, input, stop):
+        """Block until there is an item (None if the run was stopped meanwhile)"""
+        while not stop.is_set():
+            try:
+                return input.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+    
+    def fail(self, error, name, stop, errors):
+        """Stop every stage; the first error is re-raised by run()"""
+        self.logger.error(f"Stage '{name}' failed: {error}")
+        errors.append(error)
+        stop.set()
+    
+    def record_stats(self, start_time, seconds, items):
+        """Wall time against the summed stage time on self.stats"""
+        self.stats = {'items': items, 'stages': seconds, **timing_stats(start_time, seconds)}
+        
+        self.logger.info(f"Staged {items} items in {self.stats['duration_seconds']:.2f} seconds: "
+                         + ", ".join(f"{name} {stage_seconds:.2f}s" for name, stage_seconds in seconds.items()))
+
+def timing_stats(start_time, seconds):
+    """Wall time since start_time, the summed `seconds` of the tasks or stages, and how far they overlapped"""
+    duration = (datetime.now() - start_time).total_seconds()
+    busy_seconds = sum(seconds.values())
+    return {
+        'duration_seconds': duration,
+        'busy_seconds': busy_seconds,
+        'overlap': busy_seconds / duration if duration > 0 else None
+    }
+
+# Marks the end of the items on a stage queue
+END = object()
\ No newline at end of file
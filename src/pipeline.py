@@ -1,21 +1,98 @@
-from extractors.postgres_extractor import PostgresExtractor
+from extractors.postgres_extractor import PostgresExtractor, RAW_TRANSACTIONS_DTYPES, arrow_text_dtypes
 from extractors.weather_extractor import WeatherExtractor
+from extractors.weather_cache import WeatherCache
+from extractors.query_builder import QueryBuilder
 from transformers.data_cleaner import DataCleaner
 from transformers.schema_mapper import SchemaMapper
+from transformers.dtype_compactor import DtypeCompactor
+from transformers.schema_inference import SchemaInferrer
+from transformers.quantile_sketch import QuantileSketch
+from transformers.dedup_index import DedupIndex
+from transformers.sales_weather_enricher import SalesWeatherEnricher
+from transformers.parallel_transform import ParallelTransformExecutor
+from transformers.engines import get_engine
 from loaders.database_loader import DatabaseLoader
 from quality.validators import DataQualityValidator
+from quality.accumulators import QualityAccumulator
+from orchestration.dag_executor import DAGExecutor, StageRunner
+from state.watermark_store import WatermarkStore
+from state.checkpoint_store import CheckpointStore
 from dotenv import load_dotenv
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
 import json
+import pandas as pd
+
+DEFAULT_CONFIG = {
+    'chunksize': 50000,  # Rows per chunk in streaming mode
+    'source_table': 'raw_transactions',
+    'watermark_column': 'InvoiceDate',  # High-water mark column for incremental runs
+    'critical_columns': ['InvoiceNo', 'StockCode'],
+    'outlier_columns': ['Quantity', 'UnitPrice'],
+    'outlier_sketch': True,  # Streaming: one set of IQR bounds for all chunks, from a sketch pre-pass
+    'outlier_sketch_accuracy': 0.005,  # Rank error of the sketched quartiles
+    'dedup_index_path': None,  # Directory for persistent dedup indexes, incremental runs then drop rows loaded before (and catch late rows at the watermark)
+    'dedup_key_columns': None,  # Columns that identify a duplicate, None = the whole row
+    'dedup_memory_limit': 5000000,  # Fingerprints held in memory before spilling to disk
+    'fused_cleaning': True,  # Single-pass cleaning plan (same output as the step-by-step cleaner)
+    'engine': 'pandas',  # Runs cleaning, mapping and quality counts: 'pandas', 'polars' or 'duckdb' (same output)
+    'transform_workers': 1,  # >1 cleans and maps partitions on a process pool (same output, pandas engine only)
+    'transform_partitions': None,  # Partitions for the process pool, None = one per worker
+    'quality_sample_size': None,  # Pre-transform checks on a sample this size (full counts only near thresholds); None checks every row
+    'quality_confidence': 0.95,  # Confidence level of the sampled quality intervals
+    'quality_value_ranges': {'quantity': (0, 10000), 'unit_price': (0, 1000)},  # Expected ranges, checked where the column exists
+    'quality_profile_path': None,  # Directory for the target table's quality profile, updated from each run's loaded rows
+    'schema_cache_path': 'data/cache/schemas.json',  # Inferred numeric/text columns per source; None re-infers every run
+    'schema_sample_size': 10000,  # Rows sampled to infer a schema
+    'text_engine': 'python',  # 'python' (object strings) or 'pyarrow' (Arrow-backed string columns)
+    'compact_dtypes': False,  # Categoricals and downcast numerics from extraction through to load
+    'project_columns': True,  # Only extract the columns SchemaMapper uses
+    'pushdown_filters': False,  # Filter NULL critical columns in the source query (drops them even below the cleaner's 5% rule and hides them from the pre-transform checks)
+    'date_from': None,  # Optional InvoiceDate window pushed into the source query
+    'date_to': None,
+    'extract_partitions': 1,  # >1 extracts partitions concurrently over separate connections
+    'partition_column': 'InvoiceNo',
+    'partition_strategy': 'hash',  # 'hash' or 'range'
+    'extract_method': 'read_sql',  # 'read_sql' or 'copy' (PostgreSQL COPY TO STDOUT)
+    'weather_days': 30,
+    'weather_locations': None,  # Countries/coordinates to fetch concurrently; None = London only
+    'weather_workers': 8,
+    'weather_cache_path': 'data/cache/weather_cache.sqlite',  # None disables the cache
+    'weather_cache_ttl_hours': 6,
+    'load_mode': 'replace',  # 'replace', 'swap' (staging + atomic rename) or 'upsert' (staging + ON CONFLICT)
+    'load_keys': {
+        'ecommerce_transactions': ['transaction_id', 'product_code'],
+        'weather_data': ['date', 'location'],  # location only exists for multi-location weather
+        'daily_sales_weather': ['sale_date', 'country']
+    },
+    'sales_weather_table': 'daily_sales_weather',  # Day x country sales joined with weather; None skips it
+    'load_workers': 1,  # >1 loads e-commerce slices concurrently into staging, then publishes once
+    'concurrent_stages': False,  # Run independent stages (e-commerce vs weather, load vs checks) at the same time
+    'stage_queue_size': 2,  # Streaming with concurrent_stages: chunks held between extract, transform and load
+    'checkpoint_path': None,  # Directory for batch runs' stage outputs, a failed run then resume()s from them; None disables
+    'checkpoint_retention_runs': 3,  # Failed runs whose checkpoints are kept
+    'checkpoint_max_age_hours': 24,  # Checkpoints older than this are removed
+}
+
+# Settings that only change how data is loaded or scheduled, so checkpoints made under others still apply
+LOAD_CONFIG_KEYS = ['load_mode', 'load_keys', 'load_workers', 'sales_weather_table', 'quality_profile_path', 'concurrent_stages',
+                    'stage_queue_size', 'checkpoint_path', 'checkpoint_retention_runs', 'checkpoint_max_age_hours']
+
+# Threads for concurrent stages, enough for the widest point of the stage graph
+STAGE_WORKERS = 4
 
 class ETLPipeline:
-    def __init__(self):
+    def __init__(self, config=None):
         load_dotenv()
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
         self.setup_logging()
         self.setup_connections()
-        
+        # One validator for every stage, it keeps the last profile (and duplicate mask) for the transform
+        engine = get_engine(self.config['engine']) if self.config['engine'] != 'pandas' else None
+        self.validator = DataQualityValidator(engine=engine)
+    
     def setup_logging(self):
         """Configure logging"""
         log_file = f"data/logs/pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -29,7 +106,7 @@ class ETLPipeline:
             ]
         )
         self.logger = logging.getLogger(__name__)
-        
+    
     def setup_connections(self):
         """Setup database connections"""
         self.source_conn = (
@@ -42,8 +119,18 @@ class ETLPipeline:
             f"{os.getenv('TARGET_DB_HOST')}:{os.getenv('TARGET_DB_PORT')}/{os.getenv('TARGET_DB_NAME')}"
         )
     
-    def run(self, run_id=None):
-        """Execute the full ETL pipeline"""
+    def run(self, run_id=None, streaming=False, incremental=False):
+        """Execute the full ETL pipeline
+        
+        With streaming=True the e-commerce data is extracted in chunks and each
+        chunk is cleaned, mapped, validated and loaded before the next is fetched.
+        With incremental=True only rows past the stored watermark are extracted
+        and they are appended to the target instead of replacing it (the first
+        incremental run, with no watermark yet, does a full reload).
+        With checkpoint_path set, each stage's output of a batch run is kept
+        until the run succeeds; running a failed run_id again (see resume())
+        reuses them instead of redoing those stages.
+        """
         if not run_id:
             run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
         
@@ -52,104 +139,672 @@ class ETLPipeline:
         self.logger.info(f"="*50)
         
         pipeline_start = datetime.now()
+        self.transform_stats = None
+        self.checkpoints = None
+        
+        if streaming:
+            return self.run_streaming(run_id, pipeline_start, incremental)
         
+        delta_quality = None
         try:
+            since = self.load_watermark() if incremental else None
+            if self.config['checkpoint_path']:
+                self.checkpoints = self.get_checkpoint_store()
+                self.checkpoints.cleanup(keep=[run_id])
+                # A resumed run extracts from where the failed attempt did
+                since = self.checkpoints.start_run(run_id, {'incremental': incremental, 'since': since})['since']
+            
             # EXTRACT
             self.logger.info("PHASE 1: EXTRACTION")
-            ecom_df, weather_df = self.extract_data()
+            ecom_df, weather_df = self.extract_data(since, run_id)
+            
+            if ecom_df.empty:
+                result = self.finish_without_new_rows(run_id, pipeline_start, weather_df)
+                self.remove_checkpoints(run_id)
+                return result
             
-            # PRE-TRANSFORM QUALITY CHECK
-            self.logger.info("PHASE 2: PRE-TRANSFORM QUALITY CHECK")
-            pre_quality = self.validate_data(ecom_df, "pre_transform")
+            # QUALITY CHECKS, TRANSFORM AND LOAD
+            self.logger.info("PHASE 2: QUALITY CHECKS, TRANSFORMATION AND LOADING")
+            dedup_index = self.open_dedup_index(since) if self.config['dedup_index_path'] else None
+            enricher = SalesWeatherEnricher() if self.config['sales_weather_table'] else None
+            delta_quality = self.quality_accumulator() if self.config['quality_profile_path'] else None
+            append = since is not None
             
-            # TRANSFORM
-            self.logger.info("PHASE 3: TRANSFORMATION")
-            ecom_clean, weather_clean = self.transform_data(ecom_df, weather_df)
+            # A mask left by an earlier run doesn't fit this extract (pre-validation may come from a checkpoint)
+            self.validator.duplicated = None
             
-            # POST-TRANSFORM QUALITY CHECK
-            self.logger.info("PHASE 4: POST-TRANSFORM QUALITY CHECK")
-            post_quality = self.validate_data(ecom_clean, "post_transform")
+            # Weather is transformed and loaded without waiting for the e-commerce transform,
+            # and the e-commerce load overlaps the post-transform checks
+            dag = self.stage_executor()
+            dag.add('pre_validate', lambda: self.checkpointed(
+                run_id, 'pre_validate', lambda: self.validate_data(ecom_df, "pre_transform", sample=True), frame=False
+            ))
+            # Pre-transform validation already found the duplicate rows
+            dag.add('transform_ecommerce', lambda pre_quality: self.checkpointed(
+                run_id, 'mapped_ecommerce',
+                lambda: self.transform_ecommerce(ecom_df, dedup_index=dedup_index, enricher=enricher,
+                                                 duplicated=self.validator.duplicated if dedup_index is None else None, quality=delta_quality),
+                restore=lambda ecom_clean: self.restore_transform(ecom_df, ecom_clean, dedup_index, enricher, delta_quality)
+            ), depends_on=['pre_validate'])
+            dag.add('transform_weather', lambda: self.checkpointed(run_id, 'mapped_weather', lambda: self.transform_weather(weather_df)))
+            # A delta whose rows were all loaded before (e.g. re-extracted at the watermark) has nothing to validate or load
+            dag.add('post_validate', lambda ecom_clean: None if append and ecom_clean.empty else self.checkpointed(
+                run_id, 'post_validate', lambda: self.validate_data(ecom_clean, "post_transform"), frame=False
+            ), depends_on=['transform_ecommerce'])
+            # Finished loads are skipped on resume, so an appended delta isn't appended twice
+            dag.add('load_ecommerce', lambda ecom_clean: self.no_rows_loaded() if append and ecom_clean.empty else self.checkpointed(
+                run_id, 'load_ecommerce', lambda: self.load_ecommerce(ecom_clean, append), frame=False
+            ), depends_on=['transform_ecommerce'])
+            dag.add('load_weather', lambda weather_clean: self.checkpointed(
+                run_id, 'load_weather', lambda: self.load_table(DatabaseLoader(self.target_conn), weather_clean, 'weather_data'), frame=False
+            ), depends_on=['transform_weather'])
+            if enricher is not None:
+                # The enricher is filled by the e-commerce transform, and appended days count their orders from the loaded rows
+                dag.add('load_sales_weather', lambda ecom_result, weather_clean: self.checkpointed(
+                    run_id, 'load_sales_weather',
+                    lambda: self.load_sales_weather(DatabaseLoader(self.target_conn), enricher, weather_clean, append), frame=False
+                ), depends_on=['load_ecommerce', 'transform_weather'])
+            results = dag.run()
             
-            # LOAD
-            self.logger.info("PHASE 5: LOADING")
-            load_results = self.load_data(ecom_clean, weather_clean)
+            pre_quality, post_quality = results['pre_validate'], results['post_validate']
+            if post_quality is None:
+                self.logger.info("No new e-commerce rows past the ones already loaded")
+                pre_quality = None
+            load_results = {
+                'ecommerce': results['load_ecommerce'],
+                'weather': results['load_weather']
+            }
+            if enricher is not None:
+                load_results['sales_weather'] = results['load_sales_weather']
+            
+            if dedup_index is not None:
+                dedup_index.save()
+            if delta_quality is not None and post_quality is not None:
+                self.update_table_quality(delta_quality, append)
+            if incremental:
+                self.save_watermark(self.max_watermark(ecom_df))
+            self.remove_checkpoints(run_id)
             
             # SUMMARY
             duration = (datetime.now() - pipeline_start).total_seconds()
-            self.log_summary(run_id, "SUCCESS", duration, pre_quality, post_quality, load_results)
+            self.log_summary(run_id, "SUCCESS", duration, pre_quality, post_quality, load_results, self.transform_stats)
             
             return {
                 'status': 'SUCCESS',
                 'run_id': run_id,
                 'duration': duration,
-                'quality_score': post_quality['score']
+                'quality_score': post_quality['score'] if post_quality else None
             }
+        
+        except Exception as e:
+            duration = (datetime.now() - pipeline_start).total_seconds()
+            self.logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
+            self.log_summary(run_id, "FAILED", duration, error=str(e))
+            raise
+        
+        finally:
+            if delta_quality is not None:
+                delta_quality.close()
+    
+    def resume(self, run_id):
+        """Run a failed batch run again, skipping the stages its checkpoints cover"""
+        if not self.config['checkpoint_path']:
+            raise ValueError("resume() needs checkpoint_path to be set")
+        
+        info = self.get_checkpoint_store().run_info(run_id)
+        if info is None:
+            raise ValueError(f"No checkpoints for run '{run_id}' in {self.config['checkpoint_path']}")
+        
+        return self.run(run_id, incremental=info['incremental'])
+    
+    def run_streaming(self, run_id, pipeline_start, incremental=False):
+        """Execute the pipeline one e-commerce chunk at a time
+        
+        With concurrent_stages the chunks are extracted, transformed and loaded
+        on separate threads (loading chunk N while chunk N+1 is transformed),
+        and weather runs alongside them.
+        """
+        dedup_index = None
+        # Quality is accumulated chunk by chunk and scored once over all rows
+        pre_quality_stats = self.quality_accumulator()
+        post_quality_stats = self.quality_accumulator()
+        try:
+            enricher = SalesWeatherEnricher() if self.config['sales_weather_table'] else None
+            
+            since = self.load_watermark() if incremental else None
+            
+            # Duplicates are dropped (and counted) across chunks, not just within each one
+            dedup_index = self.open_dedup_index(since)
+            
+            # Weather data is small, so it goes through the normal path
+            self.logger.info("PHASE 1: WEATHER AND STREAMING E-COMMERCE EXTRACT/TRANSFORM/LOAD")
+            dag = self.stage_executor()
+            dag.add('extract_weather', lambda: self.compact(self.extract_weather(), 'weather'))
+            dag.add('transform_weather', self.transform_weather, depends_on=['extract_weather'])
+            dag.add('stream_ecommerce', lambda: self.stream_ecommerce(
+                since, dedup_index, enricher, pre_quality_stats, post_quality_stats, incremental
+            ))
+            dag.add('load_weather', lambda weather_clean: self.load_table(DatabaseLoader(self.target_conn), weather_clean, 'weather_data'),
+                    depends_on=['transform_weather'])
+            if enricher is not None:
+                # The enricher is filled as the chunks are transformed
+                dag.add('load_sales_weather', lambda streamed, weather_clean: self.load_sales_weather(
+                    DatabaseLoader(self.target_conn), enricher, weather_clean, append=since is not None
+                ), depends_on=['stream_ecommerce', 'transform_weather'])
+            results = dag.run()
+            
+            ecom_result, watermark = results['stream_ecommerce']
+            weather_result = results['load_weather']
+            sales_weather_result = results.get('load_sales_weather')
+            
+            # Only move the watermark (and remember loaded rows) once everything up to it is loaded
+            dedup_index.save()
+            if self.config['quality_profile_path'] and ecom_result is not None:
+                self.update_table_quality(post_quality_stats, append=since is not None)
+            if incremental and watermark is not None:
+                self.save_watermark(watermark)
+            
+            load_results = {
+                'ecommerce': ecom_result or self.no_rows_loaded(),
+                'weather': weather_result
+            }
+            if sales_weather_result is not None:
+                load_results['sales_weather'] = sales_weather_result
+            
+            # Without new rows (e.g. only rows re-extracted at the watermark) there is nothing to score
+            pre_quality, post_quality = None, None
+            if ecom_result is not None:
+                pre_quality = self.validate_accumulated(pre_quality_stats, "pre_transform")
+                post_quality = self.validate_accumulated(post_quality_stats, "post_transform")
+            else:
+                self.logger.info("No new e-commerce rows past the ones already loaded")
+            
+            duration = (datetime.now() - pipeline_start).total_seconds()
+            self.log_summary(run_id, "SUCCESS", duration, pre_quality, post_quality, load_results, self.transform_stats)
             
+            return {
+                'status': 'SUCCESS',
+                'run_id': run_id,
+                'duration': duration,
+                'quality_score': post_quality['score'] if post_quality else None
+            }
+        
         except Exception as e:
             duration = (datetime.now() - pipeline_start).total_seconds()
             self.logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
             self.log_summary(run_id, "FAILED", duration, error=str(e))
             raise
+        
+        finally:
+            if dedup_index is not None:
+                dedup_index.close()
+            pre_quality_stats.close()
+            post_quality_stats.close()
     
-    def extract_data(self):
-        """Extract data from all sources"""
+    def stream_ecommerce(self, since, dedup_index, enricher, pre_quality_stats, post_quality_stats, incremental=False):
+        """Extract, transform and load the e-commerce rows chunk by chunk
+        
+        Returns the combined load result (None if there were no new rows) and the
+        latest watermark seen (None unless incremental).
+        """
         pg_extractor = PostgresExtractor(self.source_conn)
-        ecom_df = pg_extractor.extract("SELECT * FROM raw_transactions")
+        loader = DatabaseLoader(self.target_conn)
+        query, params = self.build_source_query(since)
+        
+        # Every chunk is filtered with the same bounds instead of its own quartiles
+        outlier_bounds = None
+        if self.config['outlier_sketch'] and self.config['outlier_columns']:
+            outlier_bounds = self.compute_outlier_bounds(pg_extractor, since)
+        
+        # In swap mode all chunks go to staging and are published together at the end
+        swap_at_end = self.config['load_mode'] == 'swap' and since is None
+        state = {'ecom_result': None, 'watermark': None}
         
-        weather_extractor = WeatherExtractor()
-        weather_df = weather_extractor.extract_weather_data(days=30)
+        def extract():
+            chunks = pg_extractor.extract_chunks(query, self.config['chunksize'], params, dtypes=self.source_dtypes())
+            for chunk_number, chunk in enumerate(chunks, start=1):
+                self.logger.info(f"Processing chunk {chunk_number} ({len(chunk)} rows)")
+                yield self.compact(chunk, 'raw_transactions')
         
-        return ecom_df, weather_df
+        def transform(chunk):
+            pre_quality_stats.update(chunk)
+            if incremental:
+                state['watermark'] = max(filter(None, [state['watermark'], self.max_watermark(chunk)]), default=None)
+            return self.transform_ecommerce(chunk, outlier_bounds, dedup_index, enricher, quality=post_quality_stats)
+        
+        def load(ecom_clean):
+            # Chunks whose rows were all loaded before don't count as the first chunk either
+            if ecom_clean.empty and since is not None:
+                return
+            
+            # First chunk recreates the table (unless appending a delta), the rest append to it
+            first_chunk = state['ecom_result'] is None
+            if swap_at_end:
+                chunk_result = loader.load(ecom_clean, loader.staging_table_name('ecommerce_transactions'),
+                                           if_exists='replace' if first_chunk else 'append')
+            else:
+                chunk_result = self.load_table(loader, ecom_clean, 'ecommerce_transactions',
+                                               append=not first_chunk or since is not None)
+            state['ecom_result'] = self.merge_load_results(state['ecom_result'], chunk_result)
+        
+        # The queues between stages hold at most stage_queue_size chunks each
+        stages = StageRunner([('transform', transform), ('load', load)], self.config['stage_queue_size'],
+                             concurrent=self.config['concurrent_stages'])
+        stages.run(extract())
+        
+        ecom_result = state['ecom_result']
+        if swap_at_end and ecom_result is not None:
+            ecom_result.update(loader.publish(loader.staging_table_name('ecommerce_transactions'), 'ecommerce_transactions', 'swap'))
+            ecom_result['table_name'] = 'ecommerce_transactions'
+        
+        return ecom_result, state['watermark']
     
-    def transform_data(self, ecom_df, weather_df):
-        """Transform and clean data"""
-        cleaner = DataCleaner()
-        mapper = SchemaMapper()
+    def extract_data(self, since=None, run_id=None):
+        """Extract data from all sources (concurrently with concurrent_stages)"""
+        dag = self.stage_executor()
+        dag.add('extract_ecommerce', lambda: self.checkpointed(
+            run_id, 'raw_ecommerce', lambda: self.compact(self.extract_ecommerce(since), 'raw_transactions')
+        ))
+        dag.add('extract_weather', lambda: self.checkpointed(run_id, 'raw_weather', lambda: self.compact(self.extract_weather(), 'weather')))
+        results = dag.run()
+        
+        return results['extract_ecommerce'], results['extract_weather']
+    
+    def extract_ecommerce(self, since=None):
+        """Extract the e-commerce rows, over several connections if extract_partitions > 1"""
+        pg_extractor = PostgresExtractor(self.source_conn)
+        query, params = self.build_source_query(since)
+        method = self.config['extract_method']
+        
+        if self.config['extract_partitions'] > 1:
+            return pg_extractor.extract_partitioned(
+                query,
+                self.config['partition_column'],
+                num_partitions=self.config['extract_partitions'],
+                strategy=self.config['partition_strategy'],
+                params=params,
+                method=method,
+                dtypes=self.source_dtypes()
+            )
+        
+        return pg_extractor.extract(query, params, method=method, dtypes=self.source_dtypes())
+    
+    def extract_weather(self):
+        """Extract weather for London, or concurrently for all configured locations"""
+        cache = None
+        if self.config['weather_cache_path']:
+            cache = WeatherCache(self.config['weather_cache_path'], ttl_hours=self.config['weather_cache_ttl_hours'])
+        
+        weather_extractor = WeatherExtractor(cache=cache)
+        
+        if self.config['weather_locations']:
+            return weather_extractor.extract_weather_multi(
+                self.config['weather_locations'],
+                days=self.config['weather_days'],
+                max_workers=self.config['weather_workers']
+            )
+        
+        return weather_extractor.extract_weather_data(days=self.config['weather_days'])
+    
+    def build_source_query(self, since=None, columns=None):
+        """Build the e-commerce source query and its parameters
+        
+        Projects only the columns the schema mapping reads (or `columns`) and pushes
+        simple filters (NULL critical columns, date window, watermark) into the SQL.
+        """
+        builder = QueryBuilder(self.config['source_table'])
+        
+        if columns:
+            builder.select(columns)
+        elif self.config['project_columns']:
+            builder.select(SchemaMapper().source_columns('ecommerce'))
+        if self.config['pushdown_filters']:
+            builder.where_not_null(self.config['critical_columns'])
+        
+        # CAST handles both text and timestamp columns in the source table
+        builder.where_timestamp_between(self.config['watermark_column'], self.config['date_from'], self.config['date_to'])
+        
+        # Rows can arrive after a run with the watermark's own timestamp, so they are extracted again
+        # when the persistent dedup index can drop the ones already loaded
+        builder.where_timestamp_after(self.config['watermark_column'], since, 'since', inclusive=bool(self.config['dedup_index_path']))
+        
+        query, params = builder.build()
+        self.logger.info(f"Source query: {query}")
+        return query, params
+    
+    def compute_outlier_bounds(self, pg_extractor, since=None):
+        """Stream the outlier columns once through quantile sketches and return their IQR bounds"""
+        start_time = datetime.now()
+        columns = self.config['outlier_columns']
+        query, params = self.build_source_query(since, columns=columns)
+        
+        sketches = {col: QuantileSketch(self.config['outlier_sketch_accuracy']) for col in columns}
+        for chunk in pg_extractor.extract_chunks(query, self.config['chunksize'], params):
+            for col, sketch in sketches.items():
+                sketch.update(pd.to_numeric(chunk[col], errors='coerce'))
         
-        # Clean e-commerce data
-        ecom_clean = cleaner.clean(ecom_df, config={
-            'critical_columns': ['InvoiceNo', 'StockCode'],
-            'outlier_columns': ['Quantity', 'UnitPrice']
-        })
+        bounds = {col: sketch.iqr_bounds() for col, sketch in sketches.items() if sketch.count}
         
-        # Map schemas
-        ecom_mapped = mapper.map_ecommerce_schema(ecom_clean)
-        weather_mapped = mapper.map_weather_schema(weather_df)
+        duration = (datetime.now() - start_time).total_seconds()
+        for col, (lower, upper) in bounds.items():
+            self.logger.info(f"Outlier bounds for '{col}': [{lower:.4g}, {upper:.4g}]")
+        self.logger.info(f"Computed outlier bounds in {duration:.2f} seconds")
         
-        return ecom_mapped, weather_mapped
+        return bounds
     
-    def validate_data(self, df, stage):
-        """Run quality validation"""
-        validator = DataQualityValidator()
+    def source_dtypes(self):
+        """Column types for the e-commerce extract, with Arrow strings for text_engine='pyarrow'"""
+        if self.config['text_engine'] == 'pyarrow':
+            return arrow_text_dtypes(RAW_TRANSACTIONS_DTYPES)
+        if self.config['text_engine'] != 'python':
+            raise ValueError(f"Unknown text engine: {self.config['text_engine']}")
+        
+        return RAW_TRANSACTIONS_DTYPES
+    
+    def compact(self, df, source):
+        """Shrink an extracted frame to its compact dtypes when compact_dtypes is on"""
+        if not self.config['compact_dtypes'] or df.empty:
+            return df
+        
+        return DtypeCompactor().compact(df, source)
+    
+    def open_dedup_index(self, since=None):
+        """Dedup index for this run, persistent under dedup_index_path or kept for the run only"""
+        path = self.config['dedup_index_path']
+        if not path:
+            return DedupIndex(self.config['dedup_key_columns'], self.config['dedup_memory_limit'])
+        
+        index = DedupIndex(self.config['dedup_key_columns'], self.config['dedup_memory_limit'],
+                           path=os.path.join(path, self.config['source_table']))
+        if since is None:
+            # A full reload replaces the target, so rows from earlier runs aren't duplicates anymore
+            index.clear()
+        return index
+    
+    def get_checkpoint_store(self):
+        return CheckpointStore(self.config['checkpoint_path'], self.config['checkpoint_retention_runs'], self.config['checkpoint_max_age_hours'])
+    
+    def checkpoint_fingerprint(self):
+        """Hash of the settings that shape the extracted and transformed data"""
+        settings = {key: value for key, value in self.config.items() if key not in LOAD_CONFIG_KEYS}
+        return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    
+    def checkpointed(self, run_id, stage, func, frame=True, restore=None):
+        """func(), or its checkpointed result from an earlier attempt at this run
+        
+        Frames are checkpointed as Parquet, other results (`frame=False`) as
+        JSON. `restore` is called with a reused result to redo func's side effects.
+        """
+        if self.checkpoints is None:
+            return func()
+        
+        fingerprint = self.checkpoint_fingerprint()
+        saved = self.checkpoints.load(run_id, stage, fingerprint)
+        if saved is not None:
+            result = saved[0] if frame else saved[1]
+            if restore is not None:
+                restore(result)
+            return result
+        
+        result = func()
+        if frame:
+            self.checkpoints.save(run_id, stage, df=result, fingerprint=fingerprint)
+        else:
+            self.checkpoints.save(run_id, stage, meta=result, fingerprint=fingerprint)
+        return result
+    
+    def remove_checkpoints(self, run_id):
+        """Checkpoints are only kept for runs that didn't finish"""
+        if self.checkpoints is not None:
+            self.checkpoints.remove(run_id)
+    
+    def quality_accumulator(self):
+        """Empty QualityAccumulator for this run's rows, spilling fingerprints like the dedup index"""
+        return QualityAccumulator(self.config['quality_value_ranges'], self.config['dedup_memory_limit'])
+    
+    def stage_executor(self):
+        """DAG executor for pipeline stages; one worker (stages in order) unless concurrent_stages"""
+        return DAGExecutor(max_workers=STAGE_WORKERS if self.config['concurrent_stages'] else 1)
+    
+    def get_watermark_store(self):
+        """Watermarks are kept in the target database"""
+        return WatermarkStore(self.target_conn)
+    
+    def load_watermark(self):
+        """Return the stored watermark, or None if this source was never loaded incrementally"""
+        since = self.get_watermark_store().get(self.config['source_table'])
+        if since is None:
+            self.logger.info("No watermark found, running full extraction")
+        elif not self.config['dedup_index_path']:
+            self.logger.warning(f"Rows added with the watermark's timestamp ({since}) after it was saved are skipped; "
+                                f"set dedup_index_path to pick them up")
+        return since
+    
+    def max_watermark(self, df):
+        """Return the highest watermark value in a raw extract"""
+        column = self.config['watermark_column']
+        if df.empty or column not in df.columns:
+            return None
+        
+        latest = pd.to_datetime(df[column]).max()
+        return None if pd.isnull(latest) else latest
+    
+    def save_watermark(self, watermark):
+        """Persist the new high-water mark after a successful load"""
+        if watermark is None:
+            return
+        
+        self.get_watermark_store().set(self.config['source_table'], self.config['watermark_column'], watermark.isoformat())
+    
+    def finish_without_new_rows(self, run_id, pipeline_start, weather_df):
+        """Refresh weather data only when there is nothing new to load"""
+        self.logger.info("No new e-commerce rows since last watermark")
+        
+        loader = DatabaseLoader(self.target_conn)
+        weather_result = self.load_table(loader, self.transform_weather(weather_df), 'weather_data')
+        load_results = {
+            'ecommerce': self.no_rows_loaded(),
+            'weather': weather_result
+        }
+        
+        duration = (datetime.now() - pipeline_start).total_seconds()
+        self.log_summary(run_id, "SUCCESS", duration, load_results=load_results)
+        
+        return {
+            'status': 'SUCCESS',
+            'run_id': run_id,
+            'duration': duration,
+            'quality_score': None
+        }
+    
+    def no_rows_loaded(self):
+        """Load result for an e-commerce run that had no new rows"""
+        return {'rows_loaded': 0, 'table_name': 'ecommerce_transactions'}
+    
+    def transform_ecommerce(self, ecom_df, outlier_bounds=None, dedup_index=None, enricher=None, duplicated=None, quality=None):
+        """Clean and map e-commerce data (and add it to the sales x weather enricher, if given)
+        
+        `duplicated` is ecom_df.duplicated() when validation already computed it.
+        The mapped rows are also added to the `quality` accumulator, if given.
+        """
+        schema_inferrer = None
+        if self.config['schema_cache_path']:
+            schema_inferrer = SchemaInferrer(self.config['schema_cache_path'], self.config['schema_sample_size'])
+        
+        mapper = SchemaMapper()
         
         config = {
-            'null_threshold': 0.05,
-            'required_columns': ['transaction_id', 'transaction_date', 'customer_id'] if 'transaction_id' in df.columns else [],
-            'value_ranges': {
-                'quantity': (0, 10000),
-                'unit_price': (0, 1000)
-            } if 'quantity' in df.columns else {},
-            'min_rows': 100
+            'source': self.config['source_table'],
+            'critical_columns': self.config['critical_columns'],
+            'outlier_columns': self.config['outlier_columns'],
+            'outlier_bounds': outlier_bounds,
+            'fused': self.config['fused_cleaning'],
+            'duplicated': duplicated
         }
         
-        results = validator.run_all_checks(df, config)
+        engine = get_engine(self.config['engine'])
+        if self.config['transform_workers'] > 1:
+            if engine.name != 'pandas':
+                raise ValueError(f"transform_workers only applies to the pandas engine, not {engine.name}")
+            cleaner = DataCleaner(schema_inferrer=schema_inferrer, dedup_index=dedup_index)
+            executor = ParallelTransformExecutor(self.config['transform_workers'], self.config['transform_partitions'])
+            ecom_mapped = executor.transform(ecom_df, cleaner, mapper, config, enricher, quality)
+            self.transform_stats = self.merge_transform_stats(self.transform_stats, executor.stats)
+            return ecom_mapped
+        
+        self.logger.info(f"Cleaning and mapping e-commerce data with the {engine.name} engine")
+        ecom_mapped = engine.transform(ecom_df, config, mapper, 'ecommerce', schema_inferrer, dedup_index)
+        if enricher is not None:
+            enricher.update(ecom_mapped)
+        if quality is not None:
+            quality.update(ecom_mapped)
+        
+        return ecom_mapped
+    
+    def restore_transform(self, ecom_df, ecom_mapped, dedup_index=None, enricher=None, quality=None):
+        """Leave the dedup index, enricher and quality accumulator as transform_ecommerce would have"""
+        if dedup_index is not None:
+            # The index marks the raw rows, like the cleaner does
+            dedup_index.mark(ecom_df)
+        if enricher is not None:
+            enricher.update(ecom_mapped)
+        if quality is not None:
+            quality.update(ecom_mapped)
+    
+    def transform_weather(self, weather_df):
+        """Map weather data"""
+        mapper = SchemaMapper()
+        return mapper.map_weather_schema(weather_df)
+    
+    def validate_data(self, df, stage, dedup_index=None, sample=False):
+        """Run quality validation (on a sample if `sample` and quality_sample_size is set)"""
+        results = self.validator.run_all_checks(df, self.quality_config(df.columns, sample), dedup_index)
         self.logger.info(f"{stage.upper()} Quality Score: {results['score']}/100")
         
         return results
     
-    def load_data(self, ecom_df, weather_df):
-        """Load data to target database"""
-        loader = DatabaseLoader(self.target_conn)
-        
-        ecom_result = loader.load(ecom_df, 'ecommerce_transactions', if_exists='replace')
-        weather_result = loader.load(weather_df, 'weather_data', if_exists='replace')
+    def validate_accumulated(self, accumulator, stage):
+        """Run quality validation on statistics gathered by a QualityAccumulator"""
+        profile = accumulator.profile()
+        results = self.validator.score_profile(profile, self.quality_config(profile['null_counts']))
+        self.logger.info(f"{stage.upper()} Quality Score: {results['score']}/100")
         
+        return results
+    
+    def quality_config(self, columns, sample=False):
+        """Quality thresholds for raw or mapped e-commerce rows with these columns"""
         return {
-            'ecommerce': ecom_result,
-            'weather': weather_result
+            'null_threshold': 0.05,
+            'required_columns': ['transaction_id', 'transaction_date', 'customer_id'] if 'transaction_id' in columns else [],
+            'value_ranges': self.config['quality_value_ranges'],
+            'min_rows': 100,
+            'sample_size': self.config['quality_sample_size'] if sample else None,
+            'confidence': self.config['quality_confidence']
         }
     
-    def log_summary(self, run_id, status, duration, pre_quality=None, post_quality=None, load_results=None, error=None):
+    def update_table_quality(self, delta, append=False):
+        """Fold the quality statistics of the rows just loaded into the target table's saved profile
+        
+        A full reload starts the profile over. Upserts can replace rows the
+        profile already counts, which it can't take out again, so they leave
+        it alone until the next full reload.
+        """
+        if append and self.config['load_mode'] == 'upsert':
+            self.logger.warning("Not updating the table quality profile: upserted rows may replace rows it already counts")
+            return None
+        
+        table = QualityAccumulator.load(self.config['quality_profile_path'], self.config['quality_value_ranges'], self.config['dedup_memory_limit'])
+        if not append:
+            table.clear()
+        table.merge(delta)
+        table.save()
+        
+        return self.validate_accumulated(table, "target table")
+    
+    def load_ecommerce(self, ecom_df, append=False):
+        """Load the e-commerce table, over several connections if load_workers > 1"""
+        workers = self.config['load_workers']
+        loader = DatabaseLoader(self.target_conn, pool_size=workers if workers > 1 else None)
+        
+        if workers > 1:
+            return self.load_table_parallel(loader, ecom_df, 'ecommerce_transactions', append)
+        return self.load_table(loader, ecom_df, 'ecommerce_transactions', append)
+    
+    def load_sales_weather(self, loader, enricher, weather_df, append=False):
+        """Build the daily sales x weather fact table from the enricher's aggregates and load it"""
+        table_name = self.config['sales_weather_table']
+        keys = self.config['load_keys'][table_name]
+        daily = enricher.result()
+        
+        if daily.empty:
+            self.logger.info("No sales to aggregate")
+            return {'rows_loaded': 0, 'table_name': table_name}
+        
+        if append:
+            # Days already in the table get this run's totals added to them, and their orders
+            # counted again from the loaded e-commerce rows (a late line can join an order loaded before)
+            low, high = daily['sale_date'].min().to_pydatetime(), daily['sale_date'].max().to_pydatetime()
+            existing = loader.read_range(table_name, 'sale_date', low, high)
+            loaded = loader.read_range('ecommerce_transactions', 'transaction_date', low, high + timedelta(days=1),
+                                       columns=['transaction_date', 'country', 'transaction_id'])
+            daily = enricher.add_existing(daily, existing, loaded)
+        
+        daily = enricher.enrich(daily, weather_df)
+        
+        if append:
+            return loader.load_staged(daily, table_name, 'upsert', keys)
+        return self.load_table(loader, daily, table_name)
+    
+    def load_table(self, loader, df, table_name, append=False):
+        """Load one table according to the configured load mode"""
+        mode = self.config['load_mode']
+        
+        if mode == 'upsert':
+            keys = [key for key in self.config['load_keys'][table_name] if key in df.columns]
+            return loader.load_staged(df, table_name, 'upsert', keys)
+        if append:
+            return loader.load(df, table_name, if_exists='append')
+        if mode == 'swap':
+            return loader.load_staged(df, table_name, 'swap')
+        
+        return loader.load(df, table_name, if_exists='replace')
+    
+    def load_table_parallel(self, loader, df, table_name, append=False):
+        """Load one table over several connections, published the same way as load_table"""
+        mode = self.config['load_mode']
+        
+        if mode == 'upsert':
+            publish = 'upsert'
+        elif append:
+            publish = 'append'
+        else:
+            publish = 'swap'
+        
+        keys = [key for key in self.config['load_keys'][table_name] if key in df.columns]
+        return loader.load_parallel(df, table_name, num_workers=self.config['load_workers'], publish=publish, key_columns=keys)
+    
+    def merge_load_results(self, total, result):
+        """Accumulate per-chunk load results into one result"""
+        if total is None:
+            return dict(result)
+        
+        total['rows_loaded'] += result['rows_loaded']
+        total['duration_seconds'] += result['duration_seconds']
+        total['rows_per_second'] = total['rows_loaded'] / total['duration_seconds'] if total['duration_seconds'] > 0 else None
+        total['timestamp'] = result['timestamp']
+        return total
+    
+    def merge_transform_stats(self, total, stats):
+        """Accumulate per-chunk parallel transform timings"""
+        if total is None:
+            return dict(stats)
+        
+        for key in ('rows', 'duration_seconds', 'busy_seconds'):
+            total[key] += stats[key]
+        total['utilization'] = total['busy_seconds'] / total['duration_seconds'] if total['duration_seconds'] > 0 else None
+        return total
+    
+    def log_summary(self, run_id, status, duration, pre_quality=None, post_quality=None, load_results=None, transform_stats=None, error=None):
         """Log pipeline execution summary"""
         self.logger.info("="*50)
         self.logger.info("PIPELINE SUMMARY")
@@ -164,6 +819,11 @@ class ETLPipeline:
             self.logger.info(f"Post-transform Quality: {post_quality['score']}/100")
         if load_results:
             self.logger.info(f"Records loaded: Ecommerce={load_results['ecommerce']['rows_loaded']}, Weather={load_results['weather']['rows_loaded']}")
+            if 'sales_weather' in load_results:
+                self.logger.info(f"Daily sales x weather rows: {load_results['sales_weather']['rows_loaded']}")
+        if transform_stats and transform_stats['utilization']:
+            self.logger.info(f"Parallel transform: {transform_stats['workers']} workers, {transform_stats['duration_seconds']:.2f}s "
+                             f"for {transform_stats['busy_seconds']:.2f}s of work ({transform_stats['utilization']:.1f} workers busy on average)")
         if error:
             self.logger.error(f"Error: {error}")
         
@@ -0,0 +1,217 @@
+#Quality statistics gathered a chunk at a time, merged across workers and saved between runs
+
+from transformers.dedup_index import DedupIndex
+import pandas as pd
+import numpy as np
+import os
+import logging
+
+class RowCountAccumulator:
+    """Rows seen"""
+    
+    def __init__(self):
+        self.rows = 0
+    
+    def update(self, df):
+        self.rows += len(df)
+    
+    def merge(self, other):
+        self.rows += other.rows
+    
+    def to_dict(self):
+        return {'rows': self.rows}
+    
+    def from_dict(self, state):
+        self.rows = state['rows']
+
+class NullCountAccumulator:
+    """Nulls per column, columns in the order they were first seen"""
+    
+    def __init__(self):
+        self.null_counts = {}
+    
+    def update(self, df):
+        for col, count in df.isnull().sum().items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(count)
+    
+    def merge(self, other):
+        for col, count in other.null_counts.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + count
+    
+    def to_dict(self):
+        return {'null_counts': self.null_counts}
+    
+    def from_dict(self, state):
+        self.null_counts = dict(state['null_counts'])
+
+class RangeAccumulator:
+    """Values outside value_ranges, plus min/max, for the numeric range columns"""
+    
+    def __init__(self, value_ranges=None):
+        self.value_ranges = {col: tuple(bounds) for col, bounds in (value_ranges or {}).items()}
+        self.out_of_range = {}
+        self.minimum = {}
+        self.maximum = {}
+    
+    def update(self, df):
+        columns = [col for col in self.value_ranges
+                   if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+        values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+        lower = np.array([self.value_ranges[col][0] for col in columns], dtype='float64')
+        upper = np.array([self.value_ranges[col][1] for col in columns], dtype='float64')
+        
+        counts = ((values < lower) | (values > upper)).sum(axis=0)
+        # fmin/fmax skip NaNs, so a chunk without values leaves min/max as they were
+        empty = np.full(len(columns), np.nan)
+        minimum = np.fmin.reduce(values, axis=0) if len(values) else empty
+        maximum = np.fmax.reduce(values, axis=0) if len(values) else empty
+        
+        self.combine(dict(zip(columns, counts.tolist())), dict(zip(columns, minimum.tolist())),
+                     dict(zip(columns, maximum.tolist())))
+    
+    def merge(self, other):
+        self.combine(other.out_of_range, other.minimum, other.maximum)
+    
+    def combine(self, out_of_range, minimum, maximum):
+        for col, count in out_of_range.items():
+            self.out_of_range[col] = self.out_of_range.get(col, 0) + count
+            self.minimum[col] = float(np.fmin(self.minimum.get(col, np.nan), minimum[col]))
+            self.maximum[col] = float(np.fmax(self.maximum.get(col, np.nan), maximum[col]))
+    
+    def to_dict(self):
+        return {
+            'value_ranges': {col: list(bounds) for col, bounds in self.value_ranges.items()},
+            'out_of_range': self.out_of_range,
+            'min': self.minimum,
+            'max': self.maximum
+        }
+    
+    def from_dict(self, state):
+        self.out_of_range = dict(state['out_of_range'])
+        self.minimum = dict(state['min'])
+        self.maximum = dict(state['max'])
+
+class DuplicateAccumulator:
+    """Duplicate rows, counted against every row seen so far
+    
+    The rows seen are kept in a DedupIndex, which holds `max_memory`
+    fingerprints in memory and spills the rest to disk (under `path` if the
+    counts are saved there).
+    """
+    
+    def __init__(self, max_memory=5000000, path=None):
+        self.index = DedupIndex(max_memory=max_memory, path=path)
+        self.duplicates = 0
+    
+    def update(self, df):
+        self.duplicates += int((~self.index.mark(df)).sum())
+    
+    def merge(self, other):
+        # Each run of the other index is distinct, so only rows this one saw before are duplicates
+        self.duplicates += other.duplicates
+        for fingerprints in other.index.sorted_runs():
+            self.duplicates += int((~self.index.mark_fingerprints(np.asarray(fingerprints))).sum())
+    
+    def to_dict(self):
+        return {'duplicates': self.duplicates}
+    
+    def from_dict(self, state):
+        self.duplicates = state['duplicates']
+
+class QualityAccumulator:
+    """Everything DataQualityValidator.score_profile needs, for data seen a chunk at a time
+    
+    update() adds a chunk, merge() adds another accumulator (e.g. one filled
+    in a worker process), and load()/save() keep a table's profile in a
+    directory between runs so appending a delta only needs the delta. profile()
+    has the same shape as DataQualityValidator.profile_frame(), so the checks
+    and score come out as they would for all the rows at once.
+    """
+    
+    def __init__(self, value_ranges=None, max_memory=5000000, path=None):
+        self.path = path
+        self.max_memory = max_memory
+        self.row_count = RowCountAccumulator()
+        self.nulls = NullCountAccumulator()
+        self.ranges = RangeAccumulator(value_ranges)
+        self.duplicates = DuplicateAccumulator(max_memory, path)
+        self.logger = logging.getLogger(__name__)
+    
+    def empty(self):
+        """A new accumulator with the same settings and nothing seen"""
+        return QualityAccumulator(self.ranges.value_ranges, self.max_memory)
+    
+    def accumulators(self):
+        return [self.row_count, self.nulls, self.ranges, self.duplicates]
+    
+    def update(self, df):
+        """Add the rows of one chunk"""
+        for accumulator in self.accumulators():
+            accumulator.update(df)
+        return self
+    
+    def merge(self, other):
+        """Add everything another accumulator saw"""
+        if other.ranges.value_ranges != self.ranges.value_ranges:
+            raise ValueError(f"Can't merge quality accumulators with value ranges "
+                             f"{other.ranges.value_ranges} into {self.ranges.value_ranges}")
+        for accumulator, other_accumulator in zip(self.accumulators(), other.accumulators()):
+            accumulator.merge(other_accumulator)
+        return self
+    
+    def profile(self):
+        """Statistics of all rows seen, like DataQualityValidator.profile_frame()"""
+        return {
+            'rows': self.row_count.rows,
+            'null_counts': dict(self.nulls.null_counts),
+            'duplicates': self.duplicates.duplicates,
+            'out_of_range': dict(self.ranges.out_of_range),
+            'min': dict(self.ranges.minimum),
+            'max': dict(self.ranges.maximum)
+        }
+    
+    def clear(self):
+        """Forget everything seen, the saved profile too once save() is called"""
+        value_ranges = self.ranges.value_ranges
+        self.row_count = RowCountAccumulator()
+        self.nulls = NullCountAccumulator()
+        self.ranges = RangeAccumulator(value_ranges)
+        self.duplicates.index.clear()
+        self.duplicates.duplicates = 0
+        return self
+    
+    def save(self):
+        """Write the accumulated state to the directory it was loaded from, replacing what was there"""
+        if not self.path:
+            raise ValueError("Only quality accumulators opened with load() can be saved")
+        
+        state = {}
+        for accumulator in self.accumulators():
+            state.update(accumulator.to_dict())
+        # The counts go into the dedup index's meta.json, so they and the fingerprints are saved in one step
+        self.duplicates.index.save(info=state)
+        
+        self.logger.info(f"Saved quality profile of {self.row_count.rows} rows to '{self.path}'")
+    
+    def close(self):
+        """Remove fingerprints spilled to temporary files"""
+        self.duplicates.index.close()
+    
+    @classmethod
+    def load(cls, path, value_ranges=None, max_memory=5000000):
+        """Accumulator saved at `path`, or an empty one if nothing was saved yet; save() writes back there"""
+        accumulator = cls(value_ranges, max_memory, path)
+        state = accumulator.duplicates.index.info
+        if not state:
+            return accumulator
+        
+        saved_ranges = {col: tuple(bounds) for col, bounds in state['value_ranges'].items()}
+        if saved_ranges != accumulator.ranges.value_ranges:
+            raise ValueError(f"Quality profile at '{path}' was built with value ranges {saved_ranges}, "
+                             f"not {accumulator.ranges.value_ranges}; delete it to rebuild")
+        
+        for part in accumulator.accumulators():
+            part.from_dict(state)
+        
+        accumulator.logger.info(f"Loaded quality profile of {accumulator.row_count.rows} rows from '{path}'")
+        return accumulator
\ No newline at end of file
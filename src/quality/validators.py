@@ -1,22 +1,62 @@
 import pandas as pd
+import numpy as np
 import logging
 from datetime import datetime
+from statistics import NormalDist
 
 class DataQualityValidator:
-    def __init__(self):
+    def __init__(self, dedup_index=None, engine=None):
         self.logger = logging.getLogger(__name__)
         self.results = []
+        # Optional DedupIndex, so duplicates of rows from earlier chunks are counted too
+        self.dedup_index = dedup_index
+        # Optional engine (e.g. PolarsEngine) whose profile() counts nulls, duplicates and ranges
+        self.engine = engine
+        # Statistics of the last frame checked
+        self.profile = {}
+        # df.duplicated() of the last frame checked, for DataCleaner's config['duplicated']
+        self.duplicated = None
     
-    def run_all_checks(self, df, config):
-        """Run all quality checks"""
+    def run_all_checks(self, df, config, dedup_index=None):
+        """Run all quality checks
+        
+        The statistics come from one profile_frame() pass over df, or from a
+        sample when config['sample_size'] is set and df is larger (see
+        sample_profile). `dedup_index` replaces the validator's own for this
+        call, so one validator can check every stage of a run.
+        """
         self.logger.info("Starting quality validation...")
+        dedup_index = dedup_index if dedup_index is not None else self.dedup_index
+        
+        if config.get('sample_size') and len(df) > config['sample_size']:
+            profile = self.sample_profile(df, config, dedup_index)
+        else:
+            profile = self.profile_frame(df, config.get('value_ranges', {}), dedup_index)
+        
+        return self.score_profile(profile, config)
+    
+    def score_profile(self, profile, config):
+        """Run all quality checks on precomputed statistics
+        
+        `profile` is what profile_frame() or sample_profile() return, or
+        QualityAccumulator.profile() for data seen a chunk at a time.
+        """
         self.results = []
+        self.profile = profile
+        rows = profile['rows']
+        columns = list(profile['null_counts'])
+        
+        self.record_null_percentage(profile['null_counts'], rows, config.get('null_threshold', 0.1))
+        self.record_duplicates(profile['duplicates'], rows)
+        self.record_schema(columns, config.get('required_columns', []))
+        self.record_value_ranges(config.get('value_ranges', {}), profile['out_of_range'], profile.get('min'), profile.get('max'))
+        self.record_row_count(rows, config.get('min_rows', 0), config.get('max_rows', float('inf')))
         
-        self.check_null_percentage(df, config.get('null_threshold', 0.1))
-        self.check_duplicates(df)
-        self.check_schema(df, config.get('required_columns', []))
-        self.check_value_ranges(df, config.get('value_ranges', {}))
-        self.check_row_count(df, config.get('min_rows', 0), config.get('max_rows', float('inf')))
+        # Values estimated from the sample come with their confidence interval
+        for result in self.results:
+            interval = profile.get('intervals', {}).get((result['check'], result['column']))
+            if interval is not None:
+                result['interval'] = interval
         
         score = self.calculate_quality_score()
         self.logger.info(f"Quality score: {score}/100")
@@ -24,13 +64,225 @@ class DataQualityValidator:
         return {
             'score': score,
             'checks': self.results,
+            'sampled_rows': profile.get('sampled_rows'),
             'timestamp': datetime.now().isoformat()
         }
     
-    def check_null_percentage(self, df, threshold=0.1):
-        """Check if null percentage is below threshold"""
+    def range_columns(self, df, value_ranges=None):
+        """The value_ranges whose columns are in df and numeric, the ones range checks look at"""
+        return {
+            col: bounds for col, bounds in (value_ranges or {}).items()
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+        }
+    
+    def profile_frame(self, df, value_ranges=None, dedup_index=None):
+        """Null counts, duplicate rows and min/max/out-of-range per range column, in one pass
+        
+        Range columns are checked together as one float block. With a dedup
+        index, duplicates also count rows seen before (and the index learns df).
+        """
+        value_ranges = self.range_columns(df, value_ranges)
+        self.duplicated = None
+        
+        if self.engine is not None:
+            profile = self.engine.profile(df, value_ranges, duplicates=dedup_index is None)
+        else:
+            profile = {'rows': len(df), 'null_counts': df.isnull().sum().to_dict()}
+            
+            columns = list(value_ranges)
+            values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+            lower = np.array([value_ranges[col][0] for col in columns], dtype='float64')
+            upper = np.array([value_ranges[col][1] for col in columns], dtype='float64')
+            profile['out_of_range'] = dict(zip(columns, ((values < lower) | (values > upper)).sum(axis=0).tolist()))
+            
+            # fmin/fmax skip NaNs, a column with no values gives NaN
+            empty = np.full(len(columns), np.nan)
+            profile['min'] = dict(zip(columns, (np.fmin.reduce(values, axis=0) if len(values) else empty).tolist()))
+            profile['max'] = dict(zip(columns, (np.fmax.reduce(values, axis=0) if len(values) else empty).tolist()))
+            
+            if dedup_index is None:
+                self.duplicated = self.find_duplicates(df)
+                profile['duplicates'] = int(self.duplicated.sum())
+        
+        if dedup_index is not None:
+            profile['duplicates'] = int((~dedup_index.mark(df)).sum())
+        
+        self.profile = profile
+        return profile
+    
+    def sample_profile(self, df, config, dedup_index=None):
+        """profile_frame() estimated from samples, counting over every row only what a sample can't decide
+        
+        Null and range rates come from config['sample_size'] rows drawn
+        uniformly, so their cost doesn't grow with df. The duplicate rate comes
+        from the rows whose numeric, datetime and categorical columns hash into
+        a slice of about the same size: every copy of a row hashes alike, so
+        duplicates inside the slice are exact. Rows with the same hash come as
+        one group, so the slice's interval is widened by the design effect of
+        those groups (their size-weighted mean size, from the groups in the
+        slice). Hashing the rows is still one O(n) pass, but nothing over all
+        of df is sorted or grouped. Each rate is decided on its sample when the
+        Wilson interval at config['confidence'] stays on the estimate's side of
+        the threshold, give or take config['sample_tolerance']; otherwise that
+        one column (or the whole-row duplicate check) is counted in full. Ranges and
+        duplicates have a zero threshold, so one violation in the sample fails
+        them and a clean sample passes them once it rules out rates above the
+        tolerance. Min/max aren't estimated. A dedup index has to see every
+        row, so with one the duplicates are always counted in full.
+        """
+        rows = len(df)
+        sample_size = config['sample_size']
+        confidence = config.get('confidence', 0.95)
+        tolerance = config.get('sample_tolerance', 0.001)
+        value_ranges = self.range_columns(df, config.get('value_ranges'))
+        self.duplicated = None
+        
+        rng = np.random.default_rng(config.get('sample_seed'))
+        sample = df.take(np.sort(rng.choice(rows, sample_size, replace=False)))
+        profile = {'rows': rows, 'null_counts': {}, 'out_of_range': {}, 'intervals': {}, 'sampled_rows': sample_size}
+        full_scans = []
+        
+        null_threshold = config.get('null_threshold', 0.1)
+        sample_nulls = sample.isnull().sum()
         for col in df.columns:
-            null_pct = df[col].isnull().sum() / len(df)
+            estimate = self.estimate_rate(int(sample_nulls[col]), sample_size, null_threshold, confidence, tolerance)
+            if estimate is None:
+                profile['null_counts'][col] = int(df[col].isnull().sum())
+                full_scans.append(f"nulls in {col}")
+            else:
+                rate, interval = estimate
+                profile['null_counts'][col] = rate * rows
+                profile['intervals'][('null_percentage', col)] = interval
+        
+        for col, (min_val, max_val) in value_ranges.items():
+            hits = int(((sample[col] < min_val) | (sample[col] > max_val)).sum())
+            estimate = self.estimate_rate(hits, sample_size, 0, confidence, tolerance)
+            if estimate is None:
+                profile['out_of_range'][col] = int(((df[col] < min_val) | (df[col] > max_val)).sum())
+                full_scans.append(f"range of {col}")
+            else:
+                rate, (low, high) = estimate
+                profile['out_of_range'][col] = max(round(rate * rows), hits)
+                profile['intervals'][('value_range', col)] = (round(low * rows), round(high * rows))
+        
+        estimate = None
+        if dedup_index is None:
+            # Copies of a row agree on every column, so hashing the cheap ones keeps them together
+            keys = pd.util.hash_pandas_object(df[self.cheap_columns(df) or list(df.columns)], index=False).to_numpy()
+            positions = np.flatnonzero(keys < np.uint64(int(sample_size / rows * 2**64)))
+            in_slice = df.take(positions)
+            hits = int(in_slice.duplicated().sum())
+            # Rows sharing a key are in or out of the slice together (e.g. every NaN of a column),
+            # so the slice counts for as many rows as there are groups of that size in it
+            group_sizes = pd.Series(keys[positions]).value_counts(sort=False).to_numpy().astype('float64')
+            design_effect = float((group_sizes ** 2).sum() / len(positions)) if len(positions) else 1.0
+            estimate = self.estimate_rate(hits, len(in_slice), 0, confidence, tolerance, design_effect)
+        
+        if estimate is not None:
+            rate, interval = estimate
+            profile['duplicates'] = max(round(rate * rows), hits)
+            profile['intervals'][('duplicates', 'all')] = interval
+        elif dedup_index is not None:
+            profile['duplicates'] = int((~dedup_index.mark(df)).sum())
+        else:
+            self.duplicated = self.find_duplicates(df)
+            profile['duplicates'] = int(self.duplicated.sum())
+            full_scans.append("duplicates")
+        
+        self.logger.info(f"Sampled {sample_size} of {rows} rows"
+                         + (f", near thresholds so counted in full: {', '.join(full_scans)}" if full_scans else ""))
+        
+        self.profile = profile
+        return profile
+    
+    def estimate_rate(self, hits, trials, threshold, confidence=0.95, tolerance=0.0, design_effect=1.0):
+        """(rate, Wilson interval) of hits/trials, or None when the sample can't tell which side of threshold it is on
+        
+        A design_effect above 1 (trials drawn in groups) counts the sample as trials / design_effect independent ones.
+        """
+        if not trials:
+            return None
+        
+        rate = hits / trials
+        low, high = wilson_interval(hits / design_effect, trials / design_effect, confidence)
+        if rate <= threshold and high <= threshold + tolerance:
+            return rate, (low, high)
+        if rate > threshold and low > threshold - tolerance:
+            return rate, (low, high)
+        return None
+    
+    def cheap_columns(self, df):
+        """Numeric, datetime and categorical columns, which compare and hash far faster than strings"""
+        return [col for col in df.columns
+                if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_datetime64_any_dtype(df[col])
+                or isinstance(df[col].dtype, pd.CategoricalDtype)]
+    
+    def find_duplicates(self, df):
+        """df.duplicated() as an array, comparing the text columns only where the rest repeat
+        
+        Rows that differ in a numeric, datetime or categorical column can't be
+        duplicates, and those columns factorize far faster than strings. They
+        narrow the candidate rows column by column (usually to none), then the
+        whole rows of what is left are compared.
+        """
+        cheap = self.cheap_columns(df)
+        
+        rows = np.arange(len(df))
+        groups = np.zeros(len(df), dtype='int64')
+        for col in cheap:
+            codes, uniques = pd.factorize(df[col] if len(rows) == len(df) else df[col].take(rows))
+            # Rows stay in one group while they agree on every column so far
+            groups = pd.factorize(groups * (len(uniques) + 1) + codes + 1)[0]
+            repeated = np.bincount(groups)[groups] > 1
+            rows, groups = rows[repeated], groups[repeated]
+            if not len(rows):
+                break
+        
+        if len(rows) == len(df):
+            return df.duplicated().to_numpy()
+        
+        duplicated = np.zeros(len(df), dtype=bool)
+        if len(rows):
+            duplicated[rows] = df.take(rows).duplicated().to_numpy()
+        return duplicated
+    
+    def check_null_percentage(self, df, threshold=0.1, null_counts=None):
+        """Check if null percentage is below threshold"""
+        if null_counts is None:
+            null_counts = df.isnull().sum()
+        self.record_null_percentage({col: null_counts[col] for col in df.columns}, len(df), threshold)
+    
+    def check_duplicates(self, df, dup_count=None):
+        """Check for duplicate rows"""
+        if dup_count is None and self.dedup_index is not None:
+            dup_count = int((~self.dedup_index.mark(df)).sum())
+        elif dup_count is None:
+            dup_count = df.duplicated().sum()
+        self.record_duplicates(dup_count, len(df))
+    
+    def check_schema(self, df, required_columns):
+        """Check if all required columns exist"""
+        self.record_schema(df.columns, required_columns)
+    
+    def check_value_ranges(self, df, value_ranges, out_of_range_counts=None):
+        """Check if values are within expected ranges"""
+        counts = {}
+        for col, (min_val, max_val) in value_ranges.items():
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+                if out_of_range_counts is not None:
+                    counts[col] = out_of_range_counts[col]
+                else:
+                    counts[col] = ((df[col] < min_val) | (df[col] > max_val)).sum()
+        self.record_value_ranges(value_ranges, counts)
+    
+    def check_row_count(self, df, min_rows, max_rows):
+        """Check if row count is within expected range"""
+        self.record_row_count(len(df), min_rows, max_rows)
+    
+    def record_null_percentage(self, null_counts, rows, threshold=0.1):
+        """Add a null_percentage result per column from its null count"""
+        for col, null_count in null_counts.items():
+            null_pct = null_count / rows if rows else float('nan')
             passed = null_pct <= threshold
             
             self.results.append({
@@ -44,10 +296,9 @@ class DataQualityValidator:
             if not passed:
                 self.logger.warning(f"Column '{col}' has {null_pct*100:.2f}% nulls (threshold: {threshold*100}%)")
     
-    def check_duplicates(self, df):
-        """Check for duplicate rows"""
-        dup_count = df.duplicated().sum()
-        dup_pct = dup_count / len(df)
+    def record_duplicates(self, dup_count, rows):
+        """Add the duplicates result from the number of duplicate rows"""
+        dup_pct = dup_count / rows if rows else float('nan')
         passed = dup_count == 0
         
         self.results.append({
@@ -61,9 +312,9 @@ class DataQualityValidator:
         if not passed:
             self.logger.warning(f"Found {dup_count} duplicate rows ({dup_pct*100:.2f}%)")
     
-    def check_schema(self, df, required_columns):
-        """Check if all required columns exist"""
-        missing = set(required_columns) - set(df.columns)
+    def record_schema(self, columns, required_columns):
+        """Add the schema result for the columns present"""
+        missing = set(required_columns) - set(columns)
         passed = len(missing) == 0
         
         self.results.append({
@@ -77,27 +328,29 @@ class DataQualityValidator:
         if not passed:
             self.logger.error(f"Missing required columns: {missing}")
     
-    def check_value_ranges(self, df, value_ranges):
-        """Check if values are within expected ranges"""
+    def record_value_ranges(self, value_ranges, out_of_range_counts, minimum=None, maximum=None):
+        """Add a value_range result per numeric column counted in out_of_range_counts"""
         for col, (min_val, max_val) in value_ranges.items():
-            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
-                out_of_range = ((df[col] < min_val) | (df[col] > max_val)).sum()
+            if col in out_of_range_counts:
+                out_of_range = out_of_range_counts[col]
                 passed = out_of_range == 0
                 
-                self.results.append({
+                result = {
                     'check': 'value_range',
                     'column': col,
                     'value': out_of_range,
                     'threshold': f"{min_val}-{max_val}",
                     'passed': passed
-                })
+                }
+                if minimum and col in minimum:
+                    result['min'], result['max'] = minimum[col], maximum[col]
+                self.results.append(result)
                 
                 if not passed:
                     self.logger.warning(f"Column '{col}' has {out_of_range} values outside range [{min_val}, {max_val}]")
     
-    def check_row_count(self, df, min_rows, max_rows):
-        """Check if row count is within expected range"""
-        row_count = len(df)
+    def record_row_count(self, row_count, min_rows, max_rows):
+        """Add the row_count result"""
         passed = min_rows <= row_count <= max_rows
         
         self.results.append({
@@ -119,4 +372,13 @@ class DataQualityValidator:
         passed = sum(1 for r in self.results if r['passed'])
         total = len(self.results)
         
-        return round((passed / total) * 100, 2)
\ No newline at end of file
+        return round((passed / total) * 100, 2)
+
+def wilson_interval(hits, trials, confidence=0.95):
+    """Wilson score interval for the proportion hits/trials"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = hits / trials
+    denominator = 1 + z**2 / trials
+    center = (rate + z**2 / (2 * trials)) / denominator
+    margin = z * np.sqrt(rate * (1 - rate) / trials + z**2 / (4 * trials**2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
\ No newline at end of file
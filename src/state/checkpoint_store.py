@@ -0,0 +1,180 @@
+#Keeps each pipeline stage's output per run so a failed run can resume where it stopped
+
+from transformers.arrow_tables import frame_to_table, table_to_frame
+import pyarrow as pa
+import pyarrow.parquet as pq
+import numpy as np
+from datetime import datetime, timedelta
+import threading
+import shutil
+import uuid
+import json
+import os
+import logging
+
+class CheckpointStore:
+    """Stage outputs of pipeline runs under `path/<run_id>/`
+    
+    Frames are written as Parquet, small results (quality checks, load
+    results) go into the run's manifest.json next to the file each frame
+    stage wrote. A checkpoint only counts while its file is the one the
+    manifest names, its row count matches and it was made with the same
+    `fingerprint` (e.g. of the config that produced it). Only the newest
+    `retention_runs` runs younger than `max_age_hours` are kept by cleanup().
+    """
+    
+    def __init__(self, path, retention_runs=3, max_age_hours=24):
+        self.path = path
+        self.retention_runs = retention_runs
+        self.max_age_hours = max_age_hours
+        # Stages of one run can finish at the same time, each updating the manifest
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(path, exist_ok=True)
+    
+    def run_path(self, run_id):
+        return os.path.join(self.path, str(run_id))
+    
+    def run_info(self, run_id):
+        """What start_run() recorded for run_id, or None if it has no checkpoints"""
+        manifest = self.read_manifest(run_id)
+        return manifest['info'] if manifest else None
+    
+    def start_run(self, run_id, info=None):
+        """Open run_id's checkpoints, starting a new manifest with `info` if there is none
+        
+        Returns the info of the run being resumed, or `info` for a new run.
+        """
+        manifest = self.read_manifest(run_id)
+        if manifest is not None:
+            self.logger.info(f"Resuming run '{run_id}' with checkpoints for {list(manifest['stages'])}")
+            return manifest['info']
+        
+        os.makedirs(self.run_path(run_id), exist_ok=True)
+        self.write_manifest(run_id, {'run_id': str(run_id), 'created_at': datetime.now().isoformat(), 'info': info or {}, 'stages': {}})
+        return info or {}
+    
+    def save(self, run_id, stage, df=None, meta=None, fingerprint=None):
+        """Checkpoint a stage: a frame, a JSON-able `meta` result, or both"""
+        entry = {
+            'meta': to_json(meta),
+            'fingerprint': fingerprint,
+            'saved_at': datetime.now().isoformat()
+        }
+        if df is not None:
+            # A new file per save, the manifest switches to it only once it is complete
+            entry['file'] = f"{stage}_{uuid.uuid4().hex}.parquet"
+            entry['rows'] = len(df)
+            write_parquet(df, os.path.join(self.run_path(run_id), entry['file']))
+        
+        with self.lock:
+            manifest = self.read_manifest(run_id)
+            previous = manifest['stages'].get(stage, {}).get('file')
+            manifest['stages'][stage] = entry
+            self.write_manifest(run_id, manifest)
+        
+        if previous and previous != entry.get('file'):
+            os.remove(os.path.join(self.run_path(run_id), previous))
+        self.logger.info(f"Checkpointed '{stage}' of run '{run_id}'" + (f" ({len(df)} rows)" if df is not None else ""))
+    
+    def load(self, run_id, stage, fingerprint=None):
+        """(frame, meta) of a valid checkpoint, frame None for meta-only stages; None if there is none"""
+        entry = self.entry(run_id, stage, fingerprint)
+        if entry is None:
+            return None
+        
+        df = None
+        if 'file' in entry:
+            try:
+                df = read_parquet(os.path.join(self.run_path(run_id), entry['file']))
+            except (OSError, pa.ArrowException) as e:
+                self.logger.warning(f"Checkpoint '{stage}' of run '{run_id}' can't be read, redoing the stage: {e}")
+                return None
+        
+        self.logger.info(f"Using checkpoint '{stage}' of run '{run_id}'" + (f" ({len(df)} rows)" if df is not None else ""))
+        return df, entry['meta']
+    
+    def has(self, run_id, stage, fingerprint=None):
+        """True if the stage has a valid checkpoint"""
+        return self.entry(run_id, stage, fingerprint) is not None
+    
+    def entry(self, run_id, stage, fingerprint=None):
+        """Manifest entry of a checkpoint that is still valid, else None"""
+        manifest = self.read_manifest(run_id)
+        entry = manifest['stages'].get(stage) if manifest else None
+        if entry is None:
+            return None
+        
+        if entry['fingerprint'] != fingerprint:
+            self.logger.info(f"Checkpoint '{stage}' of run '{run_id}' was made with other settings, redoing the stage")
+            return None
+        if 'file' in entry:
+            file_path = os.path.join(self.run_path(run_id), entry['file'])
+            try:
+                rows = pq.read_metadata(file_path).num_rows
+            except (OSError, pa.ArrowException):
+                rows = None
+            if rows != entry['rows']:
+                self.logger.warning(f"Checkpoint '{stage}' of run '{run_id}' is missing or damaged, redoing the stage")
+                return None
+        
+        return entry
+    
+    def remove(self, run_id):
+        """Delete all checkpoints of a run"""
+        shutil.rmtree(self.run_path(run_id), ignore_errors=True)
+        self.logger.info(f"Removed checkpoints of run '{run_id}'")
+    
+    def runs(self):
+        """Run ids with checkpoints, oldest first"""
+        manifests = [(run_id, self.read_manifest(run_id)) for run_id in os.listdir(self.path)
+                     if os.path.isdir(self.run_path(run_id))]
+        return [run_id for run_id, manifest in sorted(manifests, key=lambda item: item[1]['created_at'] if item[1] else '')]
+    
+    def cleanup(self, keep=()):
+        """Apply the retention policy, never removing the runs in `keep`; returns the removed run ids"""
+        # The kept runs don't count towards retention_runs
+        runs = [run_id for run_id in self.runs() if run_id not in keep]
+        expired = runs[:-self.retention_runs] if self.retention_runs else list(runs)
+        
+        if self.max_age_hours is not None:
+            cutoff = (datetime.now() - timedelta(hours=self.max_age_hours)).isoformat()
+            for run_id in runs:
+                manifest = self.read_manifest(run_id)
+                # Directories without a manifest are left over from crashed runs
+                if manifest is None or manifest['created_at'] < cutoff:
+                    expired.append(run_id)
+        
+        removed = []
+        for run_id in dict.fromkeys(expired):
+            self.remove(run_id)
+            removed.append(run_id)
+        return removed
+    
+    def read_manifest(self, run_id):
+        manifest_path = os.path.join(self.run_path(run_id), 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+        
+        with open(manifest_path) as f:
+            return json.load(f)
+    
+    def write_manifest(self, run_id, manifest):
+        """Replace the manifest in one step, so it is always either the old or the new one"""
+        manifest_path = os.path.join(self.run_path(run_id), 'manifest.json')
+        with open(manifest_path + '.pending', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + '.pending', manifest_path)
+
+def to_json(value):
+    """Round-trip value through JSON, NumPy scalars as Python ones and anything else unknown as text"""
+    return json.loads(json.dumps(value, default=lambda item: item.item() if isinstance(item, np.generic) else str(item)))
+
+def write_parquet(df, path):
+    """Write a frame as Parquet (via a temp file, so the file is complete once it exists)"""
+    pq.write_table(frame_to_table(df), path + '.pending')
+    os.replace(path + '.pending', path)
+
+def read_parquet(path):
+    """Read a checkpoint back into a frame with the dtypes it was written with"""
+    return table_to_frame(pq.read_table(path))
\ No newline at end of file
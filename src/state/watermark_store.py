@@ -0,0 +1,56 @@
+#Keeps track of how far each source has been extracted
+
+from sqlalchemy import create_engine, text
+import logging
+from datetime import datetime
+
+class WatermarkStore:
+    def __init__(self, connection_string, table_name='etl_watermarks'):
+        # Watermarks live in a small table next to the loaded data
+        self.engine = create_engine(connection_string)
+        self.table_name = table_name
+        self.logger = logging.getLogger(__name__)
+        self.ensure_table()
+    
+    def ensure_table(self):
+        """Create the watermark table if it doesn't exist yet"""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.table_name} ("
+                "source_name VARCHAR(255) PRIMARY KEY, "
+                "watermark_column VARCHAR(255), "
+                "watermark_value VARCHAR(255), "
+                "updated_at VARCHAR(64))"
+            ))
+    
+    def get(self, source_name):
+        """Return the stored high-water mark for a source, or None on first run"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT watermark_value FROM {self.table_name} WHERE source_name = :source"),
+                {'source': source_name}
+            ).fetchone()
+        
+        watermark = row[0] if row else None
+        self.logger.info(f"Watermark for '{source_name}': {watermark}")
+        return watermark
+    
+    def set(self, source_name, watermark_column, watermark_value):
+        """Save a new high-water mark for a source"""
+        params = {
+            'source': source_name,
+            'column': watermark_column,
+            'value': str(watermark_value),
+            'updated_at': datetime.now().isoformat()
+        }
+        
+        # Delete + insert in one transaction works on every database
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.table_name} WHERE source_name = :source"), params)
+            conn.execute(
+                text(f"INSERT INTO {self.table_name} (source_name, watermark_column, watermark_value, updated_at) "
+                     "VALUES (:source, :column, :value, :updated_at)"),
+                params
+            )
+        
+        self.logger.info(f"Updated watermark for '{source_name}' to {watermark_value}")
@@ -0,0 +1,22 @@
+#Converts frames to Arrow tables and back, keeping Arrow-backed string columns as they were
+
+import pyarrow as pa
+import pandas as pd
+import json
+
+def frame_to_table(df):
+    """Arrow table of a frame (without its index), noting which columns are Arrow-backed strings"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    
+    # pandas' metadata brings Arrow-backed strings back as Python strings, so note them
+    arrow_strings = [col for col in df.columns if isinstance(df[col].dtype, pd.StringDtype) and df[col].dtype.storage == 'pyarrow']
+    return table.replace_schema_metadata({**table.schema.metadata, b'arrow_strings': json.dumps(arrow_strings).encode()})
+
+def table_to_frame(table):
+    """Frame of a table from frame_to_table(), with the dtypes the frame had"""
+    arrow_strings = json.loads(table.schema.metadata.get(b'arrow_strings', b'[]'))
+    df = table.drop(arrow_strings).to_pandas()
+    for col in arrow_strings:
+        df[col] = pd.arrays.ArrowStringArray(table.column(col))
+    
+    return df[table.column_names]
\ No newline at end of file
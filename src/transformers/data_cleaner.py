@@ -1,27 +1,35 @@
 import pandas as pd
+import numpy as np
 import logging
 from datetime import datetime
 
 class DataCleaner:
-    def __init__(self):
+    def __init__(self, schema_inferrer=None, dedup_index=None):
         self.logger = logging.getLogger(__name__)
         self.cleaning_stats = {}
+        # Optional SchemaInferrer, caches which text columns are numeric per config['source']
+        self.schema_inferrer = schema_inferrer
+        # Optional DedupIndex, also drops rows seen in earlier chunks or runs
+        self.dedup_index = dedup_index
     
     def clean(self, df, config=None):
         """Main cleaning pipeline"""
+        if config and config.get('fused'):
+            return self.clean_fused(df, config)
+        
         self.logger.info(f"Starting data cleaning. Input shape: {df.shape}")
         
         df = df.copy()
         original_rows = len(df)
         
         # Remove duplicates
-        df = self.remove_duplicates(df)
+        df = self.remove_duplicates(df, config.get('duplicated') if config else None)
         
         # Handle nulls
         df = self.handle_nulls(df, config)
         
         # Fix data types
-        df = self.fix_data_types(df)
+        df = self.fix_data_types(df, config)
         
         # Remove outliers
         df = self.remove_outliers(df, config)
@@ -38,10 +46,161 @@ class DataCleaner:
         
         return df
     
-    def remove_duplicates(self, df):
+    def clean_fused(self, df, config=None):
+        """Single-pass cleaning plan giving the same result as the step-by-step clean()
+        
+        Duplicates, critical-column nulls and IQR outliers are folded into one
+        boolean row mask, the output is materialized once, and type fixes and
+        text standardization are applied in place on that output.
+        """
+        config = config or {}
+        self.logger.info(f"Starting fused data cleaning. Input shape: {df.shape}")
+        
+        original_rows = len(df)
+        keep = self.duplicate_mask(df, config.get('duplicated'))
+        self.cleaning_stats['duplicates_removed'] = int(original_rows - keep.sum())
+        self.logger.info(f"Removed {self.cleaning_stats['duplicates_removed']} duplicate rows")
+        
+        keep = self.critical_null_mask(df, keep, config.get('critical_columns', []))
+        
+        # Object columns whose kept values all parse as numbers become numeric
+        numeric_values = {}
+        needs_reparse = []
+        for col in self.numeric_candidates(df, config.get('source')):
+            try:
+                numeric_values[col] = self.to_numeric(df[col])
+            except (ValueError, TypeError):
+                # The unparseable value might only be in a dropped row
+                try:
+                    self.to_numeric(df[col][keep])
+                except (ValueError, TypeError):
+                    self.schema_mismatch(config.get('source'), col)
+                    continue
+                numeric_values[col] = self.to_numeric(df[col], errors='coerce')
+                needs_reparse.append(col)
+        
+        keep = self.outlier_mask(df, keep, config.get('outlier_columns', []), numeric_values, config.get('outlier_bounds'))
+        
+        # The only copy of the data
+        positions = np.flatnonzero(keep)
+        df = df.take(positions)
+        
+        for col, values in numeric_values.items():
+            # Coerced columns went through NaN/float, so their dtype comes from the kept values
+            if col in needs_reparse:
+                df[col] = self.to_numeric(df[col])
+            else:
+                df[col] = values.to_numpy()[positions]
+        
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = self.numeric_categories(df[col])
+        
+        df = self.standardize_text(df)
+        
+        final_rows = len(df)
+        self.cleaning_stats['rows_removed'] = original_rows - final_rows
+        self.cleaning_stats['removal_percentage'] = ((original_rows - final_rows) / original_rows) * 100 if original_rows else 0
+        
+        self.logger.info(f"Cleaning complete. Output shape: {df.shape}")
+        self.logger.info(f"Removed {self.cleaning_stats['rows_removed']} rows ({self.cleaning_stats['removal_percentage']:.2f}%)")
+        
+        return df
+    
+    def duplicate_mask(self, df, duplicated=None):
+        """True for the first occurrence of each row
+        
+        `duplicated` is df.duplicated() when it was already computed (e.g. by
+        DataQualityValidator); a dedup index still has to see the rows itself.
+        """
+        if self.dedup_index is not None:
+            return self.dedup_index.mark(df)
+        if duplicated is not None:
+            return ~np.asarray(duplicated)
+        return ~df.duplicated().to_numpy()
+    
+    def critical_null_mask(self, df, keep, critical_columns, null_matrix=None):
+        """Drop nulls in critical columns with more than 5% nulls, like handle_nulls
+        
+        `null_matrix` is df.isnull() as a NumPy array when it was already computed
+        (e.g. partition by partition in worker processes).
+        """
+        if null_matrix is None:
+            null_matrix = df.isnull().to_numpy()
+        positions = {col: i for i, col in enumerate(df.columns)}
+        
+        def drop(col):
+            nonlocal keep
+            dropped = null_matrix[:, positions[col]] & keep
+            keep = keep & ~dropped
+            return int(dropped.sum())
+        
+        null_counts = dict(zip(df.columns, (null_matrix & keep[:, None]).sum(axis=0)))
+        self.cleaning_stats['nulls_removed'] = self.drop_critical_nulls(null_counts, int(keep.sum()), critical_columns, drop)
+        return keep
+    
+    def drop_critical_nulls(self, null_counts, rows, critical_columns, drop):
+        """Apply handle_nulls' rule to null counts, return the rows dropped per critical column
+        
+        `drop(col)` removes the kept rows with a null in col and returns how many
+        went. Counts are taken once up front, the denominator shrinks as rows are dropped.
+        """
+        nulls_removed = {}
+        for col, count in null_counts.items():
+            null_pct = (count / rows) * 100 if rows else 0
+            
+            if null_pct > 0:
+                self.logger.info(f"Column '{col}' has {null_pct:.2f}% null values")
+                
+                if col in critical_columns and null_pct > 5:
+                    nulls_removed[col] = drop(col)
+                    rows -= nulls_removed[col]
+                    self.logger.info(f"Dropped rows with null in critical column '{col}'")
+        
+        return nulls_removed
+    
+    def outlier_mask(self, df, keep, outlier_columns, numeric_values=None, outlier_bounds=None):
+        """Drop IQR outliers column by column, like remove_outliers"""
+        numeric_values = numeric_values or {}
+        outlier_bounds = outlier_bounds or {}
+        outliers_removed = {}
+        
+        for col in outlier_columns:
+            if col in numeric_values:
+                values = numeric_values[col].to_numpy()
+            elif col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+                values = df[col].to_numpy()
+            else:
+                continue
+            
+            if col in outlier_bounds:
+                lower_bound, upper_bound = outlier_bounds[col]
+            else:
+                kept_values = pd.Series(values[keep])
+                Q1 = kept_values.quantile(0.25)
+                Q3 = kept_values.quantile(0.75)
+                IQR = Q3 - Q1
+                lower_bound, upper_bound = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+            
+            inside = (values >= lower_bound) & (values <= upper_bound)
+            removed = int((keep & ~inside).sum())
+            keep = keep & inside
+            
+            outliers_removed[col] = removed
+            self.logger.info(f"Removed {removed} outliers from column '{col}'")
+        
+        self.cleaning_stats['outliers_removed'] = outliers_removed
+        return keep
+    
+    def remove_duplicates(self, df, duplicated=None):
         """Remove duplicate rows"""
         initial_count = len(df)
-        df = df.drop_duplicates()
+        if self.dedup_index is not None:
+            df = df[self.dedup_index.mark(df)]
+        elif duplicated is not None:
+            df = df[~np.asarray(duplicated)]
+        else:
+            df = df.drop_duplicates()
         removed = initial_count - len(df)
         
         self.cleaning_stats['duplicates_removed'] = removed
@@ -66,31 +225,62 @@ class DataCleaner:
         
         return df
     
-    def fix_data_types(self, df):
+    def fix_data_types(self, df, config=None):
         """Fix common data type issues"""
+        source = (config or {}).get('source')
+        
+        # Convert string numbers to numeric
+        for col in self.numeric_candidates(df, source):
+            try:
+                df[col] = self.to_numeric(df[col])
+            except (ValueError, TypeError):
+                self.schema_mismatch(source, col)
+        
         for col in df.columns:
-            # Convert string numbers to numeric
-            if df[col].dtype == 'object':
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='ignore')
-                except:
-                    pass
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = self.numeric_categories(df[col])
         
         return df
     
+    def numeric_candidates(self, df, source=None):
+        """Text columns worth parsing as numbers
+        
+        Without a schema cache every text column is tried. With one, only the
+        columns the (cached or freshly sampled) schema marks as numeric are.
+        """
+        if self.schema_inferrer is None or source is None:
+            return [col for col in df.columns if self.is_text_dtype(df[col].dtype)]
+        
+        schema = self.schema_inferrer.get_schema(df, source, self.to_numeric)
+        return [col for col, kind in schema.items() if kind == 'numeric' and col in df.columns]
+    
+    def schema_mismatch(self, source, col):
+        """A column the cached schema called numeric didn't parse, so cache it as text"""
+        if self.schema_inferrer is not None and source is not None:
+            self.schema_inferrer.mark_text(source, col)
+    
     def remove_outliers(self, df, config=None):
-        """Remove outliers from numeric columns using IQR method"""
+        """Remove outliers from numeric columns using IQR method
+        
+        config['outlier_bounds'] can give precomputed (lower, upper) bounds per
+        column, e.g. from QuantileSketch.iqr_bounds over every chunk of a stream.
+        """
         if not config or 'outlier_columns' not in config:
             return df
         
+        outlier_bounds = config.get('outlier_bounds') or {}
+        
         for col in config.get('outlier_columns', []):
             if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
+                if col in outlier_bounds:
+                    lower_bound, upper_bound = outlier_bounds[col]
+                else:
+                    Q1 = df[col].quantile(0.25)
+                    Q3 = df[col].quantile(0.75)
+                    IQR = Q3 - Q1
+                    
+                    lower_bound = Q1 - 1.5 * IQR
+                    upper_bound = Q3 + 1.5 * IQR
                 
                 initial_count = len(df)
                 df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
@@ -103,16 +293,111 @@ class DataCleaner:
     def standardize_text(self, df):
         """Standardize text columns"""
         for col in df.columns:
+            # Strip whitespace, lowercase specific columns (like email, country)
+            lowercase = 'country' in col.lower() or 'email' in col.lower()
+            
             if df[col].dtype == 'object':
-                # Strip whitespace
-                df[col] = df[col].str.strip()
-                
-                # Lowercase for specific columns (like email, country)
-                if 'country' in col.lower() or 'email' in col.lower():
-                    df[col] = df[col].str.lower()
+                df[col] = self.clean_text_values(df[col], lowercase)
+            elif isinstance(df[col].dtype, pd.StringDtype):
+                # Arrow-backed strings are stripped/lowercased in native code
+                cleaned = df[col].str.strip()
+                df[col] = cleaned.str.lower() if lowercase else cleaned
+            elif isinstance(df[col].dtype, pd.CategoricalDtype) and self.is_text_dtype(df[col].cat.categories.dtype):
+                df[col] = self.clean_categories(df[col], lowercase)
         
         return df
     
+    def clean_text_values(self, series, lowercase=False):
+        """Strip (and optionally lowercase) each distinct value once instead of every row"""
+        codes, uniques = pd.factorize(series)
+        
+        # Mostly-unique columns gain nothing from factorizing
+        if len(uniques) > len(series) // 2:
+            cleaned = series.str.strip()
+            return cleaned.str.lower() if lowercase else cleaned
+        
+        cleaned = pd.Series(uniques).str.strip()
+        if lowercase:
+            cleaned = cleaned.str.lower()
+        
+        values = cleaned.to_numpy(dtype=object)[codes]
+        
+        # Missing values (code -1) keep whatever they were, like .str methods do
+        missing = codes < 0
+        values[missing] = series.to_numpy()[missing]
+        
+        return pd.Series(values, index=series.index, name=series.name)
+    
+    def is_text_dtype(self, dtype):
+        """Python object strings or pandas string dtypes (including Arrow-backed ones)"""
+        return dtype == 'object' or isinstance(dtype, pd.StringDtype)
+    
+    def to_numeric(self, series, errors='raise'):
+        """pd.to_numeric that parses Arrow-backed strings natively
+        
+        Gives the same NumPy dtypes as parsing object strings (int64, or float64
+        when there are floats or nulls) rather than pandas' nullable types.
+        """
+        if not (isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == 'pyarrow'):
+            return pd.to_numeric(series, errors=errors)
+        
+        import pyarrow as pa
+        
+        # Zero-copy, but single-chunk columns come back as an Array rather than a ChunkedArray
+        values = pa.array(series)
+        if isinstance(values, pa.Array):
+            values = pa.chunked_array([values])
+        
+        # A failed cast scans the whole column, so text columns are rejected on a sample first
+        sample = values.slice(0, 1000)
+        if errors == 'raise' and self.arrow_cast_numeric(sample) is None:
+            pd.to_numeric(sample.to_pandas())
+        
+        parsed = self.arrow_cast_numeric(values)
+        if parsed is not None:
+            return pd.Series(parsed.to_pandas().to_numpy(), index=series.index, name=series.name)
+        
+        # Arrow's parser is stricter (e.g. about whitespace), so let pandas decide
+        return pd.to_numeric(series.astype(object), errors=errors)
+    
+    def arrow_cast_numeric(self, values):
+        """Cast Arrow strings to int64, else float64, or return None if neither parses"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        for arrow_type in (pa.int64(), pa.float64()):
+            try:
+                return pc.cast(values, arrow_type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+        
+        return None
+    
+    def numeric_categories(self, series):
+        """Categorical version of fix_data_types: parse the categories, keep the codes"""
+        if not self.is_text_dtype(series.cat.categories.dtype):
+            return series
+        
+        try:
+            return series.cat.rename_categories(self.to_numeric(pd.Series(series.cat.categories)).to_numpy())
+        except (ValueError, TypeError):
+            # Not all numbers, or two spellings of the same number ('1' and '01')
+            return series
+    
+    def clean_categories(self, series, lowercase=False):
+        """Strip/lowercase a categorical column by rewriting its categories, not its rows"""
+        cleaned = pd.Series(series.cat.categories).str.strip()
+        if lowercase:
+            cleaned = cleaned.str.lower()
+        
+        # Cleaning can merge categories (' UK' and 'UK'), so re-factorize them
+        new_codes, new_categories = pd.factorize(cleaned)
+        codes = series.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, new_codes[codes], -1)
+        
+        return pd.Series(pd.Categorical.from_codes(codes, categories=new_categories),
+                         index=series.index, name=series.name)
+    
     def get_cleaning_stats(self):
         """Return cleaning statistics"""
         return self.cleaning_stats
\ No newline at end of file
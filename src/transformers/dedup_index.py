@@ -0,0 +1,200 @@
+#Remembers which rows were already seen so duplicates can be dropped across chunks and runs
+
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+import uuid
+import json
+import os
+import logging
+
+class DedupIndex:
+    """Set of 64-bit row fingerprints with a memory bound
+    
+    Rows are hashed (all columns or `key_columns`) with pandas' row hashing.
+    Up to `max_memory` fingerprints are kept in a sorted in-memory array, then
+    spilled to sorted .npy files that are searched memory-mapped. With a `path`
+    the fingerprints persist, so incremental runs drop rows loaded before;
+    meta.json names the files a save() committed, together with any `info`
+    the caller saved with them.
+    Different rows colliding on 64 bits is possible but vanishingly unlikely.
+    """
+    
+    def __init__(self, key_columns=None, max_memory=5000000, path=None):
+        self.key_columns = list(key_columns) if key_columns else None
+        self.max_memory = max_memory
+        self.path = path
+        self.spill_dir = None  # Temp dir for spills when there is no path
+        self.memory = np.empty(0, dtype='uint64')
+        self.runs = []
+        self.info = {}  # Saved by the caller along with the fingerprints
+        self.logger = logging.getLogger(__name__)
+        
+        if path:
+            self.open_existing()
+    
+    def open_existing(self):
+        """Pick up fingerprints saved by earlier runs"""
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, 'meta.json')
+        
+        meta = {'key_columns': self.key_columns, 'runs': []}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['key_columns'] != self.key_columns:
+                raise ValueError(f"Dedup index at '{self.path}' was built on key columns {meta['key_columns']}, "
+                                 f"not {self.key_columns}; delete it to rebuild")
+        
+        for name in os.listdir(self.path):
+            if name.endswith('.pending'):
+                # Spilled by a run that never finished
+                os.remove(os.path.join(self.path, name))
+        # Indexes saved before meta.json listed its files committed every .npy
+        names = meta['runs'] if 'runs' in meta else [name for name in os.listdir(self.path) if name.endswith('.npy')]
+        self.runs = [os.path.join(self.path, name) for name in sorted(names)]
+        self.info = meta.get('info', {})
+        
+        self.logger.info(f"Opened dedup index '{self.path}' with {self.size()} fingerprints")
+    
+    def fingerprints(self, df):
+        """Hash each row (or its key columns) to a uint64"""
+        keys = df[self.key_columns] if self.key_columns else df
+        
+        # Narrow numbers (e.g. from DtypeCompactor) hash differently from the same 64-bit values
+        widths = {'i': 'int64', 'u': 'uint64', 'f': 'float64'}
+        narrow = {
+            col: widths[keys[col].dtype.kind] for col in keys.columns
+            if isinstance(keys[col].dtype, np.dtype) and keys[col].dtype.kind in widths and keys[col].dtype.itemsize < 8
+        }
+        if narrow:
+            keys = keys.astype(narrow)
+        
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    
+    def mark(self, df):
+        """Return a mask of rows seen for the first time and remember them
+        
+        A row is new if it isn't duplicated earlier in df and wasn't in any
+        earlier frame passed to this index.
+        """
+        return self.mark_fingerprints(self.fingerprints(df))
+    
+    def mark_fingerprints(self, fingerprints):
+        """mark() for fingerprints hashed elsewhere, e.g. in worker processes"""
+        new = ~pd.Series(fingerprints).duplicated().to_numpy()
+        new &= ~self.contains(fingerprints)
+        
+        self.add(fingerprints[new])
+        return new
+    
+    def contains(self, fingerprints):
+        """True for fingerprints already in the index"""
+        found = self.lookup(self.memory, fingerprints)
+        for run in self.runs:
+            found |= self.lookup(np.load(run, mmap_mode='r'), fingerprints)
+        return found
+    
+    def lookup(self, sorted_fingerprints, fingerprints):
+        """Binary search fingerprints in one sorted array"""
+        if not len(sorted_fingerprints):
+            return np.zeros(len(fingerprints), dtype=bool)
+        
+        positions = np.searchsorted(sorted_fingerprints, fingerprints)
+        positions[positions == len(sorted_fingerprints)] = len(sorted_fingerprints) - 1
+        return sorted_fingerprints[positions] == fingerprints
+    
+    def add(self, fingerprints):
+        """Add fingerprints that aren't in the index yet"""
+        # Stable sort finds the two sorted runs, so this is close to a merge
+        self.memory = np.sort(np.concatenate([self.memory, fingerprints]), kind='stable')
+        
+        if len(self.memory) > self.max_memory:
+            self.spill()
+    
+    def spill(self):
+        """Write the in-memory fingerprints to a sorted file and start over"""
+        if not len(self.memory):
+            return
+        
+        directory = self.path
+        if directory is None:
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix='dedup_index_')
+            directory = self.spill_dir
+        
+        # Spills only become part of a persistent index when save() renames them
+        run_path = os.path.join(directory, f"fingerprints_{uuid.uuid4().hex}.npy.pending")
+        with open(run_path, 'wb') as f:
+            np.save(f, self.memory)
+        
+        self.logger.info(f"Spilled {len(self.memory)} fingerprints to {run_path}")
+        self.runs.append(run_path)
+        self.memory = np.empty(0, dtype='uint64')
+    
+    def save(self, info=None):
+        """Persist everything added so far, and `info` if given (only for indexes with a path)
+        
+        The save counts once meta.json is replaced, so a save that fails
+        part way leaves the index (and info) as the previous one saved it.
+        """
+        if not self.path:
+            return
+        
+        self.spill()
+        if info is not None:
+            self.info = info
+        
+        committed = []
+        for run in self.runs:
+            if run.endswith('.pending'):
+                os.replace(run, run[:-len('.pending')])
+                run = run[:-len('.pending')]
+            committed.append(run)
+        self.runs = committed
+        
+        meta_path = os.path.join(self.path, 'meta.json')
+        meta = {'key_columns': self.key_columns, 'runs': [os.path.basename(run) for run in self.runs], 'info': self.info}
+        with open(meta_path + '.pending', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.pending', meta_path)
+        
+        # Files of saves that failed before meta.json named them
+        for name in os.listdir(self.path):
+            if name.endswith('.npy') and name not in meta['runs']:
+                os.remove(os.path.join(self.path, name))
+        
+        self.logger.info(f"Saved dedup index '{self.path}' with {self.size()} fingerprints")
+    
+    def clear(self):
+        """Forget every fingerprint, including saved ones once save() is called
+        
+        Until then the saved index stays as it was, so a run that fails after
+        clearing leaves the next run the fingerprints of the last good one.
+        """
+        for run in self.runs:
+            # Spills of this run aren't saved anywhere, save() drops the files meta.json no longer names
+            if run.endswith('.pending') or (self.spill_dir is not None and run.startswith(self.spill_dir)):
+                os.remove(run)
+        
+        self.runs = []
+        self.info = {}
+        self.memory = np.empty(0, dtype='uint64')
+    
+    def close(self):
+        """Remove temporary spill files"""
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.runs = [run for run in self.runs if not run.startswith(self.spill_dir)]
+            self.spill_dir = None
+    
+    def sorted_runs(self):
+        """The fingerprints as sorted arrays of distinct values, spilled ones memory-mapped"""
+        yield self.memory
+        for run in self.runs:
+            yield np.load(run, mmap_mode='r')
+    
+    def size(self):
+        """Number of fingerprints in the index"""
+        return len(self.memory) + sum(len(np.load(run, mmap_mode='r')) for run in self.runs)
\ No newline at end of file
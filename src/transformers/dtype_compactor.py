@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+import logging
+
+# Declared compact dtypes per source; columns not listed are inferred
+COMPACT_SCHEMAS = {
+    'raw_transactions': {
+        'InvoiceNo': 'category',
+        'StockCode': 'category',
+        'Description': 'category',
+        'Country': 'category',
+        'CustomerID': 'float32',
+        'Quantity': 'int32'
+        # UnitPrice stays float64, float32 rounding moves prices across the IQR outlier bounds
+    },
+    'weather': {
+        'temp_max': 'float32',
+        'temp_min': 'float32',
+        'precipitation': 'float32'
+    }
+}
+
+class DtypeCompactor:
+    def __init__(self, category_threshold=0.5):
+        # Text columns with fewer unique values than this share of rows become categories
+        self.category_threshold = category_threshold
+        self.logger = logging.getLogger(__name__)
+        self.last_report = []
+    
+    def schema_for(self, source):
+        """Return the declared dtype map for a source (usable as a read_csv dtype map)"""
+        return dict(COMPACT_SCHEMAS.get(source, {}))
+    
+    def compact(self, df, source=None):
+        """Convert text to categories and downcast numerics, returning a new DataFrame"""
+        schema = self.schema_for(source)
+        before = df.memory_usage(deep=True, index=False)
+        
+        columns = {}
+        for col in df.columns:
+            target = schema.get(col) or self.infer_dtype(df[col])
+            columns[col] = self.convert(df[col], target)
+        
+        compacted = pd.DataFrame(columns, index=df.index)
+        after = compacted.memory_usage(deep=True, index=False)
+        
+        self.last_report = [
+            {
+                'column': col,
+                'dtype_before': str(df[col].dtype),
+                'dtype_after': str(compacted[col].dtype),
+                'bytes_before': int(before[col]),
+                'bytes_after': int(after[col]),
+                'bytes_saved': int(before[col] - after[col])
+            }
+            for col in df.columns
+        ]
+        
+        saved = before.sum() - after.sum()
+        self.logger.info(f"Compacted {source or 'frame'}: {before.sum() / 1024 ** 2:.1f} MB -> "
+                         f"{after.sum() / 1024 ** 2:.1f} MB ({saved / 1024 ** 2:.1f} MB saved)")
+        for row in self.last_report:
+            self.logger.info(f"  {row['column']}: {row['dtype_before']} -> {row['dtype_after']}, "
+                             f"{row['bytes_saved'] / 1024 ** 2:.2f} MB saved")
+        
+        return compacted
+    
+    def infer_dtype(self, series):
+        """Pick a compact dtype for a column that isn't in the schema"""
+        if series.dtype == 'object' or isinstance(series.dtype, pd.StringDtype):
+            if len(series) and series.nunique() / len(series) < self.category_threshold:
+                return 'category'
+            return None
+        if pd.api.types.is_integer_dtype(series):
+            return 'integer'
+        if pd.api.types.is_float_dtype(series) and series.dtype != 'float32':
+            # Only when every value survives the round trip
+            narrowed = series.astype('float32')
+            if ((narrowed == series) | series.isnull()).all():
+                return 'float32'
+        return None
+    
+    def convert(self, series, target):
+        """Convert one column, keeping it unchanged if the values don't fit"""
+        if target is None or str(series.dtype) == target:
+            return series
+        
+        if target == 'integer':
+            return pd.to_numeric(series, downcast='integer')
+        
+        if target == 'category':
+            return series.astype('category')
+        
+        if np.dtype(target).kind in 'iu':
+            info = np.iinfo(target)
+            if series.isnull().any() or series.min() < info.min or series.max() > info.max:
+                self.logger.warning(f"Column '{series.name}' doesn't fit {target}, downcasting instead")
+                return pd.to_numeric(series, downcast='integer')
+        
+        return series.astype(target)
+    
+    def get_report(self):
+        """Return bytes saved per column from the last compact() call"""
+        return self.last_report
\ No newline at end of file
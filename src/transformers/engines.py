@@ -0,0 +1,484 @@
+#DataFrame engines that run the cleaning rules, schema mappings and quality counts
+
+from transformers.data_cleaner import DataCleaner
+import pyarrow as pa
+import pandas as pd
+import numpy as np
+import logging
+
+ENGINES = ['pandas', 'polars', 'duckdb']
+
+# What pd.to_numeric accepts: optional sign, digits with an optional fraction, optional exponent
+NUMBER_PATTERN = r'^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$'
+INTEGER_PATTERN = r'^[+-]?[0-9]+$'
+WHITESPACE = ' \t\n\r\x0b\x0c'
+
+def get_engine(name):
+    """Return a new engine by name ('pandas', 'polars' or 'duckdb')"""
+    if name == 'pandas':
+        return PandasEngine()
+    if name == 'polars':
+        return PolarsEngine()
+    if name == 'duckdb':
+        return DuckDBEngine()
+    raise ValueError(f"Unknown engine: {name} (expected one of {ENGINES})")
+
+def to_arrow(df):
+    """pandas -> Arrow table, text categoricals decoded to plain strings"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+class PandasEngine:
+    """The reference engine: DataCleaner and SchemaMapper as they are"""
+    
+    name = 'pandas'
+    
+    def __init__(self):
+        self.cleaning_stats = {}
+        self.logger = logging.getLogger(__name__)
+    
+    def transform(self, df, config, mapper, mapping, schema_inferrer=None, dedup_index=None):
+        """Clean df with `config` (as DataCleaner.clean) and map it with mapper's `mapping`"""
+        cleaner = DataCleaner(schema_inferrer=schema_inferrer, dedup_index=dedup_index)
+        mapped = mapper.map(cleaner.clean(df, config), mapping)
+        self.cleaning_stats = cleaner.get_cleaning_stats()
+        return mapped
+    
+    def profile(self, df, value_ranges=None, duplicates=True):
+        """Counts the quality checks need: rows, nulls per column, duplicate rows, out-of-range values, min/max
+        
+        `value_ranges` only has numeric columns of df, as DataQualityValidator.range_columns() picks them.
+        """
+        value_ranges = value_ranges or {}
+        return {
+            'rows': len(df),
+            'null_counts': {col: int(count) for col, count in df.isnull().sum().items()},
+            'duplicates': int(df.duplicated().sum()) if duplicates else None,
+            'out_of_range': {
+                col: int(((df[col] < min_val) | (df[col] > max_val)).sum())
+                for col, (min_val, max_val) in value_ranges.items()
+            },
+            'min': {col: float(df[col].min()) for col in value_ranges},
+            'max': {col: float(df[col].max()) for col in value_ranges}
+        }
+
+class FrameEngine:
+    """Runs DataCleaner's fused cleaning rules and a SchemaMapper mapping elsewhere
+    
+    The order of the steps and every keep/drop decision live here, so all
+    engines clean the same way as pandas; subclasses only count, filter,
+    parse and build the final projection in their own library. Frames go in
+    and come out as pandas, with the same dtypes and index as the pandas path.
+    Columns are judged numeric on the rows kept so far (pandas looks at all
+    rows when they all parse, which only differs in the int/float choice).
+    """
+    
+    name = None
+    
+    def __init__(self):
+        self.cleaning_stats = {}
+        self.logger = logging.getLogger(__name__)
+    
+    def transform(self, df, config, mapper, mapping, schema_inferrer=None, dedup_index=None):
+        """Clean df with `config` (as DataCleaner.clean) and map it with mapper's `mapping`
+        
+        The schema cache isn't needed: engines test every text column on the kept rows.
+        """
+        config = config or {}
+        self.logger.info(f"Starting {self.name} cleaning. Input shape: {df.shape}")
+        
+        original_rows = len(df)
+        cleaner = DataCleaner()
+        # pandas cleans categoricals through their categories, so their cleaned categories come from pandas
+        categorical = {
+            col: cleaner.standardize_text(pd.DataFrame({col: cleaner.numeric_categories(df[col].iloc[:0])}))[col].cat.categories
+            for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)
+        }
+        text_columns = [col for col in df.columns
+                        if cleaner.is_text_dtype(df[col].dtype) or (col in categorical and cleaner.is_text_dtype(df[col].cat.categories.dtype))]
+        
+        try:
+            if dedup_index is not None:
+                self.load(df, dedup_index.mark(df))
+                rows = self.count()
+            elif config.get('duplicated') is not None:
+                self.load(df, ~np.asarray(config['duplicated']))
+                rows = self.count()
+            else:
+                self.load(df)
+                rows = self.drop_duplicates()
+            self.cleaning_stats['duplicates_removed'] = original_rows - rows
+            self.logger.info(f"Removed {self.cleaning_stats['duplicates_removed']} duplicate rows")
+            
+            nulls_removed = cleaner.drop_critical_nulls(self.null_counts(), rows, config.get('critical_columns', []), self.drop_nulls)
+            self.cleaning_stats['nulls_removed'] = nulls_removed
+            rows -= sum(nulls_removed.values())
+            
+            numeric = {}
+            for col in text_columns:
+                if col in categorical:
+                    categories = categorical[col]
+                    kind = None if cleaner.is_text_dtype(categories.dtype) else ('int' if pd.api.types.is_integer_dtype(categories) else 'float')
+                else:
+                    kind = self.numeric_kind(col)
+                if kind is not None:
+                    numeric[col] = kind
+                    self.cast_numeric(col, kind)
+            
+            outlier_bounds = config.get('outlier_bounds') or {}
+            outliers_removed = {}
+            for col in config.get('outlier_columns', []):
+                # Categoricals aren't numeric to pandas, even with numeric categories
+                if col in categorical or not (col in numeric or (col in df.columns and pd.api.types.is_numeric_dtype(df[col]))):
+                    continue
+                
+                if col in outlier_bounds:
+                    lower_bound, upper_bound = outlier_bounds[col]
+                else:
+                    # No rows left gives NaN bounds, like pandas
+                    Q1, Q3 = (np.nan if q is None else q for q in self.quartiles(col))
+                    IQR = Q3 - Q1
+                    lower_bound, upper_bound = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+                
+                outliers_removed[col] = self.drop_outside(col, lower_bound, upper_bound)
+                rows -= outliers_removed[col]
+                self.logger.info(f"Removed {outliers_removed[col]} outliers from column '{col}'")
+            self.cleaning_stats['outliers_removed'] = outliers_removed
+            
+            steps = [step for step in mapper.get_plan(mapping)
+                     if not (step['optional'] and not set(step['inputs']) <= set(df.columns))]
+            text = {col: 'country' in col.lower() or 'email' in col.lower() for col in text_columns if col not in numeric}
+            result = self.finish(steps, text)
+        finally:
+            self.close()
+        
+        result = self.restore(result, df, steps, mapper, categorical, numeric)
+        
+        self.cleaning_stats['rows_removed'] = original_rows - len(result)
+        self.cleaning_stats['removal_percentage'] = ((original_rows - len(result)) / original_rows) * 100 if original_rows else 0
+        self.logger.info(f"Cleaning complete. Output shape: {result.shape}")
+        
+        return result
+    
+    def restore(self, result, df, steps, mapper, categorical, numeric):
+        """Give the engine's output the pandas path's index, dtypes and datetime fallback"""
+        result.index = df.index[result.pop('__row').to_numpy()]
+        
+        for step in steps:
+            name = step['name']
+            if step['kind'] == 'datetime':
+                raw = result.pop(f"__raw_{name}")
+                # Values that don't match the format go through pandas' fallbacks, like SchemaMapper
+                if result[name].isnull().sum() > raw.isnull().sum():
+                    result[name] = mapper.parse_datetime(raw, step['spec'].get('format'))
+                result[name] = result[name].astype('datetime64[ns]')
+            elif step['kind'] == 'rename':
+                source = step['spec']['from']
+                if source in categorical:
+                    result[name] = pd.Series(pd.Categorical(result[name], categories=categorical[source]),
+                                             index=result.index, name=name)
+                elif isinstance(df[source].dtype, pd.StringDtype) and source not in numeric:
+                    result[name] = result[name].astype(df[source].dtype)
+        
+        return result
+    
+    def close(self):
+        """Release whatever the engine holds between steps"""
+
+class PolarsEngine(FrameEngine):
+    """Multi-threaded engine on Polars; filters stay lazy until the final projection"""
+    
+    name = 'polars'
+    
+    def __init__(self):
+        try:
+            import polars
+        except ImportError as e:
+            raise ImportError("engine='polars' needs the polars package (pip install polars)") from e
+        
+        self.pl = polars
+        super().__init__()
+    
+    def load(self, df, keep=None):
+        pl = self.pl
+        frame = pl.from_arrow(to_arrow(df)).with_row_index('__row')
+        if keep is not None:
+            frame = frame.filter(pl.Series(keep))
+        
+        self.columns = list(df.columns)
+        self.frame = frame
+        self.exprs = {col: pl.col(col) for col in self.columns}
+        self.predicates = []
+    
+    def current(self):
+        """The kept rows, as a lazy frame"""
+        frame = self.frame.lazy()
+        return frame.filter(*self.predicates) if self.predicates else frame
+    
+    def count(self, predicate=None):
+        frame = self.current()
+        if predicate is not None:
+            frame = frame.filter(predicate)
+        return frame.select(self.pl.len()).collect().item()
+    
+    def drop_duplicates(self):
+        # Duplicates need the whole frame anyway, so the deduplicated rows are materialized once
+        self.frame = self.frame.filter(self.pl.struct(self.columns).is_first_distinct())
+        return self.frame.height
+    
+    def null_counts(self):
+        return self.current().select(self.columns).null_count().collect().row(0, named=True)
+    
+    def drop_nulls(self, col):
+        return self.filter(self.pl.col(col).is_not_null())
+    
+    def filter(self, predicate):
+        """Keep rows matching predicate, return how many were dropped"""
+        before = self.count()
+        self.predicates.append(predicate)
+        return before - self.count()
+    
+    def stripped(self, col):
+        return self.pl.col(col).cast(self.pl.Utf8).str.strip_chars(WHITESPACE)
+    
+    def numeric_kind(self, col):
+        """'int' or 'float' if every kept value parses as a number, else None"""
+        pl = self.pl
+        value = self.stripped(col)
+        # Empty strings become NaN in pd.to_numeric, so they don't count against a column
+        present = value.is_not_null() & (value != '')
+        
+        bad, non_int = self.current().select(
+            (present & ~value.str.contains(NUMBER_PATTERN)).sum().alias('bad'),
+            (value.is_not_null() & ~value.str.contains(INTEGER_PATTERN)).sum().alias('non_int')
+        ).collect().row(0)
+        
+        if bad:
+            return None
+        return 'float' if non_int else 'int'
+    
+    def cast_numeric(self, col, kind):
+        self.exprs[col] = self.stripped(col).cast(self.pl.Int64 if kind == 'int' else self.pl.Float64, strict=False)
+    
+    def quartiles(self, col):
+        value = self.exprs[col]
+        return self.current().select(
+            value.quantile(0.25, interpolation='linear').alias('q1'),
+            value.quantile(0.75, interpolation='linear').alias('q3')
+        ).collect().row(0)
+    
+    def drop_outside(self, col, lower_bound, upper_bound):
+        return self.filter(self.exprs[col].is_between(lower_bound, upper_bound))
+    
+    def finish(self, steps, text):
+        """Clean text, map to the target schema and collect, as pandas"""
+        pl = self.pl
+        # Parsed numbers replace their text columns, the remaining text is stripped/lowercased
+        cleaned = [expr.alias(col) for col, expr in self.exprs.items() if col not in text]
+        for col, lowercase in text.items():
+            value = self.stripped(col)
+            cleaned.append((value.str.to_lowercase() if lowercase else value).alias(col))
+        
+        mapped = [pl.col('__row')]
+        for step in steps:
+            spec = step['spec']
+            if step['kind'] == 'rename':
+                mapped.append(pl.col(spec['from']).alias(step['name']))
+            elif step['kind'] == 'datetime':
+                source = pl.col(spec['from'])
+                parsed = source.str.strptime(pl.Datetime('ns'), spec['format'], strict=False) if spec['from'] in text else source.cast(pl.Datetime('ns'))
+                mapped.extend([parsed.alias(step['name']), source.alias(f"__raw_{step['name']}")])
+            elif step['kind'] == 'expr':
+                mapped.append(pl.sql_expr(spec['expr']).alias(step['name']))
+            else:
+                mapped.append(pl.lit(spec['value']).alias(step['name']))
+        
+        return self.current().with_columns(cleaned).select(mapped).collect().to_pandas()
+    
+    def profile(self, df, value_ranges=None, duplicates=True):
+        """Counts the quality checks need, as PandasEngine.profile"""
+        pl = self.pl
+        value_ranges = value_ranges or {}
+        frame = pl.from_arrow(to_arrow(df))
+        
+        # One pass for every range column: violations, then minimum and maximum
+        stats = frame.select(
+            [((pl.col(col) < min_val) | (pl.col(col) > max_val)).sum().alias(f"out_{col}")
+             for col, (min_val, max_val) in value_ranges.items()] +
+            [pl.col(col).min().cast(pl.Float64).alias(f"min_{col}") for col in value_ranges] +
+            [pl.col(col).max().cast(pl.Float64).alias(f"max_{col}") for col in value_ranges]
+        ).row(0) if value_ranges else ()
+        stats = [float('nan') if value is None else value for value in stats]
+        count = len(value_ranges)
+        
+        return {
+            'rows': frame.height,
+            'null_counts': frame.null_count().row(0, named=True) if frame.width else {},
+            'duplicates': frame.height - frame.n_unique() if duplicates and frame.height else (0 if duplicates else None),
+            'out_of_range': dict(zip(value_ranges, stats[:count])),
+            'min': dict(zip(value_ranges, stats[count:2 * count])),
+            'max': dict(zip(value_ranges, stats[2 * count:]))
+        }
+
+class DuckDBEngine(FrameEngine):
+    """Multi-threaded, in-process SQL engine on DuckDB"""
+    
+    name = 'duckdb'
+    
+    def __init__(self):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("engine='duckdb' needs the duckdb package (pip install duckdb)") from e
+        
+        self.duckdb = duckdb
+        self.con = None
+        super().__init__()
+    
+    def quote(self, col):
+        return '"' + col.replace('"', '""') + '"'
+    
+    def load(self, df, keep=None):
+        table = to_arrow(df)
+        table = table.append_column('__row', pa.array(np.arange(len(df))))
+        if keep is not None:
+            table = table.filter(pa.array(keep))
+        
+        self.con = self.duckdb.connect()
+        self.con.register('source_rows', table)
+        self.table = 'source_rows'
+        self.columns = list(df.columns)
+        self.exprs = {col: self.quote(col) for col in self.columns}
+        self.predicates = []
+    
+    def where(self, predicate=None):
+        predicates = self.predicates + ([predicate] if predicate else [])
+        return f" WHERE {' AND '.join(predicates)}" if predicates else ''
+    
+    def query(self, select, predicate=None):
+        return self.con.execute(f"SELECT {select} FROM {self.table}{self.where(predicate)}").fetchone()
+    
+    def count(self, predicate=None):
+        return self.query('count(*)', predicate)[0]
+    
+    def drop_duplicates(self):
+        columns = ', '.join(self.quote(col) for col in self.columns)
+        self.con.execute(f"CREATE TEMP TABLE deduped AS SELECT * FROM source_rows "
+                         f"QUALIFY row_number() OVER (PARTITION BY {columns} ORDER BY __row) = 1")
+        self.table = 'deduped'
+        return self.count()
+    
+    def null_counts(self):
+        counts = self.query(', '.join(f"count(*) - count({self.quote(col)})" for col in self.columns))
+        return dict(zip(self.columns, counts))
+    
+    def drop_nulls(self, col):
+        return self.filter(f"{self.quote(col)} IS NOT NULL")
+    
+    def filter(self, predicate):
+        """Keep rows matching predicate, return how many were dropped"""
+        before = self.count()
+        self.predicates.append(f"({predicate})")
+        return before - self.count()
+    
+    def stripped(self, col):
+        return f"trim(CAST({self.quote(col)} AS VARCHAR), '{WHITESPACE}')"
+    
+    def numeric_kind(self, col):
+        """'int' or 'float' if every kept value parses as a number, else None"""
+        value = self.stripped(col)
+        # Empty strings become NaN in pd.to_numeric, so they don't count against a column
+        bad, non_int = self.query(
+            f"count(*) FILTER (WHERE {value} <> '' AND NOT regexp_matches({value}, '{NUMBER_PATTERN}')), "
+            f"count(*) FILTER (WHERE {value} IS NOT NULL AND NOT regexp_matches({value}, '{INTEGER_PATTERN}'))"
+        )
+        
+        if bad:
+            return None
+        return 'float' if non_int else 'int'
+    
+    def cast_numeric(self, col, kind):
+        self.exprs[col] = f"TRY_CAST({self.stripped(col)} AS {'BIGINT' if kind == 'int' else 'DOUBLE'})"
+    
+    def quartiles(self, col):
+        value = self.exprs[col]
+        return self.query(f"quantile_cont({value}, 0.25), quantile_cont({value}, 0.75)")
+    
+    def drop_outside(self, col, lower_bound, upper_bound):
+        return self.filter(f"{self.exprs[col]} BETWEEN {float(lower_bound)!r} AND {float(upper_bound)!r}")
+    
+    def finish(self, steps, text):
+        """Clean text, map to the target schema and fetch, as pandas"""
+        cleaned = ['__row']
+        for col in self.columns:
+            if col in text:
+                value = self.stripped(col)
+                cleaned.append(f"{'lower(' + value + ')' if text[col] else value} AS {self.quote(col)}")
+            else:
+                cleaned.append(f"{self.exprs[col]} AS {self.quote(col)}")
+        
+        mapped = ['__row']
+        params = []
+        for step in steps:
+            spec = step['spec']
+            name = self.quote(step['name'])
+            if step['kind'] == 'rename':
+                mapped.append(f"{self.quote(spec['from'])} AS {name}")
+            elif step['kind'] == 'datetime':
+                source = self.quote(spec['from'])
+                parsed = f"try_strptime({source}, ?)" if spec['from'] in text else f"CAST({source} AS TIMESTAMP)"
+                if spec['from'] in text:
+                    params.append(spec['format'])
+                mapped.extend([f"{parsed} AS {name}", f"{source} AS {self.quote('__raw_' + step['name'])}"])
+            elif step['kind'] == 'expr':
+                mapped.append(f"{spec['expr']} AS {name}")
+            else:
+                params.append(spec['value'])
+                mapped.append(f"? AS {name}")
+        
+        sql = (f"SELECT {', '.join(mapped)} FROM (SELECT {', '.join(cleaned)} FROM {self.table}{self.where()}) "
+               f"ORDER BY __row")
+        return self.con.execute(sql, params).fetch_arrow_table().to_pandas()
+    
+    def close(self):
+        if self.con is not None:
+            self.con.close()
+            self.con = None
+    
+    def profile(self, df, value_ranges=None, duplicates=True):
+        """Counts the quality checks need, as PandasEngine.profile"""
+        value_ranges = value_ranges or {}
+        columns = list(df.columns)
+        
+        selects = ['count(*)']
+        selects += [f"count(*) - count({self.quote(col)})" for col in columns]
+        selects += [f"count(*) FILTER (WHERE {self.quote(col)} < {min_val!r} OR {self.quote(col)} > {max_val!r})"
+                    for col, (min_val, max_val) in value_ranges.items()]
+        selects += [f"{func}({self.quote(col)})" for func in ('min', 'max') for col in value_ranges]
+        if duplicates:
+            selects.append("count(*) - (SELECT count(*) FROM (SELECT DISTINCT * FROM profiled))")
+        
+        con = self.duckdb.connect()
+        try:
+            con.register('profiled', to_arrow(df))
+            values = list(con.execute(f"SELECT {', '.join(selects)} FROM profiled").fetchone())
+        finally:
+            con.close()
+        
+        rows = values.pop(0)
+        null_counts = dict(zip(columns, values[:len(columns)]))
+        values = values[len(columns):]
+        out_of_range = dict(zip(value_ranges, values[:len(value_ranges)]))
+        extremes = [float('nan') if value is None else float(value) for value in values[len(value_ranges):3 * len(value_ranges)]]
+        
+        return {
+            'rows': rows,
+            'null_counts': null_counts,
+            'duplicates': values[-1] if duplicates else None,
+            'out_of_range': out_of_range,
+            'min': dict(zip(value_ranges, extremes[:len(value_ranges)])),
+            'max': dict(zip(value_ranges, extremes[len(value_ranges):]))
+        }
\ No newline at end of file
@@ -0,0 +1,109 @@
+#Mergeable quantile sketch so IQR bounds can be built chunk by chunk
+
+import numpy as np
+import math
+
+class QuantileSketch:
+    """KLL-style quantile sketch
+    
+    Values are kept exactly until there are more than `exact_limit` of them,
+    then compacted into levels where each item stands for 2^level values.
+    Quantiles are then within about `accuracy` in rank (0.005 = half a
+    percentile) of the exact answer. Sketches built over separate chunks or
+    partitions can be merged.
+    """
+    
+    # Each lower level holds 2/3 as many items as the one above it
+    LEVEL_DECAY = 2 / 3
+    
+    def __init__(self, accuracy=0.005, exact_limit=100000, seed=None):
+        # Normalized rank error of KLL is about 1.65 / k
+        self.accuracy = accuracy
+        self.k = max(8, math.ceil(1.65 / accuracy))
+        self.exact_limit = exact_limit
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.exact = True
+    
+    def update(self, values):
+        """Add a batch of values (NaNs are skipped, like pandas quantile)"""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        
+        if self.exact and self.count > self.exact_limit:
+            self.exact = False
+        if not self.exact:
+            self.compress()
+        
+        return self
+    
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        
+        self.count += other.count
+        self.exact = self.exact and other.exact and self.count <= self.exact_limit
+        if not self.exact:
+            self.compress()
+        
+        return self
+    
+    def compress(self):
+        """Halve every level that is over capacity, promoting a random half of it"""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                items = np.sort(items)
+                
+                # An odd item out stays at this level
+                self.levels[level] = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[self.rng.integers(2)::2]])
+            level += 1
+    
+    def capacity(self, level):
+        """Items a level may hold, the top level holds k"""
+        depth = len(self.levels) - 1 - level
+        return max(2, math.ceil(self.k * self.LEVEL_DECAY ** depth))
+    
+    def quantile(self, q):
+        """Return the q-th quantile (0 <= q <= 1), exact while the sketch is in exact mode"""
+        if not self.count:
+            return np.nan
+        
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))
+        
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        weights = weights[order]
+        
+        # Each item sits at the middle of the rank range it stands for
+        ranks = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return float(np.interp(q, ranks, items))
+    
+    def iqr_bounds(self, whisker=1.5):
+        """(lower, upper) outlier bounds, Q1 - whisker*IQR and Q3 + whisker*IQR"""
+        q1 = self.quantile(0.25)
+        q3 = self.quantile(0.75)
+        iqr = q3 - q1
+        return (q1 - whisker * iqr, q3 + whisker * iqr)
+    
+    def size(self):
+        """Number of values the sketch is holding"""
+        return sum(len(items) for items in self.levels)
\ No newline at end of file
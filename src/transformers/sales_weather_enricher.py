@@ -0,0 +1,138 @@
+#Joins daily sales per country with the weather measured there
+
+import pandas as pd
+import numpy as np
+import logging
+
+class SalesWeatherEnricher:
+    """Builds the day x country sales fact table and joins weather onto it
+    
+    Mapped e-commerce chunks are reduced to partial aggregates as they come,
+    so the full transaction table never has to be in memory. Partials from
+    separate chunks or partitions merge exactly: sums add up and distinct
+    orders are kept as (day, country, transaction_id) until the end.
+    """
+    
+    KEYS = ['sale_date', 'country']
+    SUMS = ['revenue', 'units', 'line_items']
+    WEATHER_COLUMNS = ['temp_max_c', 'temp_min_c', 'precipitation_mm']
+    
+    def __init__(self, default_location='United Kingdom'):
+        # Weather without a location column (the London-only extract) counts as this country
+        self.default_location = default_location
+        self.totals = None
+        self.orders = None
+        self.logger = logging.getLogger(__name__)
+    
+    def update(self, df):
+        """Add a chunk of mapped e-commerce rows"""
+        totals, orders = self.aggregate(df)
+        self.merge_partial(totals, orders)
+        return self
+    
+    def aggregate(self, df):
+        """Reduce mapped e-commerce rows to per day x country sums and distinct orders"""
+        frame = self.day_country(df).assign(
+            revenue=df['total_price'],
+            units=df['quantity'],
+            transaction_id=df['transaction_id']
+        )
+        
+        totals = frame.groupby(self.KEYS, sort=False).agg(
+            revenue=('revenue', 'sum'),
+            units=('units', 'sum'),
+            line_items=('revenue', 'size')
+        )
+        orders = frame[self.KEYS + ['transaction_id']].drop_duplicates()
+        
+        return totals, orders
+    
+    def day_country(self, df):
+        """The day x country key of each mapped e-commerce row"""
+        return pd.DataFrame({
+            'sale_date': pd.to_datetime(df['transaction_date']).dt.normalize(),
+            # Plain strings so partials from chunks with different dtypes/categories line up
+            'country': pd.Series(np.asarray(df['country'], dtype=object), index=df.index).fillna('unspecified')
+        })
+    
+    def merge(self, other):
+        """Fold another enricher's partial aggregates into this one"""
+        if other.totals is not None:
+            self.merge_partial(other.totals, other.orders)
+        return self
+    
+    def merge_partial(self, totals, orders):
+        """Add one set of partial aggregates"""
+        if self.totals is None:
+            self.totals, self.orders = totals, orders
+            return
+        
+        self.totals = pd.concat([self.totals, totals]).groupby(level=self.KEYS, sort=False).sum()
+        self.orders = pd.concat([self.orders, orders], ignore_index=True).drop_duplicates()
+    
+    def result(self):
+        """Daily sales per country: revenue, units, distinct orders and line items"""
+        columns = self.KEYS + ['revenue', 'units', 'orders', 'line_items']
+        if self.totals is None:
+            return pd.DataFrame(columns=columns)
+        
+        order_counts = self.orders.groupby(self.KEYS, sort=False).size().rename('orders')
+        daily = self.totals.join(order_counts).reset_index()
+        
+        return daily[columns].sort_values(self.KEYS, ignore_index=True)
+    
+    def add_existing(self, daily, existing, loaded=None):
+        """Add totals already loaded for the same days
+        
+        Sums add up across runs, but a line added late to an invoice loaded
+        before would count its order twice. So with `loaded`, the target's
+        transaction_date, country and transaction_id on these days (this run's
+        rows included), distinct orders are counted again from it instead.
+        Weather already joined to existing rows is kept for enrich() to fall back on.
+        """
+        if existing is None or existing.empty:
+            return daily
+        
+        measures = ['revenue', 'units', 'orders', 'line_items']
+        existing = existing.assign(sale_date=pd.to_datetime(existing['sale_date']))
+        
+        combined = pd.concat([existing[self.KEYS + measures], daily[self.KEYS + measures]], ignore_index=True)
+        combined = combined.groupby(self.KEYS, as_index=False, sort=True).sum()
+        
+        if loaded is not None:
+            orders = self.day_country(loaded).assign(transaction_id=loaded['transaction_id']).drop_duplicates()
+            orders = orders.groupby(self.KEYS, as_index=False).size().rename(columns={'size': 'orders'})
+            combined = combined.drop(columns='orders').merge(orders, on=self.KEYS, how='left')[self.KEYS + measures]
+        
+        # Columns that are all NULL in the table come back as objects, which would make the joined ones text
+        weather = existing[self.KEYS].assign(**{col: pd.to_numeric(existing[col]) for col in self.WEATHER_COLUMNS if col in existing.columns})
+        return combined.merge(weather, on=self.KEYS, how='left')
+    
+    def enrich(self, daily, weather_df):
+        """Left-join mapped weather onto daily sales by date and location"""
+        if weather_df is None or weather_df.empty:
+            joined = daily.copy()
+            for col in self.WEATHER_COLUMNS:
+                if col not in joined.columns:
+                    joined[col] = np.nan
+            return joined
+        
+        locations = weather_df['location'] if 'location' in weather_df.columns else self.default_location
+        weather = pd.DataFrame({
+            'sale_date': pd.to_datetime(weather_df['date']).dt.normalize(),
+            # Countries are lowercased by the cleaner, weather locations are country names
+            'country': pd.Series(locations, index=weather_df.index, dtype=object).str.strip().str.lower(),
+            **{col: weather_df[col] for col in self.WEATHER_COLUMNS}
+        }).drop_duplicates(self.KEYS, keep='last')
+        
+        previous = daily[[col for col in self.WEATHER_COLUMNS if col in daily.columns]]
+        joined = daily.drop(columns=previous.columns).merge(weather, on=self.KEYS, how='left')
+        
+        # Keep weather joined by earlier runs for days the current extract no longer covers
+        for col in previous.columns:
+            joined[col] = joined[col].fillna(pd.Series(previous[col].to_numpy(), index=joined.index))
+        
+        matched = joined['temp_max_c'].notnull().sum()
+        self.logger.info(f"Joined weather to {matched} of {len(joined)} day x country rows")
+        
+        return joined
\ No newline at end of file
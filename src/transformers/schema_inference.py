@@ -0,0 +1,103 @@
+#Remembers which text columns hold numbers so they aren't re-inferred every run
+
+import pandas as pd
+from datetime import datetime
+import hashlib
+import json
+import os
+import logging
+
+class SchemaInferrer:
+    def __init__(self, cache_path='data/cache/schemas.json', sample_size=10000):
+        # One entry per source table, re-inferred when its column set or dtypes change
+        self.cache_path = cache_path
+        self.sample_size = sample_size
+        self.logger = logging.getLogger(__name__)
+    
+    def get_schema(self, df, source, parse=pd.to_numeric):
+        """Return {column: 'numeric' or 'text'} for the text columns of df
+        
+        Uses the cached schema when the fingerprint matches, otherwise infers it
+        from a sample of rows (parsed with `parse`) and caches the result.
+        """
+        fingerprint = self.fingerprint(df)
+        cached = self.load().get(source)
+        
+        if cached and cached['fingerprint'] == fingerprint:
+            return cached['columns']
+        
+        columns = self.infer(df, parse)
+        self.save(source, fingerprint, columns)
+        self.logger.info(f"Inferred schema for '{source}': "
+                         f"{[col for col, kind in columns.items() if kind == 'numeric']} numeric")
+        
+        return columns
+    
+    def infer(self, df, parse=pd.to_numeric):
+        """Decide each text column's type from up to sample_size rows"""
+        sample = df.sample(self.sample_size, random_state=0) if len(df) > self.sample_size else df
+        
+        columns = {}
+        for col in df.columns:
+            if not (df[col].dtype == 'object' or isinstance(df[col].dtype, pd.StringDtype)):
+                continue
+            
+            try:
+                parse(sample[col])
+                columns[col] = 'numeric'
+            except (ValueError, TypeError):
+                # One non-number in the sample means the full column can't be numeric either
+                columns[col] = 'text'
+        
+        return columns
+    
+    def fingerprint(self, df):
+        """Hash of the column names and their dtypes, in order"""
+        signature = json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()])
+        return hashlib.sha1(signature.encode()).hexdigest()
+    
+    def mark_text(self, source, col):
+        """Cache a column the sample called numeric as text, e.g. after a rare non-number outside the sample
+        
+        Dropping the entry instead would re-infer the same seeded sample next run and cache the
+        same mistake again, so the cache would never settle.
+        """
+        schemas = self.load()
+        cached = schemas.get(source)
+        if cached is None or cached['columns'].get(col) != 'numeric':
+            return
+        
+        cached['columns'][col] = 'text'
+        self.write(schemas)
+        self.logger.warning(f"Column '{col}' of '{source}' didn't parse as numeric in full, cached as text")
+    
+    def load(self):
+        """Read all cached schemas"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        
+        with open(self.cache_path) as f:
+            return json.load(f)
+    
+    def save(self, source, fingerprint, columns):
+        """Cache one source's schema"""
+        schemas = self.load()
+        schemas[source] = {
+            'fingerprint': fingerprint,
+            'columns': columns,
+            'inferred_at': datetime.now().isoformat()
+        }
+        self.write(schemas)
+    
+    def write(self, schemas):
+        """Replace the cache file atomically"""
+        if not self.cache_path:
+            return
+        
+        if os.path.dirname(self.cache_path):
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(schemas, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
\ No newline at end of file
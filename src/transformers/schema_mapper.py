@@ -1,43 +1,167 @@
 import pandas as pd
+import numpy as np
 import logging
+import re
 from datetime import datetime
 
+# Target schemas as data: each column is a rename ('from'), a derived
+# expression over source columns ('expr') or a constant ('value').
+# 'type': 'datetime' parses with 'format', falling back to inference.
+# 'optional' columns are only mapped when the source has them.
+MAPPINGS = {
+    'ecommerce': {
+        'columns': [
+            {'name': 'transaction_id', 'from': 'InvoiceNo'},
+            {'name': 'transaction_date', 'from': 'InvoiceDate', 'type': 'datetime', 'format': '%m/%d/%Y %H:%M'},
+            {'name': 'customer_id', 'from': 'CustomerID'},
+            {'name': 'product_code', 'from': 'StockCode'},
+            {'name': 'product_description', 'from': 'Description'},
+            {'name': 'quantity', 'from': 'Quantity'},
+            {'name': 'unit_price', 'from': 'UnitPrice'},
+            {'name': 'total_price', 'expr': 'Quantity * UnitPrice'},
+            {'name': 'country', 'from': 'Country'},
+            {'name': 'source', 'value': 'ecommerce_db'}
+        ]
+    },
+    'weather': {
+        'columns': [
+            {'name': 'date', 'from': 'date', 'type': 'datetime', 'format': '%Y-%m-%d'},
+            {'name': 'temp_max_c', 'from': 'temp_max'},
+            {'name': 'temp_min_c', 'from': 'temp_min'},
+            {'name': 'precipitation_mm', 'from': 'precipitation'},
+            {'name': 'source', 'value': 'weather_api'},
+            # Multi-location extracts carry where each row was measured
+            {'name': 'location', 'from': 'location', 'optional': True},
+            {'name': 'latitude', 'from': 'latitude', 'optional': True},
+            {'name': 'longitude', 'from': 'longitude', 'optional': True}
+        ]
+    }
+}
+
 class SchemaMapper:
-    def __init__(self):
+    def __init__(self, mappings=None, mapping_file=None):
+        # Mappings come from MAPPINGS, a dict like it, and/or a YAML file with the same layout
+        self.mappings = dict(mappings or MAPPINGS)
+        if mapping_file:
+            self.mappings.update(self.load_mappings(mapping_file))
+        
+        self.plans = {}
         self.logger = logging.getLogger(__name__)
     
+    def load_mappings(self, path):
+        """Read mappings from a YAML file"""
+        import yaml
+        
+        with open(path) as f:
+            return yaml.safe_load(f)
+    
+    def source_columns(self, mapping):
+        """Return the source columns a mapping needs"""
+        columns = []
+        for step in self.get_plan(mapping):
+            if step['optional']:
+                continue
+            for col in step['inputs']:
+                if col not in columns:
+                    columns.append(col)
+        
+        return columns
+    
+    def get_plan(self, mapping):
+        """Compile a mapping into plan steps once and reuse it"""
+        if mapping not in self.plans:
+            if mapping not in self.mappings:
+                raise ValueError(f"Unknown mapping: {mapping}")
+            self.plans[mapping] = [self.compile_column(spec) for spec in self.mappings[mapping]['columns']]
+        
+        return self.plans[mapping]
+    
+    def compile_column(self, spec):
+        """Turn one column spec into a plan step"""
+        if 'from' in spec:
+            kind = 'datetime' if spec.get('type') == 'datetime' else 'rename'
+            inputs = [spec['from']]
+        elif 'expr' in spec:
+            kind = 'expr'
+            # Identifiers in the expression are the source columns it reads
+            inputs = re.findall(r'[A-Za-z_]\w*', spec['expr'])
+        elif 'value' in spec:
+            kind = 'value'
+            inputs = []
+        else:
+            raise ValueError(f"Column '{spec.get('name')}' needs one of 'from', 'expr' or 'value'")
+        
+        return {
+            'name': spec['name'],
+            'kind': kind,
+            'inputs': inputs,
+            'spec': spec,
+            'optional': spec.get('optional', False)
+        }
+    
+    def map(self, df, mapping):
+        """Map a DataFrame to a target schema
+        
+        Renamed columns reuse the source column's data instead of copying it.
+        """
+        columns = {}
+        for step in self.get_plan(mapping):
+            if step['optional'] and not set(step['inputs']) <= set(df.columns):
+                continue
+            
+            spec = step['spec']
+            if step['kind'] == 'rename':
+                columns[step['name']] = df[spec['from']]
+            elif step['kind'] == 'datetime':
+                columns[step['name']] = self.parse_datetime(df[spec['from']], spec.get('format'))
+            elif step['kind'] == 'expr':
+                columns[step['name']] = df.eval(spec['expr'])
+            else:
+                columns[step['name']] = pd.Series(spec['value'], index=df.index, dtype=object)
+        
+        return pd.DataFrame(columns, index=df.index, copy=False)
+    
+    def parse_datetime(self, series, date_format=None):
+        """pd.to_datetime with a known format, parsed natively by Arrow when it can be
+        
+        Falls back to pandas with the format, then to pandas inferring the
+        format, so values in an unexpected layout still parse.
+        """
+        if date_format is None or not (series.dtype == 'object' or isinstance(series.dtype, (pd.StringDtype, pd.CategoricalDtype))):
+            return pd.to_datetime(series)
+        
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Parse each category once
+            parsed = self.parse_datetime(pd.Series(series.cat.categories), date_format).to_numpy()
+            codes = series.cat.codes.to_numpy()
+            values = np.where(codes >= 0, parsed[codes], np.datetime64('NaT'))
+            return pd.Series(values, index=series.index, name=series.name)
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            
+            values = pa.array(series, type=pa.string(), from_pandas=True)
+            parsed = pc.strptime(values, format=date_format, unit='ns')
+            return pd.Series(parsed.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+        except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+            self.logger.info(f"Arrow couldn't parse '{series.name}' with format {date_format} ({e}), using pandas")
+        
+        try:
+            return pd.to_datetime(series, format=date_format)
+        except ValueError:
+            self.logger.warning(f"Column '{series.name}' doesn't match format {date_format}, inferring it")
+            return pd.to_datetime(series)
+    
     def map_ecommerce_schema(self, df):
         """Map e-commerce data to target schema"""
         self.logger.info("Mapping e-commerce schema...")
-        
-        mapped_df = pd.DataFrame({
-            'transaction_id': df['InvoiceNo'],
-            'transaction_date': pd.to_datetime(df['InvoiceDate']),
-            'customer_id': df['CustomerID'],
-            'product_code': df['StockCode'],
-            'product_description': df['Description'],
-            'quantity': df['Quantity'],
-            'unit_price': df['UnitPrice'],
-            'total_price': df['Quantity'] * df['UnitPrice'],
-            'country': df['Country'],
-            'source': 'ecommerce_db'
-        })
-        
-        return mapped_df
+        return self.map(df, 'ecommerce')
     
     def map_weather_schema(self, df):
         """Map weather data to target schema"""
         self.logger.info("Mapping weather schema...")
-        
-        mapped_df = pd.DataFrame({
-            'date': pd.to_datetime(df['date']),
-            'temp_max_c': df['temp_max'],
-            'temp_min_c': df['temp_min'],
-            'precipitation_mm': df['precipitation'],
-            'source': 'weather_api'
-        })
-        
-        return mapped_df
+        return self.map(df, 'weather')
     
     def validate_schema(self, df, required_columns):
         """Validate that required columns exist"""
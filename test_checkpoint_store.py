@@ -0,0 +1,78 @@
+#Test file checking that stage checkpoints come back as written, are dropped when stale or damaged, and expire
+
+import os
+import sys
+# The store imports its Arrow helpers the way pipeline.py does, from inside src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from state.checkpoint_store import CheckpointStore
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import tempfile
+import json
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+#A mapped frame with the dtypes the pipeline produces (compacted numbers, categoricals, Arrow strings)
+rng = np.random.default_rng(3)
+rows = 50000
+df = pd.DataFrame({
+    'transaction_id': pd.Series(rng.integers(536000, 580000, rows).astype(str), dtype='string[pyarrow]'),
+    'product_code': pd.Categorical(np.array(['85123a', '71053', '84406b'])[rng.integers(0, 3, rows)]),
+    'product_description': np.array(['white hanging heart', 'lantern', None], dtype=object)[rng.integers(0, 3, rows)],
+    'quantity': rng.integers(1, 50, rows).astype('int8'),
+    'unit_price': rng.gamma(2, 2, rows).round(2).astype('float32'),
+    'customer_id': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12000, 18000, rows)),
+    'transaction_date': pd.Timestamp('2011-01-01') + pd.to_timedelta(rng.integers(0, 300 * 24 * 60, rows), unit='min')
+})
+quality = {'score': 80.0, 'checks': [{'check': 'duplicates', 'value': np.int64(0), 'passed': np.bool_(True)}]}
+
+failures = 0
+def check(label, passed):
+    global failures
+    failures += not passed
+    print(f"{label:>50}: {'PASS' if passed else 'FAIL'}")
+
+with tempfile.TemporaryDirectory() as path:
+    store = CheckpointStore(path, retention_runs=1, max_age_hours=24)
+    info = store.start_run('run_1', {'incremental': True, 'since': '2011-06-01T00:00:00'})
+    store.save('run_1', 'mapped_ecommerce', df=df, fingerprint='abc')
+    store.save('run_1', 'pre_validate', meta=quality, fingerprint='abc')
+    
+    loaded, _ = store.load('run_1', 'mapped_ecommerce', 'abc')
+    check("frame comes back with the same dtypes and values", loaded.dtypes.equals(df.dtypes) and loaded.equals(df))
+    check("results come back as JSON", store.load('run_1', 'pre_validate', 'abc')[1] == {
+        'score': 80.0, 'checks': [{'check': 'duplicates', 'value': 0, 'passed': True}]})
+    check("resuming returns the first attempt's info",
+          store.start_run('run_1', {'incremental': False, 'since': None}) == info == store.run_info('run_1'))
+    check("other settings invalidate a checkpoint", store.load('run_1', 'mapped_ecommerce', 'xyz') is None)
+    check("missing stage has no checkpoint", not store.has('run_1', 'mapped_weather', 'abc'))
+    
+    store.save('run_1', 'mapped_ecommerce', df=df.iloc[:100], fingerprint='abc')
+    files = [name for name in os.listdir(store.run_path('run_1')) if name.endswith('.parquet')]
+    check("saving a stage again replaces its file", len(files) == 1 and len(store.load('run_1', 'mapped_ecommerce', 'abc')[0]) == 100)
+    
+    with open(os.path.join(store.run_path('run_1'), files[0]), 'r+b') as f:
+        f.truncate(200)
+    check("damaged file isn't used", store.load('run_1', 'mapped_ecommerce', 'abc') is None)
+    
+    #Retention: runs past max_age_hours and all but the newest retention_runs go, kept runs stay
+    for run_id in ('run_2', 'run_3', 'run_4'):
+        store.start_run(run_id)
+    manifest_path = os.path.join(store.run_path('run_4'), 'manifest.json')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['created_at'] = (datetime.now() - timedelta(hours=48)).isoformat()
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    
+    removed = store.cleanup(keep=['run_1'])
+    check("cleanup applies retention", sorted(removed) == ['run_2', 'run_4'] and store.runs() == ['run_1', 'run_3'])
+    
+    store.remove('run_3')
+    check("removed run has no checkpoints", store.run_info('run_3') is None and store.runs() == ['run_1'])
+
+print(f"\n{'Checkpoint store behaves' if not failures else f'{failures} failures'}")
+sys.exit(1 if failures else 0)
\ No newline at end of file
@@ -0,0 +1,95 @@
+#Test file checking that the stage scheduler overlaps independent tasks and chunk stages, keeps order and surfaces failures
+
+from src.orchestration.dag_executor import DAGExecutor, StageRunner
+import logging
+import time
+import sys
+
+logging.basicConfig(level=logging.ERROR)
+
+# Sleeps stand in for waiting on the database and the weather API
+STAGE_SECONDS = 0.2
+CHUNKS = 8
+
+def wait(seconds, result=None):
+    time.sleep(seconds)
+    return result
+
+def batch_graph(workers):
+    """The batch pipeline's shape: two extracts, transforms, checks and loads"""
+    dag = DAGExecutor(max_workers=workers)
+    dag.add('extract_ecommerce', lambda: wait(STAGE_SECONDS, 'ecom'))
+    dag.add('extract_weather', lambda: wait(STAGE_SECONDS, 'weather'))
+    dag.add('transform_ecommerce', lambda ecom: wait(STAGE_SECONDS, ecom + ' clean'), depends_on=['extract_ecommerce'])
+    dag.add('transform_weather', lambda weather: wait(STAGE_SECONDS, weather + ' clean'), depends_on=['extract_weather'])
+    dag.add('post_validate', lambda ecom: wait(STAGE_SECONDS), depends_on=['transform_ecommerce'])
+    dag.add('load_ecommerce', lambda ecom: wait(STAGE_SECONDS, ecom), depends_on=['transform_ecommerce'])
+    dag.add('load_weather', lambda weather: wait(STAGE_SECONDS, weather), depends_on=['transform_weather'])
+    dag.add('load_sales_weather', lambda ecom, weather: f"{ecom} + {weather}", depends_on=['transform_ecommerce', 'transform_weather'])
+    return dag
+
+def chunk_stages(concurrent):
+    loaded = []
+    stages = StageRunner([
+        ('transform', lambda chunk: wait(STAGE_SECONDS, chunk)),
+        ('load', lambda chunk: loaded.append(wait(STAGE_SECONDS, chunk)))
+    ], queue_size=2, concurrent=concurrent)
+    return stages, loaded
+
+def source():
+    for chunk in range(CHUNKS):
+        yield wait(STAGE_SECONDS, chunk)
+
+failures = 0
+def check(label, passed, detail=''):
+    global failures
+    failures += not passed
+    print(f"{label:>45}: {'PASS' if passed else 'FAIL'} {detail}")
+
+#Independent tasks run side by side, dependents get their dependencies' results
+results = {}
+for workers in (1, 4):
+    dag = batch_graph(workers)
+    start = time.perf_counter()
+    results[workers] = dag.run()
+    seconds = time.perf_counter() - start
+    check(f"graph with {workers} worker(s)", results[workers]['load_sales_weather'] == 'ecom clean + weather clean', f"{seconds:.2f}s")
+check("concurrent graph takes the critical path", dag.stats['duration_seconds'] < 4.5 * STAGE_SECONDS,
+      f"{dag.stats['duration_seconds']:.2f}s for {dag.stats['busy_seconds']:.2f}s of tasks")
+check("same results either way", results[1] == results[4])
+
+#Chunk N is loaded while chunk N+1 is transformed and N+2 extracted
+for concurrent in (False, True):
+    stages, loaded = chunk_stages(concurrent)
+    items = stages.run(source())
+    check(f"{'concurrent' if concurrent else 'sequential'} chunk stages keep order", loaded == list(range(CHUNKS)) and items == CHUNKS,
+          f"{stages.stats['duration_seconds']:.2f}s")
+# Sequential is 3 stages x CHUNKS, overlapped it is about the slowest stage x CHUNKS (plus filling the pipe)
+check("stages overlap", stages.stats['duration_seconds'] < (CHUNKS + 3) * STAGE_SECONDS)
+
+#A failing task stops the graph and its error reaches the caller
+dag = DAGExecutor(max_workers=4)
+dag.add('extract_ecommerce', lambda: wait(STAGE_SECONDS))
+dag.add('extract_weather', lambda: 1 / 0)
+dag.add('load_weather', lambda weather: wait(STAGE_SECONDS), depends_on=['extract_weather'])
+try:
+    dag.run()
+    check("failed task raises", False)
+except ZeroDivisionError:
+    check("failed task raises", 'load_weather' not in dag.stats['tasks'])
+
+#A failing stage stops the source and the other stages instead of hanging
+def failing_load(chunk):
+    if chunk == 2:
+        raise RuntimeError("load failed")
+
+stages = StageRunner([('transform', lambda chunk: chunk), ('load', failing_load)], queue_size=1)
+start = time.perf_counter()
+try:
+    stages.run(source())
+    check("failed stage raises", False)
+except RuntimeError:
+    check("failed stage raises", time.perf_counter() - start < CHUNKS * STAGE_SECONDS, f"after {time.perf_counter() - start:.2f}s")
+
+print(f"\n{'Stage scheduler behaves' if not failures else f'{failures} failures'}")
+sys.exit(1 if failures else 0)
\ No newline at end of file
@@ -0,0 +1,77 @@
+#Test file checking that the dedup index finds duplicates across frames, spills, persists and only resets on save
+
+from src.transformers.dedup_index import DedupIndex
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import logging
+import sys
+
+logging.basicConfig(level=logging.ERROR)
+
+rng = np.random.default_rng(5)
+rows = 30000
+df = pd.DataFrame({
+    'InvoiceNo': rng.integers(536000, 540000, rows).astype(str).astype(object),
+    'StockCode': np.array(['85123A', '71053', '84406B'], dtype=object)[rng.integers(0, 3, rows)],
+    'Quantity': rng.integers(1, 12, rows),
+    'CustomerID': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12000, 18000, rows))
+})
+chunks = [df.iloc[lo:lo + 5000] for lo in range(0, rows, 5000)]
+expected = ~df.duplicated().to_numpy()
+
+failures = 0
+def check(label, passed):
+    global failures
+    failures += not passed
+    print(f"{label:>50}: {'PASS' if passed else 'FAIL'}")
+
+def mark_all(index, frames):
+    return np.concatenate([index.mark(frame) for frame in frames])
+
+#A row is new once, whichever frame it comes in
+check("new rows match duplicated() across chunks", (mark_all(DedupIndex(), chunks) == expected).all())
+index = DedupIndex()
+index.mark(df)
+check("narrow integers hash like wide ones", not index.mark(df.astype({'Quantity': 'int8'})).any())
+
+index = DedupIndex(max_memory=4000)
+check("spilling gives the same answers", (mark_all(index, chunks) == expected).all() and len(index.runs) > 1)
+spill_dir = index.spill_dir
+index.close()
+check("close removes temporary spills", not os.path.exists(spill_dir))
+
+#Saved fingerprints outlive the index, unsaved spills and resets don't
+with tempfile.TemporaryDirectory() as path:
+    keys = ['InvoiceNo', 'StockCode']
+    index = DedupIndex(keys, max_memory=4000, path=path)
+    index.mark(chunks[0])
+    index.save(info={'rows': 5000})
+    index.mark(chunks[1])
+    # Unsaved spills of a run that failed are dropped when the index is opened again
+    reopened = DedupIndex(keys, max_memory=4000, path=path)
+    check("saved rows persist, unsaved ones don't", not reopened.mark(chunks[0]).any()
+          and reopened.info == {'rows': 5000} and not any(name.endswith('.pending') for name in os.listdir(path)))
+    check("rows of an unsaved run are new again", reopened.mark(chunks[1]).any())
+    
+    saved = DedupIndex(keys, path=path)
+    size = saved.size()
+    saved.clear()
+    check("clear() leaves the saved index until save()", DedupIndex(keys, path=path).size() == size)
+    saved.mark(chunks[2])
+    saved.save()
+    after = DedupIndex(keys, path=path)
+    only_first = chunks[0][~chunks[0][keys].apply(tuple, axis=1).isin(chunks[2][keys].apply(tuple, axis=1))]
+    check("save() after clear() keeps only the new rows", after.size() == saved.size()
+          and not after.mark(chunks[2]).any() and after.mark(only_first.drop_duplicates(keys)).all())
+    check("save() removes the cleared files", len([name for name in os.listdir(path) if name.endswith('.npy')]) == len(after.runs))
+    
+    try:
+        DedupIndex(['InvoiceNo'], path=path)
+        check("other key columns are refused", False)
+    except ValueError:
+        check("other key columns are refused", True)
+
+print(f"\n{'Dedup index behaves' if not failures else f'{failures} failures'}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,104 @@
+#Test file checking that the Polars and DuckDB engines give the same results as pandas
+#Engines that aren't installed (pip install polars duckdb) are skipped
+
+import os
+import sys
+# The modules import each other the way pipeline.py does, from inside src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from transformers.engines import get_engine, ENGINES
+from transformers.schema_mapper import SchemaMapper
+from transformers.dtype_compactor import DtypeCompactor
+from transformers.dedup_index import DedupIndex
+from quality.validators import DataQualityValidator
+from extractors.postgres_extractor import RAW_TRANSACTIONS_DTYPES, arrow_text_dtypes
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import logging
+
+logging.basicConfig(level=logging.WARNING)
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+#Build a sample table shaped like raw_transactions, with the mess the cleaner deals with
+rng = np.random.default_rng(7)
+raw = pd.DataFrame({
+    'InvoiceNo': rng.integers(536000, 580000, rows).astype(str).astype(object),
+    'StockCode': np.array(['85123A', '71053', '84406B', '22752', ' 21730 '])[rng.integers(0, 5, rows)],
+    'Description': np.array(['WHITE HANGING HEART', ' CREAM CUPID ', '', None, 'LANTERN'], dtype=object)[rng.integers(0, 5, rows)],
+    'Quantity': rng.integers(-5, 50, rows),
+    'InvoiceDate': pd.Series(pd.Timestamp('2010-12-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, rows), unit='m')).dt.strftime('%m/%d/%Y %H:%M'),
+    'UnitPrice': rng.gamma(2, 2, rows).round(2),
+    'CustomerID': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12000, 18000, rows)),
+    'Country': np.array(['United Kingdom', 'France', 'Germany', 'EIRE', ' Spain'])[rng.integers(0, 5, rows)]
+})
+raw = pd.concat([raw, raw.iloc[:rows // 100]], ignore_index=True)
+raw.loc[5, 'StockCode'] = None
+
+variants = {
+    'object strings': raw,
+    'arrow strings': raw.astype({col: dtype for col, dtype in arrow_text_dtypes(RAW_TRANSACTIONS_DTYPES).items()
+                                 if dtype != RAW_TRANSACTIONS_DTYPES[col]}),
+    'compact dtypes': DtypeCompactor().compact(raw, 'raw_transactions')
+}
+
+config = {
+    'critical_columns': ['InvoiceNo', 'StockCode'],
+    'outlier_columns': ['Quantity', 'UnitPrice'],
+    'fused': True
+}
+value_ranges = {'Quantity': (0, 10000), 'UnitPrice': (0, 1000)}
+
+engines = {}
+for name in ENGINES:
+    try:
+        engines[name] = get_engine(name)
+    except ImportError as e:
+        print(f"Skipping {name}: {e}")
+
+failures = 0
+for variant, df in variants.items():
+    # The validator's own single-pass profile has to agree with the engines' too
+    expected_profile = engines['pandas'].profile(df, value_ranges)
+    validator_profile = DataQualityValidator().profile_frame(df, value_ranges)
+    if {key: validator_profile[key] for key in expected_profile} != expected_profile:
+        failures += 1
+        print(f"validator | {variant:<46} | FAIL\n        profile differs: {validator_profile}")
+    
+    for dedup_keys in [None, ['InvoiceNo', 'StockCode']]:
+        reference = engines['pandas']
+        start = datetime.now()
+        expected = reference.transform(df, config, SchemaMapper(), 'ecommerce',
+                                       dedup_index=DedupIndex(dedup_keys) if dedup_keys else None)
+        reference_time = (datetime.now() - start).total_seconds()
+        expected_profile = reference.profile(df, value_ranges)
+        
+        for name, engine in engines.items():
+            if name == 'pandas':
+                continue
+            
+            start = datetime.now()
+            result = engine.transform(df, config, SchemaMapper(), 'ecommerce',
+                                      dedup_index=DedupIndex(dedup_keys) if dedup_keys else None)
+            duration = (datetime.now() - start).total_seconds()
+            
+            problems = []
+            try:
+                pd.testing.assert_frame_equal(expected, result)
+            except AssertionError as e:
+                problems.append(f"output differs: {str(e).splitlines()[0]}")
+            if engine.cleaning_stats != reference.cleaning_stats:
+                problems.append(f"cleaning stats differ: {engine.cleaning_stats}")
+            if engine.profile(df, value_ranges) != expected_profile:
+                problems.append(f"profile differs: {engine.profile(df, value_ranges)}")
+            
+            failures += bool(problems)
+            label = f"{variant}, {'dedup on ' + '+'.join(dedup_keys) if dedup_keys else 'whole-row dedup'}"
+            print(f"{name:>7} | {label:<46} | {len(result):>7} rows | {duration:.2f}s vs pandas {reference_time:.2f}s | "
+                  f"{'PASS' if not problems else 'FAIL'}")
+            for problem in problems:
+                print(f"        {problem}")
+
+print(f"\n{'All engines match pandas' if not failures else f'{failures} mismatches'}")
+sys.exit(1 if failures else 0)
\ No newline at end of file
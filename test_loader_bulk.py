@@ -0,0 +1,39 @@
+#Test file for comparing DatabaseLoader insert methods
+#Uses the target database if TEST_TARGET_DB is set, otherwise a local SQLite file
+
+from src.loaders.database_loader import DatabaseLoader
+import pandas as pd
+import numpy as np
+import os
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+conn_string = os.getenv('TEST_TARGET_DB', 'sqlite:///bulk_load_test.db')
+loader = DatabaseLoader(conn_string)
+
+#Build a sample table shaped like ecommerce_transactions
+rows = 100000
+df = pd.DataFrame({
+    'transaction_id': np.arange(rows).astype(str),
+    'transaction_date': pd.date_range('2011-01-01', periods=rows, freq='min'),
+    'customer_id': np.where(np.arange(rows) % 5 == 0, np.nan, 12000.0 + np.arange(rows) % 5000),
+    'product_description': np.where(np.arange(rows) % 7 == 0, '', 'WHITE HANGING HEART'),
+    'quantity': np.arange(rows) % 50,
+    'unit_price': (np.arange(rows) % 1000) / 100
+})
+
+methods = ['auto', None, 'multi']
+for method in methods:
+    result = loader.load(df, 'bulk_load_test', if_exists='replace', method=method)
+    loaded = pd.read_sql('SELECT * FROM bulk_load_test', loader.engine)
+    
+    # Row count, NULLs and empty strings should survive every method
+    assert len(loaded) == rows
+    assert loaded['customer_id'].isnull().sum() == df['customer_id'].isnull().sum()
+    assert (loaded['product_description'] == '').sum() == (df['product_description'] == '').sum()
+    
+    print(f"{str(method):>6} -> {result['method']:>6}: {result['rows_per_second']:,.0f} rows/sec")
+
+if conn_string.startswith('sqlite:///'):
+    os.remove(conn_string[len('sqlite:///'):])
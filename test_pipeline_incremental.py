@@ -0,0 +1,44 @@
+#Test file checking that incremental runs with no new rows load nothing and report no quality score
+#Uses the SOURCE_DB_* / TARGET_DB_* databases from .env, like test_pipeline_full.py, and moves their watermark
+
+import os
+import sys
+# pipeline.py imports its modules from inside src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from pipeline import ETLPipeline
+from loaders.database_loader import DatabaseLoader
+import tempfile
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+failures = 0
+def check(label, passed):
+    global failures
+    failures += not passed
+    print(f"{label:>50}: {'PASS' if passed else 'FAIL'}")
+
+for streaming in (False, True):
+    mode = 'streaming' if streaming else 'batch'
+    with tempfile.TemporaryDirectory() as path:
+        # The dedup index re-extracts the rows at the watermark's timestamp every run
+        config = {
+            'dedup_index_path': os.path.join(path, 'dedup'),
+            'quality_profile_path': os.path.join(path, 'quality'),
+            'schema_cache_path': None,
+            'weather_cache_path': None
+        }
+        pipeline = ETLPipeline(config)
+        loader = DatabaseLoader(pipeline.target_conn)
+        pipeline.run(incremental=True, streaming=streaming)
+        loaded = loader.verify_load('ecommerce_transactions')
+        
+        for run in range(2):
+            result = ETLPipeline(config).run(incremental=True, streaming=streaming)
+            check(f"{mode} run {run + 1} without new rows succeeds", result['status'] == 'SUCCESS')
+            check(f"{mode} run {run + 1} has no quality score", result['quality_score'] is None)
+            check(f"{mode} run {run + 1} loads nothing", loader.verify_load('ecommerce_transactions') == loaded)
+
+print(f"\n{failures} failure(s)")
+sys.exit(1 if failures else 0)
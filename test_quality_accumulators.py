@@ -0,0 +1,85 @@
+#Test file checking that chunked, merged and saved quality accumulators score like run_all_checks on the whole frame
+
+import os
+import sys
+# The accumulators import their DedupIndex the way pipeline.py does, from inside src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from quality.validators import DataQualityValidator
+from quality.accumulators import QualityAccumulator
+from transformers.dtype_compactor import DtypeCompactor
+import numpy as np
+import pandas as pd
+import tempfile
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+chunksize = rows // 7
+
+#Mapped e-commerce rows with nulls, out-of-range quantities and duplicates spread over chunks
+rng = np.random.default_rng(11)
+df = pd.DataFrame({
+    'transaction_id': rng.integers(536000, 580000, rows),
+    'product_code': np.array(['85123A', '71053', '84406B', '22752'], dtype=object)[rng.integers(0, 4, rows)],
+    'product_description': np.array(['WHITE HANGING HEART', 'LANTERN', None], dtype=object)[rng.integers(0, 3, rows)],
+    'quantity': rng.integers(-5, 50, rows),
+    'unit_price': rng.gamma(2, 2, rows).round(2),
+    'customer_id': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12000, 18000, rows)),
+    'country': np.array(['united kingdom', 'france', 'germany'], dtype=object)[rng.integers(0, 3, rows)]
+})
+df = pd.concat([df, df.sample(rows // 50, random_state=1)], ignore_index=True).sample(frac=1, random_state=2, ignore_index=True)
+
+config = {
+    'null_threshold': 0.05,
+    'required_columns': ['transaction_id', 'customer_id'],
+    'value_ranges': {'quantity': (0, 10000), 'unit_price': (0, 1000)},
+    'min_rows': 100
+}
+chunks = [df.iloc[lo:lo + chunksize] for lo in range(0, len(df), chunksize)]
+
+def checks(results):
+    return [(check['check'], check['column'], check['value'], check['passed']) for check in results['checks']]
+
+validator = DataQualityValidator()
+expected = validator.run_all_checks(df, config)
+
+chunked = QualityAccumulator(config['value_ranges'])
+for chunk in chunks:
+    # Chunks compacted on their own can get different integer widths
+    chunked.update(DtypeCompactor().compact(chunk, 'ecommerce_transactions'))
+
+merged = QualityAccumulator(config['value_ranges'])
+for chunk in chunks:
+    merged.merge(QualityAccumulator(config['value_ranges']).update(chunk))
+
+# Fingerprints past max_memory are spilled to disk, the counts stay the same
+spilled = QualityAccumulator(config['value_ranges'], max_memory=chunksize // 3)
+for chunk in chunks:
+    worker = QualityAccumulator(config['value_ranges'], max_memory=chunksize // 3).update(chunk)
+    spilled.merge(worker)
+    worker.close()
+spill_files = len(spilled.duplicates.index.runs)
+spilled.close()
+
+with tempfile.TemporaryDirectory() as path:
+    # A full reload starts the saved profile over
+    QualityAccumulator.load(path, config['value_ranges']).update(df).save()
+    QualityAccumulator.load(path, config['value_ranges']).clear().update(chunks[0]).save()
+    for chunk in chunks[1:]:
+        QualityAccumulator.load(path, config['value_ranges'], max_memory=chunksize // 3).merge(
+            QualityAccumulator(config['value_ranges']).update(chunk)).save()
+    saved = QualityAccumulator.load(path, config['value_ranges'])
+    saved_files = len(saved.duplicates.index.runs)
+
+failures = 0
+for label, accumulator in [('updated per chunk', chunked), ('merged from workers', merged),
+                          (f'spilled to {spill_files} files', spilled), (f'saved in {saved_files} files', saved)]:
+    results = validator.score_profile(accumulator.profile(), config)
+    passed = checks(results) == checks(expected) and results['score'] == expected['score']
+    failures += not passed
+    print(f"{label:>20}: score {results['score']} vs {expected['score']} | {'PASS' if passed else 'FAIL'}")
+
+print(f"\n{'Accumulators match run_all_checks' if not failures else f'{failures} mismatches'}")
+sys.exit(1 if failures else 0)
\ No newline at end of file
@@ -0,0 +1,61 @@
+#Test file checking that sampled quality checks reach the full scan's verdicts, also when duplicates hide in one heavy group
+
+from src.quality.validators import DataQualityValidator
+import numpy as np
+import pandas as pd
+import logging
+import sys
+
+logging.basicConfig(level=logging.ERROR)
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+config = {
+    'null_threshold': 0.25,
+    'value_ranges': {'Quantity': (-10, 10000)},
+    'min_rows': 100,
+    'sample_size': 20000
+}
+
+def transactions(rows, cheap_columns=True, seed=7):
+    """Raw transactions with 20% NaN CustomerID; only CustomerID is numeric unless cheap_columns"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'InvoiceNo': (536365 + rng.integers(0, 25000, rows)).astype(str).astype(object),
+        'StockCode': np.array(['85123A', '71053', '84406B', '22752', '21730'])[rng.integers(0, 5, rows)].astype(object),
+        'Quantity': rng.integers(1, 60, rows),
+        'InvoiceDate': pd.Series(pd.date_range('2010-12-01', periods=rows, freq='min').strftime('%m/%d/%Y %H:%M')),
+        'CustomerID': np.where(rng.random(rows) < 0.2, np.nan, rng.integers(12346, 18288, rows)),
+        'Country': np.array(['United Kingdom', 'France', 'Germany'])[rng.integers(0, 3, rows)].astype(object)
+    })
+    if not cheap_columns:
+        df['Quantity'] = df['Quantity'].astype(str).astype(object)
+    return df
+
+def with_duplicates(df, rows_from, fraction, seed=1):
+    extra = rows_from.sample(frac=fraction, random_state=seed)
+    return pd.concat([df, extra], ignore_index=True)
+
+cases = []
+skewed = transactions(rows, cheap_columns=False)
+# Every duplicate shares CustomerID NaN, the one key a single numeric column would slice on
+cases.append(('duplicates only among NaN customers', with_duplicates(skewed, skewed[skewed['CustomerID'].isna()], 0.02)))
+spread = transactions(rows)
+cases.append(('duplicates spread over all rows', with_duplicates(spread, spread, 0.002)))
+cases.append(('no duplicates', transactions(rows)))
+
+failures = 0
+for label, df in cases:
+    full = DataQualityValidator().run_all_checks(df, {**config, 'sample_size': None})
+    expected = [(check['check'], check['column'], check['passed']) for check in full['checks']]
+    for seed in range(3):
+        sampled = DataQualityValidator().run_all_checks(df, {**config, 'sample_seed': seed})
+        verdicts = [(check['check'], check['column'], check['passed']) for check in sampled['checks']]
+        duplicates = next(check for check in sampled['checks'] if check['check'] == 'duplicates')
+        passed = verdicts == expected
+        failures += not passed
+        print(f"{label:>36} (seed {seed}): duplicates {duplicates['value']:.4f}, passed={duplicates['passed']} "
+              f"| {'PASS' if passed else 'FAIL'}")
+
+print(f"\n{'Sampled verdicts match the full scan' if not failures else f'{failures} mismatches'}")
+sys.exit(1 if failures else 0)
\ No newline at end of file
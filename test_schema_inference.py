@@ -0,0 +1,53 @@
+#Test file checking that a column with a rare non-number outside the inference sample settles in the schema cache
+
+from src.transformers.schema_inference import SchemaInferrer
+from src.transformers.data_cleaner import DataCleaner
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import sys
+import json
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+#Numeric in the seeded 10k-row sample, but one of 20k rows is 'N/A'
+rows = 20000
+df = pd.DataFrame({
+    'quantity': np.arange(rows).astype(str).astype(object),
+    'description': np.array(['lantern', 'heart'], dtype=object)[np.arange(rows) % 2]
+})
+sample = df.sample(10000, random_state=0).index
+outside = np.setdiff1d(np.arange(rows), sample)[0]
+df.loc[outside, 'quantity'] = 'N/A'
+
+failures = 0
+def check(label, passed):
+    global failures
+    failures += not passed
+    print(f"{label:>50}: {'PASS' if passed else 'FAIL'}")
+
+with tempfile.TemporaryDirectory() as path:
+    cache_path = os.path.join(path, 'schemas.json')
+    inferrer = SchemaInferrer(cache_path, sample_size=10000)
+    
+    inferred = []
+    infer = inferrer.infer
+    inferrer.infer = lambda *args: inferred.append(1) or infer(*args)
+    
+    for run in range(2):
+        cleaner = DataCleaner(schema_inferrer=inferrer)
+        cleaned = cleaner.clean_fused(df.copy(), {'source': 'ecommerce'})
+        check(f"run {run + 1} keeps quantity as text", cleaned['quantity'].dtype == object)
+    
+    with open(cache_path) as f:
+        cached = json.load(f)
+    
+    check("sample infers quantity as numeric", infer(df)['quantity'] == 'numeric')
+    check("cache keeps the source entry", 'ecommerce' in cached)
+    check("mismatched column is cached as text", cached['ecommerce']['columns']['quantity'] == 'text')
+    check("second run hits the cache", len(inferred) == 1)
+
+print(f"\n{failures} failure(s)")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,60 @@
+#Test file for multi-location weather extraction against a local stub server
+
+from src.extractors.weather_extractor import WeatherExtractor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import threading
+import json
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+# Remember which coordinates already failed once so every location gets one retry
+failed_once = set()
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        key = (params['latitude'][0], params['longitude'][0])
+        
+        # Fail the first request per location to exercise retry/backoff
+        if key not in failed_once:
+            failed_once.add(key)
+            self.send_response(503)
+            self.end_headers()
+            return
+        
+        days = int(params['past_days'][0])
+        body = json.dumps({
+            'daily': {
+                'time': [f"2024-01-{day + 1:02d}" for day in range(days)],
+                'temperature_2m_max': [10.0 + day for day in range(days)],
+                'temperature_2m_min': [1.0 + day for day in range(days)],
+                'precipitation_sum': [0.5] * days
+            }
+        }).encode()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # Keep output quiet
+
+#Start the stub server on a free port
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubWeatherHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+extractor = WeatherExtractor(base_url=f"http://127.0.0.1:{server.server_port}/v1/forecast")
+locations = ['United Kingdom', 'France', 'Germany', ('Custom', 10.0, 20.0)]
+
+df = extractor.extract_weather_multi(locations, days=5, max_workers=4, backoff_seconds=0.1)
+server.shutdown()
+
+assert len(df) == 5 * len(locations)
+assert sorted(df['location'].unique()) == sorted(['United Kingdom', 'France', 'Germany', 'Custom'])
+
+print("\nMulti-location weather extraction successful")
+print(f"\nData:\n{df}")